@@ -46,4 +46,17 @@ awk_routine(){
     '
 }
 
-cat $logFile | grep seconds | awk -F 'function' '{print $2}' | awk -F ' ' '{print $1, $3}' | awk_routine
+# Use the table of timings logged at the end of the main program
+# when there is one, and the lines of the individual calls otherwise.
+# The table ends at the next line starting with a timestamp, since
+# other records (such as the histograms flushed by timings) may be
+# logged before the end of the main program
+if grep -q 'Timings of the functions:' $logFile; then
+    awk '
+        /Timings of the functions:/                      { found = 1; next }
+        found && /^[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] / { exit }
+        found                                            { print }
+    ' $logFile
+else
+    cat $logFile | grep seconds | awk -F 'function' '{print $2}' | awk -F ' ' '{print $1, $3}' | awk_routine
+fi
@@ -1,11 +1,13 @@
-import jsonref, argparse
+import argparse, copy, sys
 
-from importlib      import util
 from logs           import logDecorator  as lD
+from logs           import timings
 from lib.testLib    import simpleLib     as sL
 from lib.argParsers import addAllParsers as aP
+from lib.resultGraph import pipeline
+from lib.configService import configService as cS
 
-config   = jsonref.load(open('../config/config.json'))
+config   = cS.getConfig('config.json')
 logBase  = config['logging']['logBase']
 logLevel = config['logging']['level']
 logSpecs = config['logging']['specs']
@@ -18,13 +20,18 @@ def importModules(logger, resultsDict):
     modules as defined in the ../config/modules.json
     file and executing the main function within it
     if present. In error, it fails gracefully ...
+
+    How the modules are run is given by ../config/execution.json.
+    In the ``graph`` mode, modules start as soon as the modules
+    producing their inputs are done, and modules that are up to 
+    date are skipped (see ``lib.resultGraph.pipeline``).
     
     Parameters
     ----------
     logger : {logging.Logger}
         logger module for logging information
     '''
-    modules = jsonref.load(open('../config/modules.json'))
+    modules = cS.getConfig('modules.json')
 
     # update modules in the right order. Also get rid of the frivilous
     # modules
@@ -36,6 +43,7 @@ def importModules(logger, resultsDict):
 
         modules = tempModules
 
+    toRun = []
     for m in modules:
 
         if (resultsDict['modules'] is None):
@@ -62,18 +70,44 @@ def importModules(logger, resultsDict):
                 logger.error(f'Unable to determine whether this module should be skipped: {e}.\n Module is being skipped.')
                 continue
 
-                
+
+        toRun.append(m)
+
+    # run the modules in the order of the graph of their inputs and
+    # outputs, or one after the other in the order of modules.json
+    execution = copy.deepcopy(cS.getConfig('execution.json'))
+    execution = aP.updateArgs(execution, resultsDict.get('execution', {}))
+
+    # each module may run within a process of its own, in which case the
+    # outcome of every module is gathered within resultsDict['moduleResults']
+    processes = execution['processes']
+    if processes['todo']:
+        results = resultsDict.setdefault('moduleResults', {})
+        args    = {k: v for k, v in resultsDict.items() if k != 'moduleResults'}
+        run     = lambda m: pipeline.runProcess(m, args, results, 
+                        timeout   = processes['timeout'],
+                        memoryMB  = processes['memoryMB'],
+                        logFolder = processes['logFolder'])
+    else:
+        run     = lambda m: pipeline.runModule(m, resultsDict)
+
+    if execution['mode'] == 'graph':
+        # a module with options of its own on the command line (such as
+        # --getData_full) is never skipped by the cache
+        cache = execution['cache']
+        cache['always'] = cache.get('always', []) + [m['moduleName'] for m in toRun if resultsDict.get(m['moduleName'])]
+        pipeline.runPipeline(toRun, run,
+            maxWorkers = execution['maxWorkers'],
+            cache      = cache,
+            force      = execution['force'])
+        return
+
+    for m in toRun:
         try:
-            name, path = m['moduleName'], m['path']
-            logger.info('Module {} is being executed'.format( name ))
-
-            module_spec = util.spec_from_file_location(
-                name, path)
-            module = util.module_from_spec(module_spec)
-            module_spec.loader.exec_module(module)
-            module.main(resultsDict)
+            logger.info('Module {} is being executed'.format( m['moduleName'] ))
+            run(m)
         except Exception as e:
-            print('Unable to load module: {}->{}\n{}'.format(name, path, str(e)))
+            print('Unable to load module: {}->{}\n{}'.format(m['moduleName'], m['path'], str(e)))
 
     return
 
@@ -89,6 +123,10 @@ def main(logger, resultsDict):
     # ------------------------------------
     importModules(resultsDict)
 
+    # The run times of the functions, for tracking regressions
+    # ------------------------------------
+    logger.info('Timings of the functions:\n{}'.format(timings.summaryTable()))
+
     # Lets just create a simple testing 
     # for other functions to follow
     # -----------------------------------
@@ -116,7 +154,7 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='VDL command line arguments')
     
     # Add the modules here
-    modules = jsonref.load(open('../config/modules.json'))
+    modules = cS.getConfig('modules.json')
     modules = [m['moduleName'] for m in modules]
     parser.add_argument('-m', '--module', action='append',
         type = str,
@@ -133,6 +171,16 @@ if __name__ == '__main__':
         resultsDict['modules'] = results.module
     else:
         resultsDict['modules'] = None
+
+    # ---------------------------------------------------
+    # Run everything again with python -X importtime, 
+    # and report the slowest imports
+    # ---------------------------------------------------
+    if results.execution_importProfile_todo:
+        from lib.lazyImport import importProfile
+        argv    = [a for a in sys.argv if a != '--execution_importProfile_todo']
+        profile = cS.getConfig('execution.json')['importProfile']
+        sys.exit(importProfile.profileCommand(argv, logSpecs['file']['logFolder'], profile['top']))
         
 
     # ---------------------------------------------------
@@ -141,7 +189,7 @@ if __name__ == '__main__':
     # fundamentally changed the way in which logging 
     # is done here
     # ---------------------------------------------------
-    logSpecs = aP.updateArgs(logSpecs, resultsDict['config']['logging']['specs'])
+    logSpecs = aP.updateArgs(copy.deepcopy(logSpecs), resultsDict['config']['logging']['specs'])
     try:
         logLevel = resultsDict['config']['logging']['level']
     except Exception as e:
@@ -150,4 +198,19 @@ if __name__ == '__main__':
     logInit  = lD.logInit(logBase, logLevel, logSpecs)
     main     = logInit(main)
 
+    # ---------------------------------------------------
+    # Sample the stacks of the run, and of the callbacks
+    # of the Dash app (see lib.profiler)
+    # ---------------------------------------------------
+    profile = aP.updateArgs(copy.deepcopy(cS.getConfig('profile.json')), resultsDict['profile'])
+    # updateArgs can only switch a bool on, so that --profile_dash false
+    # is applied directly
+    profile['dash'] = resultsDict['profile'].get('dash', profile['dash'])
+    resultsDict['profile'] = profile
+    if profile['todo']:
+        from lib.profiler import profiler
+        main = profiler.profile(main, logBase + '.main', 
+                    interval  = profile['interval'], 
+                    logFolder = logSpecs['file']['logFolder'])
+
     main(resultsDict)
\ No newline at end of file
@@ -0,0 +1,14 @@
+'''Benchmarks for the performance critical parts of the program
+
+Each benchmark is a small script that compares a new implementation against
+the implementation that it replaces, over synthetic data of increasing size.
+Just like the rest of the program, the benchmarks should be run from within 
+the ``src`` folder. For example:
+
+.. code-block:: bash
+
+    python3 -m benchmarks.benchCohortIndex
+
+Synthetic data that has the same layout as the Mindlinc extracts is generated
+with the functions in ``benchmarks.synthData``. 
+'''
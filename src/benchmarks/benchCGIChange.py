@@ -0,0 +1,49 @@
+'''Benchmark ``utils.getCGIchangeData``
+
+Compares the vectorized ``utils.getCGIchangeData()`` against the original 
+groupby/transform/merge implementation, over synthetic cohorts of 10k to 1M 
+visits.
+'''
+
+from time import time
+import math
+import pandas as pd
+from modules.VDL import utils
+from benchmarks import synthData
+
+def getCGIchangeDataOld(cp_data, period='Week',n_periods=7):
+    # The original implementation of utils.getCGIchangeData
+    periods = {'Week':7, 'Month':28,'Year':365}
+    data = cp_data.copy()
+    
+    data_grouper = data.groupby('PatientID')['Days']
+    cp_initialCGI = data.loc[data_grouper.idxmin(),['PatientID','CGI']]
+    cp_initialCGI.columns = ['PatientID','CGI_Initial']
+    data = pd.merge(data, cp_initialCGI, how='left', on='PatientID')
+    period_data = data_grouper.transform(lambda x: (x - x.min() + 1) / periods[period]).apply(math.floor).reset_index(drop=True)
+    data[period] = period_data
+    data['CGI_Change'] = data['CGI'] - data['CGI_Initial'] 
+    
+    return data
+
+def main():
+    print(f'{"rows":>10s} {"period":>7s} {"old [s]":>10s} {"new [s]":>10s} {"speedup":>8s}')
+    for nRows in [10**4, 10**5, 10**6]:
+        data = synthData.visits(nRows)
+        data = data[data.PatientID != 1] # like a comparative population
+        for period in ['Week', 'Month', 'Year']:
+            t0  = time()
+            old = getCGIchangeDataOld(data, period)
+            tOld = time() - t0
+
+            t0  = time()
+            new = utils.getCGIchangeData(data, period)
+            tNew = time() - t0
+
+            pd.testing.assert_frame_equal(new, old)
+            print(f'{nRows:10d} {period:>7s} {tOld:10.4f} {tNew:10.4f} {tOld/tNew:8.1f}')
+
+    return
+
+if __name__ == '__main__':
+    main()
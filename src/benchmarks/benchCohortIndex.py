@@ -0,0 +1,50 @@
+'''Benchmark filtering the comparative population with the ``CohortIndex``
+
+Compares ``CohortIndex.filter()`` against ``scanFilter()``, the original
+implementation of ``patientQ.add_filt``, for a set of typical filters.
+'''
+
+from time import time
+from modules.VDL.cohortIndex import CohortIndex, scanFilter
+from benchmarks import synthData
+
+filters = {
+    'none'        : {},
+    'sex'         : {'Sex': 'F'},
+    'age+race'    : {'Age': 40, 'Race': 'asian'},
+    'all demogs'  : {'Age': 40, 'Sex': 'M', 'Race': 'white'},
+    'disease'     : {'DiseaseCat': ['anxiety disorders', 'bipolar disorder']},
+    'everything'  : {'Age': 40, 'Sex': 'M', 'Race': 'white', 'DiseaseCat': ['anxiety disorders']},
+}
+
+def timeIt(f, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t0 = time()
+        f()
+        t = time() - t0
+        best = t if best is None else min(best, t)
+    return best
+
+def main():
+    print(f'{"rows":>10s} {"filter":>12s} {"scan [s]":>10s} {"index [s]":>10s} {"speedup":>8s}')
+    for nRows in [10**4, 10**5, 10**6, 5*10**6]:
+        visits = synthData.visits(nRows)
+        demog  = synthData.demographics(visits.PatientID.max())
+
+        t0 = time()
+        index = CohortIndex(demog, visits)
+        print(f'{nRows:10d} {"(build)":>12s} {"":>10s} {time()-t0:10.4f}')
+
+        for name, f in filters.items():
+            filt = dict({'Sex': None, 'Race': None, 'Age': None, 
+                'Medication': 'all', 'DiseaseCat': 'all'}, **f)
+            assert index.filter(filt, 1).equals(scanFilter(filt, 1, demog, visits))
+            tScan  = timeIt(lambda: scanFilter(filt, 1, demog, visits))
+            tIndex = timeIt(lambda: index.filter(filt, 1))
+            print(f'{nRows:10d} {name:>12s} {tScan:10.4f} {tIndex:10.4f} {tScan/tIndex:8.1f}')
+
+    return
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+'''Benchmark ``diseaseCategories.DSMRecoder``
+
+Compares the recoding of DSM codes with ``DSMRecoder.recode()`` against the 
+original loop over the disorders (one regex scan of all the visits per 
+disorder), over 10k to 1M visits with 500 distinct codes.
+'''
+
+from time import time
+import pandas as pd
+from modules.VDL.diseaseCategories import DSMRecoder
+from benchmarks import synthData
+
+def recodeOld(data, table):
+    # The original loop of cleanData.cleanVisits
+    data['DiseaseCat'] = 'others'
+    for i, (disorders, counts, regex, dsmno) in table.iterrows():
+        if disorders != 'others':
+            data.loc[data.DSMNo.str.contains(regex), 'DiseaseCat'] = disorders
+    return data.DiseaseCat
+
+def main():
+    table = synthData.dsmTable()
+    print(f'{"rows":>10s} {"old [s]":>10s} {"new [s]":>10s} {"speedup":>8s}')
+    for nRows in [10**4, 10**5, 10**6]:
+        data = pd.DataFrame({'DSMNo': synthData.dsmCodes(nRows)})
+
+        t0  = time()
+        old = recodeOld(data, table)
+        tOld = time() - t0
+
+        t0  = time()
+        new = DSMRecoder(table).recode(data.DSMNo)
+        tNew = time() - t0
+
+        pd.testing.assert_series_equal(new, old, check_dtype=False)
+        print(f'{nRows:10d} {tOld:10.4f} {tNew:10.4f} {tOld/tNew:8.1f}')
+
+    return
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+'''Benchmark the overhead of ``logs.logDecorator.log`` per call
+
+Compares a bare function against the original decorator, which looks up the
+logger and formats two messages on every call, and against the ``verbose``
+and ``histogram`` modes of the decorator. Each variant is timed with the
+logger at the ``INFO`` level (writing to an in-memory stream) and at the 
+``WARNING`` level.
+'''
+
+import io, logging
+from time import time, perf_counter
+from functools import wraps
+from logs import logDecorator as lD
+
+class logOld(object):
+    # The original implementation of logDecorator.log
+
+    def __init__(self, base):
+        self.base   = base
+        return
+
+    def __call__(self, f):
+
+        from time import time
+
+        @wraps(f)
+        def wrappedF(*args, **kwargs):
+            logger = logging.getLogger(self.base)
+            logger.info('Starting the function [{}] ...'.format(f.__name__))
+            t0     = time()
+            result = f(logger, *args, **kwargs)
+            logger.info('Finished the function [{}] in {:.6e} seconds'.format( 
+                f.__name__, time() - t0 ))
+
+            return result
+
+        return wrappedF
+
+def add(logger, a, b):
+    return a + b
+
+def perCall(f, nCalls):
+    # Run time per call in ns
+    t0 = perf_counter()
+    for i in range(nCalls):
+        f(i, 1)
+    return (perf_counter() - t0) / nCalls * 1e9
+
+def main():
+    base   = 'benchLogDecorator'
+    logger = logging.getLogger(base)
+    logger.addHandler(logging.StreamHandler(io.StringIO()))
+    logger.propagate = False
+
+    variants = {
+        'bare'      : lambda a, b: add(None, a, b),
+        'old'       : logOld(base + '.add')(add),
+        'verbose'   : lD.log(base + '.add', mode='verbose')(add),
+        'histogram' : lD.log(base + '.add', mode='histogram')(add),
+    }
+
+    print(f'{"level":>8s} {"calls":>9s} ' + ' '.join(f'{k + " [ns]":>15s}' for k in variants))
+    for level in [logging.INFO, logging.WARNING]:
+        logger.setLevel(level)
+        for nCalls in [10**4, 10**5, 10**6]:
+            times = [perCall(f, nCalls) for f in variants.values()]
+            print(f'{logging.getLevelName(level):>8s} {nCalls:9d} ' + ' '.join(f'{t:15.1f}' for t in times))
+
+    return
+
+if __name__ == '__main__':
+    main()
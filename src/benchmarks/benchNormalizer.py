@@ -0,0 +1,57 @@
+'''Benchmark ``cleanData.cleanRace`` and ``cleanData.cleanSex``
+
+Compares the rule-driven normalization of ``normalizer.RuleNormalizer`` 
+against the original sequence of masks and regex replacements, over 
+synthetic demographics of 100k to 10M rows.
+'''
+
+from time import time
+import pandas as pd
+from modules.VDL import cleanData
+from benchmarks import synthData
+
+def cleanOld(df):
+    # The original implementation of cleanData.cleanRace and cleanData.cleanSex
+    df.loc[df.Race=='','Race'] = 'other'
+    df.loc[df.Race.str.startswith('multiracial'),'Race'] = 'mixed race'
+    df.loc[df.Race.str.startswith('white'),'Race'] = 'white'
+    df.loc[df.Race.str.startswith('black'),'Race'] = 'black'
+    df.loc[df.Race.str.startswith('asian'),'Race'] = 'asian'
+    df.loc[df.Race.str.startswith('hispanic'),'Race'] = 'hispanic'
+    df.loc[df.Race.str.contains('or'),'Race'] = 'other'
+    df.loc[df.Race.str.contains('other'),'Race'] = 'other'
+    df.loc[df.Race.str.contains('pacific'),'Race'] = 'native american'
+    df.loc[df.Race.str.contains('hawaiian'),'Race'] = 'native american'
+    df.Race = df.Race.replace({'^[a-z]{1}$|[0-9]':'other',
+                        'mexican|puerto rican|jamaican|dominican' : 'hispanic',
+                        'caucasian' : 'white',
+                        'african american' : 'black',
+                        'americanindianalaskannative': 'native american',
+                        'amer indian/alaskan native' : 'native american',
+                        'mixed race|multi raci|biracial|multiracial' : 'mixed race',
+                        'unable to obtain|other race|declined to specify|unknown|otherotherotherother-other|other not elsewhere classified|declined|patient unavailable':'other'
+                        },
+                        regex=True)
+    df.loc[~df.Sex.isin(['M','F']),'Sex'] = 'Unknown'
+    return df
+
+def main():
+    print(f'{"rows":>10s} {"old [s]":>10s} {"new [s]":>10s} {"speedup":>8s}')
+    for nRows in [10**5, 10**6, 10**7]:
+        demogs = synthData.rawDemographics(nRows)
+
+        t0  = time()
+        old = cleanOld(demogs.copy())
+        tOld = time() - t0
+
+        t0  = time()
+        new = cleanData.cleanSex(cleanData.cleanRace(demogs.copy()))
+        tNew = time() - t0
+
+        pd.testing.assert_frame_equal(new, old, check_dtype=False)
+        print(f'{nRows:10d} {tOld:10.4f} {tNew:10.4f} {tOld/tNew:8.1f}')
+
+    return
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+'''Benchmark the COPY paths of ``pgIO`` against the cursor paths
+
+Uploads synthetic visits into a temporary table of a local PostgreSQL database
+with ``commitDataList()`` and with ``copyFrom()``, and downloads them again with
+the original ``PullData`` loop (``getDataIterator()`` into a list of tuples),
+with ``getAdaptiveIterator()`` into column buffers, and with ``copyToColumns()``.
+
+The database is the ``defaultDB`` within ``../config/db.json``, or the one given
+as the first argument. The benchmark is skipped when no database is available.
+The table ``public.bench_pg_copy`` is created and dropped again.
+'''
+
+import sys
+import pandas as pd
+from time import time
+from lib.databaseIO import pgIO
+from lib.databaseIO.columnBuffer import ColumnBuffers
+from benchmarks import synthData
+
+table   = 'public.bench_pg_copy'
+columns = ['PatientID', 'VisitID', 'Days', 'VisitType', 'CGI', 'Medication', 'DiseaseCat']
+
+def pullOld(dbName):
+    dataBuffer = []
+    for data in pgIO.getDataIterator(f'select * from {table}', dbName=dbName, chunks=1000):
+        dataBuffer += data
+    return pd.DataFrame(dataBuffer, columns=columns)
+
+def pullAdaptive(dbName):
+    dataBuffer = ColumnBuffers(columns)
+    for data in pgIO.getAdaptiveIterator(f'select * from {table}', dbName=dbName):
+        dataBuffer.append(data)
+    return dataBuffer.toDataFrame()
+
+def pullCopy(dbName):
+    return pgIO.copyToColumns(f'select * from {table}', columns, dbName=dbName).toDataFrame()
+
+def main():
+    dbName = sys.argv[1] if len(sys.argv) > 1 else None
+    try:
+        pgIO.getPool(dbName)
+    except Exception as e:
+        print(f'Skipping the COPY benchmark, no database is available: {e}')
+        return
+
+    create = f'''create table {table} (patientid integer, visitid integer, days integer,
+        visit_type text, cgi real, medication text, diseasecat text)'''
+
+    print(f'{"rows":>10s} {"path":>22s} {"time [s]":>10s}')
+    for nRows in [10**4, 10**5, 10**6]:
+        visits = synthData.visits(nRows)[columns]
+        rows   = list(visits.itertuples(index=False, name=None))
+
+        for name, upload in [('commitDataList', lambda: pgIO.commitDataList(f'insert into {table} values %s', rows, dbName=dbName)),
+                             ('copyFrom',       lambda: pgIO.copyFrom(table, visits, dbName=dbName))]:
+            pgIO.commitData(f'drop table if exists {table}', dbName=dbName)
+            pgIO.commitData(create, dbName=dbName)
+            t0 = time()
+            upload()
+            print(f'{nRows:10d} {name:>22s} {time()-t0:10.4f}')
+
+        for name, pull in [('getDataIterator', pullOld), ('getAdaptiveIterator', pullAdaptive),
+                           ('copyToColumns', pullCopy)]:
+            t0 = time()
+            df = pull(dbName)
+            print(f'{nRows:10d} {name:>22s} {time()-t0:10.4f}')
+            assert len(df) == nRows
+
+    pgIO.commitData(f'drop table if exists {table}', dbName=dbName)
+
+    return
+
+if __name__ == '__main__':
+    main()
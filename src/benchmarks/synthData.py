@@ -0,0 +1,142 @@
+'''Synthetic data with the same layout as the Mindlinc extracts
+'''
+
+import numpy as np
+import pandas as pd
+
+medications = ['prozac', 'zoloft', 'lexapro', 'abilify', 'lithium', 'celexa', 
+               'wellbutrin', 'seroquel', 'cymbalta', 'effexor']
+diseases    = ['major depressive disorder', 'anxiety disorders', 'bipolar disorder',
+               'substance related disorders', 'others']
+races       = ['white', 'black', 'asian', 'hispanic', 'native american', 'other']
+
+# Race and sex values as they are found in the database
+rawRaces    = ['', 'white', 'white/caucasian', 'caucasian', 'black', 'black or african american',
+               'african american', 'asian', 'asian indian', 'hispanic', 'hispanic/latino',
+               'mexican', 'puerto rican', 'jamaican', 'dominican', 'multiracial', 'multi racial',
+               'biracial', 'mixed race', 'pacific islander', 'native hawaiian',
+               'americanindianalaskannative', 'amer indian/alaskan native', 'other race',
+               'unknown', 'declined to specify', 'declined', 'unable to obtain', 'patient unavailable',
+               'other not elsewhere classified', 'otherotherotherother-other', 'x', 'w', '5', 'race 2']
+rawSexes    = ['M', 'F', 'U', 'm', 'female', '', 'X']
+
+def demographics(nPatients, seed=2019):
+    '''generate demographics data
+
+    Parameters
+    ----------
+    nPatients : {int}
+        number of patients
+    seed : {int}, optional
+        seed for the random number generator (the default is 2019)
+
+    Returns
+    -------
+    pandas.DataFrame
+        Data with the columns ``PatientID``, ``Sex``, ``Race`` and ``Age``
+    '''
+    rng = np.random.RandomState(seed)
+    age = rng.randint(18, 90, nPatients).astype(float)
+    age[rng.rand(nPatients) < 0.01] = np.nan
+    return pd.DataFrame({
+        'PatientID' : np.arange(1, nPatients + 1),
+        'Sex'       : rng.choice(['M', 'F', 'Unknown'], nPatients, p=[0.45, 0.45, 0.1]),
+        'Race'      : rng.choice(races, nPatients),
+        'Age'       : age})
+
+def rawDemographics(nPatients, seed=2019):
+    '''generate demographics data before cleaning
+
+    Parameters
+    ----------
+    nPatients : {int}
+        number of patients
+    seed : {int}, optional
+        seed for the random number generator (the default is 2019)
+
+    Returns
+    -------
+    pandas.DataFrame
+        Data with the columns ``PatientID``, ``Sex``, ``Race`` and ``Age``, 
+        where ``Sex`` and ``Race`` have the values found in the database
+    '''
+    df = demographics(nPatients, seed)
+    rng = np.random.RandomState(seed + 1)
+    df['Sex']  = rng.choice(rawSexes, nPatients)
+    df['Race'] = rng.choice(rawRaces, nPatients)
+    return df
+
+def visits(nRows, nPatients=None, seed=2019):
+    '''generate visits data
+
+    Rows are sorted by ``PatientID`` like the extracted data, but the visits
+    of a patient are not sorted by ``Days``.
+
+    Parameters
+    ----------
+    nRows : {int}
+        number of rows
+    nPatients : {int}, optional
+        number of patients (the default is None, which results in an average
+        of 20 rows per patient)
+    seed : {int}, optional
+        seed for the random number generator (the default is 2019)
+
+    Returns
+    -------
+    pandas.DataFrame
+        Data with the columns of the visits data
+    '''
+    rng = np.random.RandomState(seed)
+    if nPatients is None:
+        nPatients = max(nRows // 20, 1)
+    cgi = rng.randint(1, 8, nRows).astype(float)
+    cgi[rng.rand(nRows) < 0.05] = np.nan
+    return pd.DataFrame({
+        'PatientID'  : np.sort(rng.randint(1, nPatients + 1, nRows)),
+        'VisitID'    : np.arange(nRows),
+        'Days'       : rng.randint(0, 2000, nRows),
+        'VisitType'  : rng.choice(['inpatient', 'outpatient', 'emergency'], nRows),
+        'CGI'        : cgi,
+        'Medication' : rng.choice(medications, nRows),
+        'DiseaseCat' : rng.choice(diseases, nRows)})
+
+def dsmTable():
+    '''generate a table of DSM codes for every disease category
+
+    Returns
+    -------
+    pandas.DataFrame
+        Data with the same columns as ``dsmno_regex.csv``: ``disorders``,
+        ``counts``, ``regex`` and ``dsmno``
+    '''
+    return pd.DataFrame({
+        'disorders' : ['major depressive disorder', 'bipolar disorder', 'anxiety disorders',
+                       'substance related disorders', 'others'],
+        'counts'    : [100, 50, 40, 30, 10],
+        'regex'     : [r'^296\.[23]|^311', r'^296\.[4-8]', r'^300\.[02]', r'^30[34]\.', r'.*'],
+        'dsmno'     : ["('296.2', '296.3', '311')", "('296.4')", "('300.0', '300.2')",
+                       "('303.9', '304.0')", "()"]})
+
+def dsmCodes(nRows, nCodes=500, seed=2019):
+    '''generate DSM codes for visits
+
+    Parameters
+    ----------
+    nRows : {int}
+        number of rows
+    nCodes : {int}, optional
+        number of distinct codes (the default is 500)
+    seed : {int}, optional
+        seed for the random number generator (the default is 2019)
+
+    Returns
+    -------
+    numpy.ndarray
+        DSM codes, some of which do not belong to any category
+    '''
+    rng = np.random.RandomState(seed)
+    prefixes = ['296.2', '296.3', '296.4', '296.8', '300.0', '300.2', '303.9', 
+                '304.0', '309.8', '311', 'V62.8', 'code ']
+    codes = np.array(['{}{}'.format(rng.choice(prefixes), rng.randint(0, 100)) for _ in range(nCodes)])
+    return codes[rng.randint(0, nCodes, nRows)]
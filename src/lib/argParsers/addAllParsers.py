@@ -1,9 +1,13 @@
 from lib.argParsers import config as cf
+from lib.argParsers import execution as ex
+from lib.argParsers import profile as pf
+from lib.argParsers import getData as gd
 
 from logs import logDecorator as lD
-import jsonref, copy
+import copy
+from lib.configService import configService as cS
 
-config = jsonref.load(open('../config/config.json'))
+config = cS.getConfig('config.json')
 logBase = config['logging']['logBase'] + '.lib.argParsers.addAllParsers'
 
 @lD.log(logBase + '.parsersAdd')
@@ -30,6 +34,9 @@ def parsersAdd(logger, parser):
     '''
 
     parser = cf.addParsers(parser)
+    parser = ex.addParsers(parser)
+    parser = pf.addParsers(parser)
+    parser = gd.addParsers(parser)
 
     return parser
 
@@ -109,6 +116,9 @@ def decodeParsers(logger, args):
     configCLA['logging'] = cf.decodeParser(args)
 
     allConfigs['config'] = configCLA
+    allConfigs['execution'] = ex.decodeParser(args)
+    allConfigs['profile'] = pf.decodeParser(args)
+    allConfigs['getData'] = gd.decodeParser(args)
 
     return allConfigs
 
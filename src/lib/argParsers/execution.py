@@ -0,0 +1,146 @@
+from logs import logDecorator as lD
+from lib.configService import configService as cS
+
+config = cS.getConfig('config.json')
+logBase = config['logging']['logBase'] + '.lib.argParsers.execution'
+
+@lD.log(logBase + '.parsersAdd')
+def addParsers(logger, parser):
+    '''add argument parsers specific to the ``config/execution.json`` file
+    
+    This function is going to add argument parsers specific to the 
+    ``config/execution.json`` file. This file determines how the 
+    modules are run.
+    
+    Parameters
+    ----------
+    logger : {logging.Logger}
+        The logger used for logging error information
+    parser : {argparse.ArgumentParser instance}
+        An instance of ``argparse.ArgumentParser()`` that will be
+        used for parsing the command line arguments specific to the 
+        config file
+    
+    Returns
+    -------
+    argparse.ArgumentParser instance
+        The same parser argument to which new CLI arguments have been
+        appended
+    '''
+    
+    parser.add_argument("--execution_mode", 
+        type=str, 
+        choices=['graph', 'sequential'],
+        help="run the modules in the order of the graph, or of modules.json")
+    parser.add_argument("--execution_maxWorkers", 
+        type = int,
+        help = "number of modules run at once")
+    parser.add_argument("--execution_force", 
+        action="store_true",
+        help="run the modules even if they are up to date")
+    parser.add_argument("--execution_cache_todo", 
+        action="store_true",
+        help="skip the modules that are up to date")
+    parser.add_argument("--execution_cache_stateFile", 
+        type = str,
+        help = "file in which the hashes of the modules are saved")
+    parser.add_argument("--execution_importProfile_todo", 
+        action="store_true",
+        help="run with python -X importtime and report the slowest imports")
+    parser.add_argument("--execution_processes_todo", 
+        action="store_true",
+        help="run every module within a process of its own")
+    parser.add_argument("--execution_processes_timeout", 
+        type = float,
+        help = "seconds after which the process of a module is terminated")
+    parser.add_argument("--execution_processes_memoryMB", 
+        type = float,
+        help = "limit of the memory of the process of a module in MB")
+
+    return parser
+
+@lD.log(logBase + '.decodeParser')
+def decodeParser(logger, args):
+    '''generate a dictionary from the parsed args
+    
+    The parsed args may/may not be present. When they are
+    present, they are pretty hard to use. For this reason,
+    this function is going to convert the result into
+    something meaningful.
+    
+    Parameters
+    ----------
+    logger : {logging.Logger}
+        The logger used for logging error information
+    args : {args Namespace}
+        parsed arguments from the command line
+    
+    Returns
+    -------
+    dict
+        Dictionary that converts the arguments into something
+        meaningful
+    '''
+
+    values = {
+        'cache'         : {},
+        'processes'     : {},
+        'importProfile' : {}
+    }
+    
+    try:
+        if args.execution_mode is not None:
+            values['mode'] = args.execution_mode
+    except Exception as e:
+        logger.error('Unable to decode the argument execution_mode :{}'.format(
+            e))
+    try:
+        if args.execution_maxWorkers is not None:
+            values['maxWorkers'] = args.execution_maxWorkers
+    except Exception as e:
+        logger.error('Unable to decode the argument execution_maxWorkers :{}'.format(
+            e))
+    try:
+        if args.execution_force is not None:
+            values['force'] = args.execution_force
+    except Exception as e:
+        logger.error('Unable to decode the argument execution_force :{}'.format(
+            e))
+    try:
+        if args.execution_cache_todo is not None:
+            values['cache']['todo'] = args.execution_cache_todo
+    except Exception as e:
+        logger.error('Unable to decode the argument execution_cache_todo :{}'.format(
+            e))
+    try:
+        if args.execution_cache_stateFile is not None:
+            values['cache']['stateFile'] = args.execution_cache_stateFile
+    except Exception as e:
+        logger.error('Unable to decode the argument execution_cache_stateFile :{}'.format(
+            e))
+    try:
+        if args.execution_importProfile_todo is not None:
+            values['importProfile']['todo'] = args.execution_importProfile_todo
+    except Exception as e:
+        logger.error('Unable to decode the argument execution_importProfile_todo :{}'.format(
+            e))
+    try:
+        if args.execution_processes_todo is not None:
+            values['processes']['todo'] = args.execution_processes_todo
+    except Exception as e:
+        logger.error('Unable to decode the argument execution_processes_todo :{}'.format(
+            e))
+    try:
+        if args.execution_processes_timeout is not None:
+            values['processes']['timeout'] = args.execution_processes_timeout
+    except Exception as e:
+        logger.error('Unable to decode the argument execution_processes_timeout :{}'.format(
+            e))
+    try:
+        if args.execution_processes_memoryMB is not None:
+            values['processes']['memoryMB'] = args.execution_processes_memoryMB
+    except Exception as e:
+        logger.error('Unable to decode the argument execution_processes_memoryMB :{}'.format(
+            e))
+    
+    return values
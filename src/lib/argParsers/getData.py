@@ -0,0 +1,73 @@
+from logs import logDecorator as lD
+from lib.configService import configService as cS
+
+config = cS.getConfig('config.json')
+logBase = config['logging']['logBase'] + '.lib.argParsers.getData'
+
+@lD.log(logBase + '.parsersAdd')
+def addParsers(logger, parser):
+    '''add argument parsers specific to the ``config/modules/getData.json`` file
+    
+    This function is going to add argument parsers specific to the 
+    ``config/modules/getData.json`` file. ``--getData_full`` is a short 
+    form of ``--getData_params_extraction_full``, and rebuilds the 
+    extracted datasets from scratch, rather than updating them with 
+    the new visits.
+    
+    Parameters
+    ----------
+    logger : {logging.Logger}
+        The logger used for logging error information
+    parser : {argparse.ArgumentParser instance}
+        An instance of ``argparse.ArgumentParser()`` that will be
+        used for parsing the command line arguments specific to the 
+        config file
+    
+    Returns
+    -------
+    argparse.ArgumentParser instance
+        The same parser argument to which new CLI arguments have been
+        appended
+    '''
+    
+    parser.add_argument("--getData_full", "--getData_params_extraction_full", 
+        dest    = "getData_params_extraction_full",
+        action  = "store_true",
+        default = None,
+        help    = "extract the datasets again from scratch, ignoring the watermarks")
+
+    return parser
+
+@lD.log(logBase + '.decodeParser')
+def decodeParser(logger, args):
+    '''generate a dictionary from the parsed args
+    
+    The parsed args may/may not be present. When they are
+    present, they are pretty hard to use. For this reason,
+    this function is going to convert the result into
+    something meaningful.
+    
+    Parameters
+    ----------
+    logger : {logging.Logger}
+        The logger used for logging error information
+    args : {args Namespace}
+        parsed arguments from the command line
+    
+    Returns
+    -------
+    dict
+        Dictionary that converts the arguments into something
+        meaningful
+    '''
+
+    values = {}
+    
+    try:
+        if args.getData_params_extraction_full is not None:
+            values['params'] = {'extraction': {'full': args.getData_params_extraction_full}}
+    except Exception as e:
+        logger.error('Unable to decode the argument getData_params_extraction_full :{}'.format(
+            e))
+    
+    return values
@@ -0,0 +1,91 @@
+from logs import logDecorator as lD
+from lib.configService import configService as cS
+
+config = cS.getConfig('config.json')
+logBase = config['logging']['logBase'] + '.lib.argParsers.profile'
+
+@lD.log(logBase + '.parsersAdd')
+def addParsers(logger, parser):
+    '''add argument parsers specific to the ``config/profile.json`` file
+    
+    This function is going to add argument parsers specific to the 
+    ``config/profile.json`` file. This file determines whether, and 
+    how, the run is profiled. ``--profile`` is a short form of 
+    ``--profile_todo``.
+    
+    Parameters
+    ----------
+    logger : {logging.Logger}
+        The logger used for logging error information
+    parser : {argparse.ArgumentParser instance}
+        An instance of ``argparse.ArgumentParser()`` that will be
+        used for parsing the command line arguments specific to the 
+        config file
+    
+    Returns
+    -------
+    argparse.ArgumentParser instance
+        The same parser argument to which new CLI arguments have been
+        appended
+    '''
+    
+    parser.add_argument("--profile", "--profile_todo", 
+        dest    = "profile_todo",
+        action  = "store_true",
+        default = None,
+        help    = "profile the run, and write the folded stacks to the log folder")
+    parser.add_argument("--profile_interval", 
+        type = float,
+        help = "seconds between two samples of the stacks")
+    parser.add_argument("--profile_dash", 
+        type    = lambda v: v.lower() in ['true', '1', 'yes'],
+        metavar = "{true,false}",
+        help    = "profile every callback of the Dash app separately")
+
+    return parser
+
+@lD.log(logBase + '.decodeParser')
+def decodeParser(logger, args):
+    '''generate a dictionary from the parsed args
+    
+    The parsed args may/may not be present. When they are
+    present, they are pretty hard to use. For this reason,
+    this function is going to convert the result into
+    something meaningful.
+    
+    Parameters
+    ----------
+    logger : {logging.Logger}
+        The logger used for logging error information
+    args : {args Namespace}
+        parsed arguments from the command line
+    
+    Returns
+    -------
+    dict
+        Dictionary that converts the arguments into something
+        meaningful
+    '''
+
+    values = {}
+    
+    try:
+        if args.profile_todo is not None:
+            values['todo'] = args.profile_todo
+    except Exception as e:
+        logger.error('Unable to decode the argument profile_todo :{}'.format(
+            e))
+    try:
+        if args.profile_interval is not None:
+            values['interval'] = args.profile_interval
+    except Exception as e:
+        logger.error('Unable to decode the argument profile_interval :{}'.format(
+            e))
+    try:
+        if args.profile_dash is not None:
+            values['dash'] = args.profile_dash
+    except Exception as e:
+        logger.error('Unable to decode the argument profile_dash :{}'.format(
+            e))
+    
+    return values
@@ -1,18 +1,19 @@
 from logs import logDecorator as lD
-import jsonref, psycopg2
+from logs import asyncLogstash
 from celery import Celery
-import logging
+import logging, sys
 
 from datetime import datetime as dt
 
 from celery.signals import after_setup_logger
+from lib.configService import configService as cS
 
 
-config   = jsonref.load(open('../config/config.json'))
+config   = cS.getConfig('config.json')
 logBase  = config['logging']['logBase']
 logLevel = config['logging']['level']
 logSpecs = config['logging']['specs']
-cConfig  = jsonref.load(open('../config/celery.json'))
+cConfig  = cS.getConfig('celery.json')
 
 logger = logging.getLogger(logBase)
 
@@ -50,18 +51,7 @@ def setup_loggers(logger, *args, **kwargs):
     # Generate a file handler if necessary
     if ('logstash' in logSpecs) and logSpecs['logstash']['todo']:
 
-        tags = [ 'celeryTest' , now]
-
-        if 'tags' in logSpecs['logstash']:
-            tags += logSpecs['logstash']['tags']
-        
-
-        lH = logstash.TCPLogstashHandler(
-            host    = logSpecs['logstash']['host'], 
-            port    = logSpecs['logstash']['port'], 
-            version = logSpecs['logstash']['version'],
-            tags    = tags)
-        
+        lH = asyncLogstash.fromSpecs(logSpecs['logstash'], [ 'celeryTest' , now])
         logger.addHandler(lH)
 
     # set the level of the handler
@@ -1,9 +1,9 @@
 from logs import logDecorator as lD
-import jsonref, psycopg2
 
 from lib.celery.App import app
+from lib.configService import configService as cS
 
-config = jsonref.load(open('../config/config.json'))
+config = cS.getConfig('config.json')
 logBase = config['logging']['logBase'] + 'lib.celeryWorkerExample.worker_1'
 
 @app.task
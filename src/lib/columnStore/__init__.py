@@ -0,0 +1,49 @@
+'''Columnar on-disk storage for DataFrames
+
+This library saves ``pandas.DataFrame`` objects as partitioned, columnar datasets
+rather than as pickles. A dataset is a folder with the following layout:
+
+.. code-block:: bash
+
+    visits_data
+    |-- _meta.json
+    |-- part-00000
+    |   |-- PatientID.npy
+    |   |-- DiseaseCat.npy
+    |   +-- ...
+    +-- part-00001
+        +-- ...
+
+Every column of every partition is a separate NumPy ``.npy`` file. String columns
+are dictionary encoded: the ``.npy`` file contains integer codes, and the list of
+strings (shared by all the partitions) is saved within ``_meta.json``. The metadata
+also contains statistics for every partition: the minimum and maximum of numeric
+columns, and the codes present in dictionary encoded columns.
+
+Since the columns are stored separately, only the columns that are required need
+to be read (column projection). Partitions that cannot contain any row satisfying
+a filter are skipped using the statistics, and the remaining ones are filtered row
+by row (predicate pushdown). Files can also be memory-mapped rather than read.
+The codes are saved with the smallest integer type that holds the dictionary, like
+those of a ``pandas.Categorical``, so that string columns read with ``categorical``
+and ``mmap`` keep their codes memory-mapped as well.
+
+Available functions:
+--------------------
+
+ - ``columnStore.writeDataset(df, path)`` saves a DataFrame
+ - ``columnStore.readDataset(path, columns, filters)`` reads a DataFrame
+ - ``columnStore.iterDataset(path, columns, filters)`` reads a dataset one partition at a time
+ - ``columnStore.DatasetWriter(path)`` appends DataFrames to a dataset chunk by chunk
+ - ``columnStore.convertPickle(pklPath, path)`` converts an old pickled DataFrame
+
+Filters are specified as a dictionary. A ``tuple`` is an inclusive range, while a
+``list`` is a set of allowed values:
+
+.. code-block:: python
+
+    filters = {
+        'PatientID'  : (1000, 2000),
+        'DiseaseCat' : ['major depressive disorder', 'bipolar disorder']}
+
+'''
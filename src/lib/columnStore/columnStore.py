@@ -0,0 +1,519 @@
+from logs import logDecorator as lD
+from logs import timings
+import json, logging, os, shutil, pickle
+import numpy as np
+import pandas as pd
+from lib.configService import configService as cS
+
+config = cS.getConfig('config.json')
+logBase = config['logging']['logBase'] + '.lib.columnStore.columnStore'
+
+metaFile   = '_meta.json'
+indexName  = '__index__'
+
+class DatasetWriter():
+    '''write a dataset one chunk at a time
+
+    Every chunk that is appended is written as one or more partitions. The
+    dictionaries of the string columns are shared by all the partitions, and
+    grow as new values are found. The metadata is written when the writer is
+    closed, so that a partially written dataset is never read. The writer can
+    be used as a context manager.
+    '''
+
+    def __init__(self, path, partitionRows=1000000):
+        '''initialize the writer
+
+        Any existing dataset at ``path`` is replaced when the writer is closed.
+
+        Parameters
+        ----------
+        path : {str}
+            The folder of the dataset
+        partitionRows : {int}, optional
+            Maximum number of rows within a partition (the default is 1000000)
+        '''
+        self.path          = path
+        self.temp          = path.rstrip('/') + '.writing'
+        self.partitionRows = partitionRows
+        self.columns       = None
+        self.dictionaries  = {} # column -> {value: code}
+        self.partitions    = []
+        self.emptyChunk    = None
+
+        if os.path.exists(self.temp):
+            shutil.rmtree(self.temp)
+        os.makedirs(self.temp)
+
+        return
+
+    @staticmethod
+    def _numericValues(series):
+        # The values of a numeric column as a NumPy array. Missing values of
+        # nullable (extension) columns become NaN
+        if series.dtype == object:
+            series = pd.to_numeric(series)
+        if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+            if series.hasnans:
+                return series.to_numpy(dtype='float64', na_value=np.nan)
+            return series.to_numpy(dtype=series.dtype.numpy_dtype)
+        return series.to_numpy()
+
+    @staticmethod
+    def _codesDtype(nCategories):
+        # The integer type that pandas uses for the codes of a Categorical,
+        # so that codes read with mmap are not copied into another type
+        for dtype in (np.int8, np.int16, np.int32):
+            if nCategories < np.iinfo(dtype).max:
+                return np.dtype(dtype)
+        return np.dtype(np.int64)
+
+    def _columnKind(self, series):
+        # Decide how a column is going to be stored. A column without any
+        # value is 'null' until a chunk with values is appended
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return 'category', None
+        if pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_datetime64_dtype(series.dtype):
+            return 'numeric', str(self._numericValues(series).dtype)
+
+        values = series.dropna()
+        if len(values) == 0:
+            return 'null', None
+        if all(isinstance(v, str) for v in values):
+            return 'category', None
+        try:
+            return 'numeric', str(pd.to_numeric(values).dtype)
+        except (ValueError, TypeError):
+            return 'category', None
+
+    def _encode(self, name, series):
+        # Dictionary encode a column with the shared dictionary
+        dictionary = self.dictionaries[name]
+        values = series.astype(object).where(series.notna(), None)
+        if not all(isinstance(v, str) for v in values.dropna()):
+            values = values.map(lambda v: v if v is None else str(v))
+
+        codes, uniques = pd.factorize(values)
+        lut = np.empty(len(uniques) + 1, dtype=np.int32)
+        lut[-1] = -1 # missing values
+        for i, u in enumerate(uniques):
+            if u not in dictionary:
+                dictionary[u] = len(dictionary)
+            lut[i] = dictionary[u]
+
+        return lut[codes].astype(self._codesDtype(len(dictionary)), copy=False)
+
+    def append(self, df):
+        '''append a DataFrame to the dataset
+
+        The index of the first chunk is saved unless it is a default
+        ``RangeIndex``. In that case, the following chunks must also have a
+        default ``RangeIndex`` (starting either at zero or where the previous
+        chunk ended), and the rows are numbered on from the previous chunk.
+
+        Parameters
+        ----------
+        df : {pandas.DataFrame}
+            The data to append. All the chunks must have the same columns.
+        '''
+        if len(df) == 0:
+            # The types of an empty chunk are unreliable, so they are
+            # only used if nothing else is written
+            if self.columns is None:
+                self.emptyChunk = df
+            return
+
+        if self.columns is None:
+            self._setColumns(df)
+
+        if [c['name'] for c in self.columns] != [str(c) for c in df.columns]:
+            raise ValueError('The columns of the chunk do not match the dataset')
+
+        if len(self.partitions) > 0 and not self.hasIndex:
+            start = sum(p['nRows'] for p in self.partitions)
+            if not (isinstance(df.index, pd.RangeIndex) and df.index.step == 1 and df.index.start in (0, start)):
+                raise ValueError('Chunks after the first need a default RangeIndex')
+
+        for start in range(0, len(df), self.partitionRows):
+            self._writePartition(df.iloc[start:start + self.partitionRows])
+
+        return
+
+    def _setColumns(self, df):
+        self.columns = []
+        for c in df.columns:
+            self.columns.append({'name': str(c), 'kind': 'null', 'dtype': None})
+        self.hasIndex = not (isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1)
+        return
+
+    def _resolveColumn(self, c, series):
+        # Find the kind of a column that had no values so far, and widen
+        # the type of a numeric column to that of the chunk, such as int64
+        # to float64 when a chunk has missing values
+        if c['kind'] == 'null':
+            c['kind'], c['dtype'] = self._columnKind(series)
+            if c['kind'] == 'category':
+                self.dictionaries[c['name']] = {}
+
+        if c['kind'] != 'numeric' or (not series.hasnans and series.dtype == c['dtype']):
+            return
+
+        old, new = np.dtype(c['dtype']), self._numericValues(series).dtype
+        if series.hasnans and new.kind in 'iub':
+            new = np.dtype('float64')
+        if (old.kind in 'mM' or new.kind in 'mM') and old.kind != new.kind:
+            raise ValueError('Column {} is {} within the dataset and {} within the chunk'.format(
+                c['name'], old, new))
+        c['dtype'] = str(np.result_type(old, new))
+        return
+
+    def _writePartition(self, df):
+        name   = 'part-{:05d}'.format(len(self.partitions))
+        folder = os.path.join(self.temp, name)
+        os.makedirs(folder)
+        partition = {'name': name, 'nRows': len(df), 'min': {}, 'max': {}, 'codes': {}}
+
+        for c in self.columns:
+            series = df[c['name']]
+            self._resolveColumn(c, series)
+            if c['kind'] == 'null':
+                # Written once the kind of the column is known (see close)
+                continue
+            if c['kind'] == 'category':
+                values = self._encode(c['name'], series)
+                partition['codes'][c['name']] = np.unique(values).tolist()
+            else:
+                values = self._numericValues(series).astype(c['dtype'], copy=False)
+                if len(values) > 0 and values.dtype.kind in 'iuf':
+                    partition['min'][c['name']] = np.nanmin(values).item() if not np.isnan(values).all() else None
+                    partition['max'][c['name']] = np.nanmax(values).item() if not np.isnan(values).all() else None
+            np.save(os.path.join(folder, c['name'] + '.npy'), values, allow_pickle=False)
+
+        if self.hasIndex:
+            np.save(os.path.join(folder, indexName + '.npy'), df.index.to_numpy(), allow_pickle=False)
+
+        self.partitions.append(partition)
+        return
+
+    def _completePartitions(self):
+        # Columns without any value are stored as missing strings. Missing
+        # columns are written into the partitions that came before the
+        # first value of a column, and the partitions written before the
+        # type of a numeric column was widened, or before the dictionary of
+        # a string column outgrew the type of its codes, are converted
+        for c in self.columns:
+            if c['kind'] == 'null':
+                c['kind'] = 'category'
+                self.dictionaries[c['name']] = {}
+
+            if c['kind'] == 'numeric':
+                if any(not os.path.exists(os.path.join(self.temp, p['name'], c['name'] + '.npy')) 
+                        for p in self.partitions) and np.dtype(c['dtype']).kind in 'iub':
+                    c['dtype'] = 'float64'
+
+            if c['kind'] == 'category':
+                dtype = self._codesDtype(len(self.dictionaries[c['name']]))
+            else:
+                dtype = np.dtype(c['dtype'])
+
+            for p in self.partitions:
+                file = os.path.join(self.temp, p['name'], c['name'] + '.npy')
+                if not os.path.exists(file):
+                    if c['kind'] == 'category':
+                        values = np.full(p['nRows'], -1, dtype=dtype)
+                        p['codes'][c['name']] = [-1] if p['nRows'] else []
+                    else:
+                        values = np.full(p['nRows'], np.nan if np.dtype(c['dtype']).kind == 'f' else 'NaT', 
+                                    dtype=c['dtype'])
+                        if p['nRows'] and values.dtype.kind == 'f':
+                            p['min'][c['name']] = p['max'][c['name']] = None
+                    np.save(file, values, allow_pickle=False)
+                else:
+                    values = np.load(file, mmap_mode='r', allow_pickle=False)
+                    if values.dtype != dtype:
+                        values = values.astype(dtype)
+                        np.save(file, values, allow_pickle=False)
+        return
+
+    def close(self):
+        '''write the metadata and move the dataset into place
+        '''
+        if self.columns is None:
+            if self.emptyChunk is None:
+                raise ValueError('Nothing has been written to the dataset')
+            self._setColumns(self.emptyChunk)
+            self._writePartition(self.emptyChunk)
+
+        self._completePartitions()
+
+        meta = {
+            'version'    : 1,
+            'columns'    : self.columns,
+            'hasIndex'   : self.hasIndex,
+            'categories' : {k: list(v.keys()) for k, v in self.dictionaries.items()},
+            'partitions' : self.partitions}
+        with open(os.path.join(self.temp, metaFile), 'w') as f:
+            json.dump(meta, f)
+
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.rename(self.temp, self.path)
+
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if excType is None:
+            self.close()
+        else:
+            shutil.rmtree(self.temp, ignore_errors=True)
+        return False
+
+def readMeta(path):
+    '''read the metadata of a dataset
+
+    Parameters
+    ----------
+    path : {str}
+        The folder of the dataset
+
+    Returns
+    -------
+    dict
+        The metadata of the dataset
+    '''
+    with open(os.path.join(path, metaFile)) as f:
+        return json.load(f)
+
+def _prunePartition(meta, partition, filters):
+    # True if the partition cannot contain a row that satisfies the filters
+    kinds = {c['name']: c['kind'] for c in meta['columns']}
+    for col, cond in filters.items():
+        if kinds[col] == 'category':
+            allowed = [v for v in (cond if isinstance(cond, list) else [cond])]
+            present = set(partition['codes'][col])
+            codes   = {v: i for i, v in enumerate(meta['categories'][col])}
+            if not any(codes.get(v, -2) in present for v in allowed):
+                return True
+        elif (col in partition['min']) and (partition['min'][col] is not None):
+            lo, hi = partition['min'][col], partition['max'][col]
+            if isinstance(cond, tuple):
+                if (cond[1] < lo) or (cond[0] > hi):
+                    return True
+            else:
+                if not any(lo <= v <= hi for v in (cond if isinstance(cond, list) else [cond])):
+                    return True
+    return False
+
+@timings.timed(logBase + '._readPartition')
+def _readPartition(path, meta, partition, start, columns, filters, mmap, categorical):
+    folder = os.path.join(path, partition['name'])
+    kinds  = {c['name']: c['kind'] for c in meta['columns']}
+    mode   = 'r' if mmap else None
+
+    def load(col):
+        return np.load(os.path.join(folder, col + '.npy'), mmap_mode=mode, allow_pickle=False)
+
+    # Evaluate the filters on the raw (encoded) columns
+    rows = None
+    for col, cond in filters.items():
+        values = load(col)
+        if kinds[col] == 'category':
+            lookup = {v: i for i, v in enumerate(meta['categories'][col])}
+            codes  = [lookup[v] for v in (cond if isinstance(cond, list) else [cond]) if v in lookup]
+            mask   = np.isin(values, codes)
+        elif isinstance(cond, tuple):
+            mask = (values >= cond[0]) & (values <= cond[1])
+        else:
+            mask = np.isin(values, cond if isinstance(cond, list) else [cond])
+        rows = mask if rows is None else (rows & mask)
+
+    data = {}
+    for col in columns:
+        values = load(col)
+        if rows is not None:
+            values = values[rows]
+        if kinds[col] == 'category':
+            categories = meta['categories'][col]
+            if categorical:
+                values = pd.Categorical.from_codes(values, categories=categories)
+            else:
+                lut = np.array(categories + [np.nan], dtype=object)
+                values = lut[values] # the code -1 picks the last element
+        data[col] = values
+
+    # Without a saved index, the index is the position of the row
+    if meta['hasIndex']:
+        index = load(indexName)
+    else:
+        index = pd.RangeIndex(start, start + partition['nRows'])
+    if rows is not None:
+        index = index[rows]
+
+    return data, index
+
+def iterDataset(path, columns=None, filters=None, mmap=False, categorical=False):
+    '''read a dataset one partition at a time
+
+    Calling a generator does not run it, so that this is not decorated with
+    ``lD.log``. The reading of every partition is timed instead, under
+    ``_readPartition``.
+
+    Parameters
+    ----------
+    path : {str}
+        The folder of the dataset
+    columns : {list of str}, optional
+        The columns to read (the default is None, which reads all the columns)
+    filters : {dict}, optional
+        Filters for the rows. A ``tuple`` value is an inclusive range, and a
+        ``list`` value is a set of allowed values (the default is None, which
+        reads all the rows)
+    mmap : {bool}, optional
+        Memory-map the files instead of reading them. Columns that are not
+        filtered or decoded are then backed by the page cache (the default
+        is False)
+    categorical : {bool}, optional
+        Return string columns as ``pandas.Categorical`` instead of objects
+        (the default is False). With ``mmap``, the codes of an unfiltered
+        column are then memory-mapped as well.
+
+    Yields
+    ------
+    pandas.DataFrame
+        The data of one partition
+    '''
+    logger  = logging.getLogger(logBase + '.iterDataset')
+    meta    = readMeta(path)
+    filters = filters or {}
+    allCols = [c['name'] for c in meta['columns']]
+    columns = allCols if columns is None else list(columns)
+
+    missing = [c for c in list(columns) + list(filters) if c not in allCols]
+    if missing:
+        raise KeyError(f'Columns {missing} are not present in the dataset {path}')
+
+    start = 0
+    for partition in meta['partitions']:
+        start += partition['nRows']
+        if _prunePartition(meta, partition, filters):
+            logger.debug('Skipping partition {} of {}'.format(partition['name'], path))
+            continue
+
+        data, index = _readPartition(path, meta, partition, start - partition['nRows'],
+            columns, filters, mmap, categorical)
+        yield pd.DataFrame(data, index=index, columns=columns, copy=False)
+
+    return
+
+@lD.log(logBase + '.readDataset')
+def readDataset(logger, path, columns=None, filters=None, mmap=False, categorical=False):
+    '''read a dataset into a DataFrame
+
+    The parameters are the same as those of ``iterDataset()``.
+
+    Parameters
+    ----------
+    logger : {logging.Logger}
+        The logger used for logging error information
+    path : {str}
+        The folder of the dataset
+    columns : {list of str}, optional
+        The columns to read (the default is None, which reads all the columns)
+    filters : {dict}, optional
+        Filters for the rows (the default is None, which reads all the rows)
+    mmap : {bool}, optional
+        Memory-map the files instead of reading them (the default is False)
+    categorical : {bool}, optional
+        Return string columns as ``pandas.Categorical`` (the default is False)
+
+    Returns
+    -------
+    pandas.DataFrame
+        The data that was read
+    '''
+    meta  = readMeta(path)
+    parts = list(iterDataset(path, columns, filters, mmap, categorical))
+
+    if len(parts) == 1:
+        result = parts[0]
+    elif len(parts) == 0:
+        # An empty frame that still has the right columns and types
+        kinds  = {c['name']: c for c in meta['columns']}
+        names  = list(kinds) if columns is None else list(columns)
+        data   = {}
+        for col in names:
+            if kinds[col]['kind'] == 'numeric':
+                data[col] = np.empty(0, dtype=kinds[col]['dtype'])
+            elif categorical:
+                data[col] = pd.Categorical.from_codes([], categories=meta['categories'][col])
+            else:
+                data[col] = pd.Series([], dtype=str)
+        result = pd.DataFrame(data, columns=names)
+    else:
+        result = pd.concat(parts)
+        if not (meta['hasIndex'] or filters):
+            result = result.reset_index(drop=True)
+
+    logger.info('Read {} rows from {}'.format(len(result), path))
+
+    return result
+
+@lD.log(logBase + '.writeDataset')
+def writeDataset(logger, df, path, partitionRows=1000000, sortBy=None):
+    '''write a DataFrame as a dataset
+
+    Parameters
+    ----------
+    logger : {logging.Logger}
+        The logger used for logging error information
+    df : {pandas.DataFrame}
+        The data to write
+    path : {str}
+        The folder of the dataset. An existing dataset is replaced.
+    partitionRows : {int}, optional
+        Maximum number of rows within a partition (the default is 1000000)
+    sortBy : {str or list of str}, optional
+        Columns by which the data is sorted before being written. Sorting by
+        the column used for filtering makes the partition statistics more
+        selective (the default is None, which keeps the order of the rows)
+    '''
+    if sortBy is not None:
+        df = df.sort_values(sortBy, kind='mergesort')
+
+    with DatasetWriter(path, partitionRows=partitionRows) as writer:
+        writer.append(df)
+
+    logger.info('Wrote {} rows to {}'.format(len(df), path))
+
+    return
+
+@lD.log(logBase + '.convertPickle')
+def convertPickle(logger, pklPath, path=None):
+    '''convert a pickled DataFrame into a dataset
+
+    Parameters
+    ----------
+    logger : {logging.Logger}
+        The logger used for logging error information
+    pklPath : {str}
+        Path to the pickled DataFrame
+    path : {str}, optional
+        The folder of the dataset (the default is None, which uses the path
+        of the pickle without the ``.pkl`` extension)
+
+    Returns
+    -------
+    str
+        The folder of the dataset
+    '''
+    if path is None:
+        path = pklPath[:-4] if pklPath.endswith('.pkl') else pklPath + '.dataset'
+
+    with open(pklPath, 'rb') as f:
+        df = pickle.load(f)
+    writeDataset(df, path)
+
+    return path
@@ -0,0 +1,28 @@
+'''Central, cached access to the configuration files
+
+Every library and module reads ``../config/config.json`` (and usually its own
+file within ``../config/modules/``) when it is imported. Parsing these files
+with ``jsonref`` each time adds up, and ``jsonref`` itself pulls in ``requests``.
+``configService.getConfig()`` parses every file once and returns the same object
+afterwards, parsing it again only when the modification time of the file changes.
+Files are parsed with the standard ``json`` module, and ``jsonref`` is only used
+(and imported) for files that contain a ``$ref``.
+
+.. code-block:: python
+
+    from lib.configService import configService as cS
+
+    config  = cS.getConfig('config.json')
+    logBase = config['logging']['logBase'] + '.lib.databaseIO.pgIO'
+    dbConf  = cS.getConfig('modules/getData.json')
+
+The returned objects are shared, so they should be treated as read-only. Copy
+them (``copy.deepcopy()``) before changing them, for example with the values of
+the command line arguments.
+
+Available functions:
+--------------------
+
+ - ``getConfig``: The parsed contents of a file within the ``config`` folder
+ - ``clearCache``: Forget all the parsed files
+'''
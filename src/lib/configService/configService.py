@@ -0,0 +1,53 @@
+import json, os, threading
+
+# The folder of the configuration files, relative to src
+configFolder = '../config'
+
+_cache = {} # path -> (mtime, config)
+_lock  = threading.Lock()
+
+def getConfig(name='config.json', folder=None):
+    '''the parsed contents of a configuration file
+
+    Every file is parsed once, and again only when its modification time
+    changes. The result is shared by all the callers and should not be
+    changed.
+
+    Parameters
+    ----------
+    name : {str}, optional
+        Path of the file relative to the config folder, such as
+        ``'modules/getData.json'`` (the default is ``'config.json'``)
+    folder : {str}, optional
+        The config folder (the default is None, which uses ``configFolder``)
+
+    Returns
+    -------
+    dict
+        The parsed file. References (``$ref``) are resolved with ``jsonref``.
+    '''
+    path  = os.path.join(configFolder if folder is None else folder, name)
+    mtime = os.stat(path).st_mtime_ns
+
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _lock:
+        with open(path) as f:
+            text = f.read()
+        if '$ref' in text:
+            import jsonref
+            config = jsonref.loads(text)
+        else:
+            config = json.loads(text)
+        _cache[path] = (mtime, config)
+
+    return config
+
+def clearCache():
+    '''forget all the parsed files
+    '''
+    with _lock:
+        _cache.clear()
+    return
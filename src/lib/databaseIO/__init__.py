@@ -12,5 +12,37 @@ Available Database Libraries:
 -----------------------------
 
  - Postgres: ``pgIO``
+ - Typed column arrays for query results: ``columnBuffer``
+ - CSV streams for ``COPY`` statements: ``copyStream``
+
+Connection pooling:
+-------------------
+
+The configuration within ``../config/db.json`` is read once, and connections
+to each database are borrowed from a pool rather than opened for every query.
+The optional ``pool`` item of a database sets the number of connections kept
+open (``minSize``), the number of connections that may be in use at once
+(``maxSize``), and the number of seconds after which an idle connection is
+checked before it is used (``healthCheckAfter``). The pools are thread safe,
+and ``pgIO.getPoolStats()`` returns their statistics.
+
+Streaming large results:
+------------------------
+
+``pgIO.getAdaptiveIterator()`` fetches a large result in chunks of roughly a fixed
+size in memory, adjusting the number of rows per chunk to the width of the rows.
+Each chunk can be appended to ``columnBuffer.ColumnBuffers``, which keeps the
+values as typed NumPy arrays (with strings dictionary encoded), so that only one
+chunk at a time is held as Python tuples.
+
+For the largest transfers, ``pgIO.copyToColumns()`` and ``pgIO.copyFrom()`` use
+``COPY ... TO STDOUT`` and ``COPY ... FROM STDIN`` with CSV data, which is decoded
+into (or encoded from) the columns a chunk at a time. ``benchmarks.benchPgCopy``
+compares these paths against the cursor based ones on a local database.
+
+Large lists of ids should not be written into the text of a query. Instead, pass
+them with the ``stage`` argument of ``getAllData()``, ``getAdaptiveIterator()`` or
+``copyToColumns()``. They are then uploaded into temporary tables (see
+``pgIO.stageTables()``) that the query can join against.
 
 '''
\ No newline at end of file
@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+from decimal import Decimal
+
+class ColumnBuffers():
+    '''typed, growable column arrays for query results
+
+    Rows fetched from the database (lists of tuples) are appended one chunk at
+    a time, and are immediately split into one NumPy array per column. Hence,
+    only the current chunk exists as Python tuples, and the memory used is close
+    to that of the final columnar result.
+
+    The type of every column is found from the values. Integers are kept as
+    ``int64`` (or ``float64`` once a ``NULL`` is seen), other numbers (including
+    ``Decimal``) as ``float64``, and booleans as ``bool``. Strings are dictionary
+    encoded as ``int32`` codes. Any other column is kept as Python objects.
+    '''
+
+    def __init__(self, columns, capacity=1024):
+        '''initialize the buffers
+
+        Parameters
+        ----------
+        columns : {list of str}
+            The names of the columns of the query
+        capacity : {int}, optional
+            Initial number of rows allocated. The arrays double in size
+            when they are full (the default is 1024)
+        '''
+        self.columns      = list(columns)
+        self.nRows        = 0
+        self.capacity     = capacity
+        self.kinds        = [None] * len(self.columns)
+        self.arrays       = [None] * len(self.columns)
+        self.dictionaries = [None] * len(self.columns)
+        return
+
+    def __len__(self):
+        return self.nRows
+
+    @staticmethod
+    def _kindOf(values):
+        # The narrowest kind that holds all the values of a chunk
+        types = set(map(type, values))
+        hasNull = type(None) in types
+        types.discard(type(None))
+
+        if len(types) == 0:
+            return 'null'
+        if types == {bool}:
+            return 'object' if hasNull else 'bool'
+        if types <= {int}:
+            return 'float' if hasNull else 'int'
+        if types <= {int, float, Decimal}:
+            return 'float'
+        if types == {str}:
+            return 'str'
+        return 'object'
+
+    @staticmethod
+    def _merge(old, new):
+        # The kind that holds the values of two kinds
+        if old is None or old == new:
+            return new
+        if new == 'null':
+            return {'int': 'float', 'bool': 'object'}.get(old, old)
+        if old == 'null':
+            return {'int': 'float', 'bool': 'object'}.get(new, new)
+        if {old, new} == {'int', 'float'}:
+            return 'float'
+        return 'object'
+
+    def _allocate(self, kind, capacity):
+        if kind == 'int':
+            return np.zeros(capacity, dtype=np.int64)
+        if kind == 'float':
+            return np.full(capacity, np.nan)
+        if kind == 'bool':
+            return np.zeros(capacity, dtype=bool)
+        if kind == 'str':
+            return np.full(capacity, -1, dtype=np.int32)
+        return np.full(capacity, None, dtype=object)
+
+    def _decoded(self, i):
+        # The values of column i so far as Python objects
+        kind = self.kinds[i]
+        if kind in (None, 'null'):
+            return np.full(self.nRows, None, dtype=object)
+        values = self.arrays[i][:self.nRows]
+        if kind == 'str':
+            lut = np.array(list(self.dictionaries[i]) + [None], dtype=object)
+            return lut[values]
+        if kind == 'float':
+            return np.where(np.isnan(values), None, values.astype(object))
+        return values.astype(object)
+
+    def _convert(self, i, kind):
+        # Change the kind of column i, converting the values so far
+        old = self.kinds[i]
+        array = self._allocate(kind, self.capacity)
+        if old == 'int' and kind == 'float':
+            array[:self.nRows] = self.arrays[i][:self.nRows]
+        elif kind == 'object':
+            array[:self.nRows] = self._decoded(i)
+        elif kind == 'str':
+            self.dictionaries[i] = {}
+        self.kinds[i], self.arrays[i] = kind, array
+        return
+
+    def append(self, rows):
+        '''append a chunk of rows
+
+        Parameters
+        ----------
+        rows : {list of tuples}
+            Rows as returned by the database cursor
+        '''
+        if len(rows) > 0:
+            self.appendColumns(list(zip(*rows)))
+        return
+
+    def appendColumns(self, columns):
+        '''append a chunk of rows, given as one sequence per column
+
+        Parameters
+        ----------
+        columns : {list of sequences}
+            The values of every column, all of the same length
+        '''
+        n = len(columns[0]) if len(columns) > 0 else 0
+        if n == 0:
+            return
+
+        if self.nRows + n > self.capacity:
+            while self.nRows + n > self.capacity:
+                self.capacity *= 2
+            for i, kind in enumerate(self.kinds):
+                if kind is not None:
+                    array = self._allocate(kind, self.capacity)
+                    array[:self.nRows] = self.arrays[i][:self.nRows]
+                    self.arrays[i] = array
+
+        start, stop = self.nRows, self.nRows + n
+        for i, values in enumerate(columns):
+            kind = self._merge(self.kinds[i], self._kindOf(values))
+            if kind != self.kinds[i]:
+                if self.kinds[i] is None:
+                    self.kinds[i], self.arrays[i] = kind, self._allocate(kind, self.capacity)
+                    if kind == 'str':
+                        self.dictionaries[i] = {}
+                else:
+                    self._convert(i, kind)
+
+            if kind == 'int' or kind == 'bool':
+                self.arrays[i][start:stop] = values
+            elif kind == 'float':
+                self.arrays[i][start:stop] = [np.nan if v is None else float(v) for v in values]
+            elif kind == 'str':
+                d = self.dictionaries[i]
+                self.arrays[i][start:stop] = [-1 if v is None else d.setdefault(v, len(d)) for v in values]
+            elif kind == 'object':
+                array = self.arrays[i]
+                for j, v in enumerate(values):
+                    array[start + j] = v
+
+        self.nRows = stop
+        return
+
+    def toDataFrame(self, categorical=False):
+        '''the buffered rows as a DataFrame
+
+        Parameters
+        ----------
+        categorical : {bool}, optional
+            Return string columns as ``pandas.Categorical`` instead of Python
+            strings (the default is False)
+
+        Returns
+        -------
+        pandas.DataFrame
+            The data, with the columns in the order of the query
+        '''
+        data = {}
+        for i, col in enumerate(self.columns):
+            kind = self.kinds[i]
+            if kind == 'str' and categorical:
+                data[col] = pd.Categorical.from_codes(self.arrays[i][:self.nRows],
+                                categories=list(self.dictionaries[i]))
+            elif kind in ('str', 'null', None):
+                data[col] = self._decoded(i)
+            else:
+                data[col] = self.arrays[i][:self.nRows]
+
+        return pd.DataFrame(data, columns=self.columns)
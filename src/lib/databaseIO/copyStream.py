@@ -0,0 +1,170 @@
+import io, csv, datetime
+import pandas as pd
+
+# The text of NULL values within the CSV data. A string with the same text is
+# quoted by Postgres, but the quotes are lost by the csv module, so such strings
+# are read back as NULL.
+nullText = '\\N'
+
+# Postgres type OIDs, and the conversion of their CSV text
+converters = {
+    16   : lambda v: v == 't',                      # bool
+    20   : int, 21 : int, 23 : int, 26 : int,      # int8, int2, int4, oid
+    700  : float, 701 : float, 1700 : float,        # float4, float8, numeric
+    1082 : datetime.date.fromisoformat,             # date
+    1114 : datetime.datetime.fromisoformat,         # timestamp
+}
+
+class CopyDecoder(io.TextIOBase):
+    '''decode the output of ``COPY ... TO STDOUT`` into column buffers
+
+    This is the file that ``cursor.copy_expert()`` writes into. The CSV text is
+    collected until roughly ``chunkMB`` is available. The complete rows are then
+    parsed, converted with the type of each column, and appended to the column
+    buffers, so that no more than one chunk of text is held at a time.
+    '''
+
+    def __init__(self, buffers, typeCodes, chunkMB=4):
+        '''initialize the decoder
+
+        Parameters
+        ----------
+        buffers : {columnBuffer.ColumnBuffers}
+            The buffers into which the rows are appended
+        typeCodes : {list of int}
+            The type OID of every column, as given by ``cursor.description``.
+            Columns of other types are kept as strings.
+        chunkMB : {number}, optional
+            Size of the text parsed at a time in MB (the default is 4)
+        '''
+        self.buffers    = buffers
+        self.converters = [converters.get(t, None) for t in typeCodes]
+        self.chunkChars = int(chunkMB * 1024 * 1024)
+        self.parts, self.size = [], 0
+        return
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(data)
+        self.size += len(data)
+        if self.size >= self.chunkChars:
+            self.flush()
+        return len(data)
+
+    def flush(self, final=False):
+        '''parse the complete rows collected so far
+
+        Parameters
+        ----------
+        final : {bool}, optional
+            All the data has been written, so the remaining text is parsed
+            even if it does not end with a newline (the default is False)
+        '''
+        text = ''.join(self.parts)
+        self.parts, self.size = [], 0
+
+        # A newline ends a row only outside of quotes. Since quotes within
+        # values are doubled, that is where the number of quotes is even.
+        end = len(text)
+        if not final:
+            end = text.rfind('\n')
+            while end >= 0 and text.count('"', 0, end) % 2 == 1:
+                end = text.rfind('\n', 0, end)
+            end += 1
+            if end < len(text):
+                self.parts, self.size = [text[end:]], len(text) - end
+
+        if end > 0:
+            self._parse(text[:end])
+        return
+
+    def _parse(self, text):
+        rows = list(csv.reader(io.StringIO(text)))
+        if len(rows) == 0:
+            return
+
+        columns = []
+        for values, convert in zip(zip(*rows), self.converters):
+            if convert is None:
+                columns.append([None if v == nullText else v for v in values])
+            else:
+                columns.append([None if v == nullText else convert(v) for v in values])
+
+        self.buffers.appendColumns(columns)
+        return
+
+    def close(self):
+        self.flush(final=True)
+        super().close()
+        return
+
+class CopyEncoder(io.TextIOBase):
+    '''encode rows as the input of ``COPY ... FROM STDIN``
+
+    This is the file that ``cursor.copy_expert()`` reads from. The CSV text
+    is generated from the data one chunk of rows at a time, as it is read.
+    '''
+
+    def __init__(self, data, chunkRows=100000):
+        '''initialize the encoder
+
+        Parameters
+        ----------
+        data : {pandas.DataFrame or list of tuples}
+            The rows to encode. Missing values are written as ``NULL``.
+        chunkRows : {int}, optional
+            Number of rows encoded at a time (the default is 100000)
+        '''
+        self.chunks = self._chunks(data, chunkRows)
+        self.pending, self.pos = '', 0
+        return
+
+    @staticmethod
+    def _chunks(data, chunkRows):
+        for start in range(0, len(data), chunkRows):
+            chunk = data[start:start + chunkRows]
+            if isinstance(chunk, pd.DataFrame):
+                yield chunk.to_csv(header=False, index=False, na_rep=nullText, lineterminator='\n')
+            else:
+                out = io.StringIO()
+                writer = csv.writer(out, lineterminator='\n')
+                writer.writerows([nullText if v is None else v for v in row] for row in chunk)
+                yield out.getvalue()
+        return
+
+    def readable(self):
+        return True
+
+    def _fill(self):
+        # Move to the next chunk once the current one has been read
+        while self.pos >= len(self.pending):
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return False
+            self.pending, self.pos = chunk, 0
+        return True
+
+    def read(self, size=-1):
+        parts, size = [], -1 if size is None else size
+        while (size != 0) and self._fill():
+            end = len(self.pending) if size < 0 else min(len(self.pending), self.pos + size)
+            parts.append(self.pending[self.pos:end])
+            if size > 0:
+                size -= end - self.pos
+            self.pos = end
+        return ''.join(parts)
+
+    def readline(self, size=-1):
+        parts, size = [], -1 if size is None else size
+        while (size != 0) and self._fill():
+            end = self.pending.find('\n', self.pos) + 1 or len(self.pending)
+            if size > 0:
+                end = min(end, self.pos + size)
+                size -= end - self.pos
+            parts.append(self.pending[self.pos:end])
+            self.pos = end
+            if parts[-1].endswith('\n'):
+                break
+        return ''.join(parts)
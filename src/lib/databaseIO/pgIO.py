@@ -1,12 +1,245 @@
 from logs import logDecorator as lD
-import jsonref, psycopg2
-from psycopg2.extras import execute_values
-
-config = jsonref.load(open('../config/config.json'))
+import os, sys, threading
+from lib.databaseIO.columnBuffer import ColumnBuffers
+from lib.databaseIO.copyStream import CopyDecoder, CopyEncoder, nullText
+from contextlib import contextmanager
+from functools import lru_cache
+from time import time
+from lib.configService import configService as cS
+from lib.lazyImport.lazyImport import LazyModule
+
+# psycopg2 is imported when the first connection is made
+psycopg2 = LazyModule('psycopg2')
+extras   = LazyModule('psycopg2.extras')
+pgPool   = LazyModule('psycopg2.pool')
+
+config = cS.getConfig('config.json')
 logBase = config['logging']['logBase'] + '.databaseIO.pgIO'
 
+poolDefaults = {'minSize': 1, 'maxSize': 8, 'healthCheckAfter': 60}
+
+pools      = {} # dbName -> (pool, semaphore, stats)
+poolsPid   = os.getpid()
+poolsLock  = threading.Lock()
+lastUsed   = {} # id(connection) -> time it was last returned
+inherited  = [] # pools of the parent process after a fork
+
+@lru_cache(maxsize=None)
+def getDbConfig():
+    '''the parsed contents of ``../config/db.json``
+
+    The file is only read the first time that this function is called.
+    Use ``getDbConfig.cache_clear()`` to read it again.
+
+    Returns
+    -------
+    dict
+        The database configuration
+    '''
+    return cS.getConfig('db.json')
+
+def getPool(dbName=None):
+    '''the connection pool of a database
+
+    A ``ThreadedConnectionPool`` is created for every database the first time that
+    it is used. Its size is given by the optional ``pool`` item of the database
+    within ``../config/db.json``, with the keys ``minSize`` (connections kept open
+    when idle), ``maxSize`` (maximum number of connections in use at once) and
+    ``healthCheckAfter`` (connections idle for longer than this many seconds are
+    checked before they are handed out).
+
+    Pools are not shared with child processes. After a fork, a new pool is
+    created within the child, and the connections of the parent are left alone.
+
+    Parameters
+    ----------
+    dbName : {str or None}, optional
+        The name of the database to use. If this is None, the ``defaultDB`` item
+        within the file ``../config/db.json`` is used.
+
+    Returns
+    -------
+    tuple
+        The name of the database, the pool, a semaphore that limits the number of
+        connections in use, and a dictionary of statistics
+    '''
+    global poolsPid
+
+    db = getDbConfig()
+
+    # Check whether a dbName is available
+    if (dbName is None) and ('defaultDB' in db):
+        dbName = db['defaultDB']
+
+    # Check whether a dbName has been specified
+    if dbName is None:
+        raise ValueError('A database name has not been specified.')
+
+    with poolsLock:
+        if os.getpid() != poolsPid:
+            # Closing the connections of the parent would also close them
+            # for the parent, so they are kept (and never used) instead
+            inherited.append(dict(pools))
+            pools.clear()
+            lastUsed.clear()
+            poolsPid = os.getpid()
+
+        if dbName not in pools:
+            params = dict(poolDefaults, **db[dbName].get('pool', {}))
+            pool   = pgPool.ThreadedConnectionPool(params['minSize'], params['maxSize'], db[dbName]['connection'])
+            stats  = {'minSize': params['minSize'], 'maxSize': params['maxSize'],
+                      'healthCheckAfter': params['healthCheckAfter'], 'borrowed': 0, 'inUse': 0,
+                      'healthChecks': 0, 'discarded': 0, 'waitTime': 0.0}
+            pools[dbName] = (pool, threading.BoundedSemaphore(params['maxSize']), stats)
+
+    return (dbName,) + pools[dbName]
+
+def healthy(conn, idle):
+    # A closed connection, or one that has been idle for long 
+    # and does not answer a trivial query, is not used.
+    if conn.closed:
+        return False
+    if idle:
+        try:
+            with conn.cursor() as cur:
+                cur.execute('select 1')
+            conn.rollback()
+        except Exception:
+            return False
+    return True
+
+@contextmanager
+def connection(dbName=None):
+    '''borrow a connection from the pool of a database
+
+    This is a context manager. The connection is returned to the pool when the
+    block exits, after rolling back any transaction that was not committed.
+    When all the connections of the pool are in use, it waits for one to be
+    returned. This is safe to use from multiple threads.
+
+    .. code-block:: python
+
+        with pgIO.connection('mindlincnew') as conn:
+            cur = conn.cursor()
+            ...
+
+    Parameters
+    ----------
+    dbName : {str or None}, optional
+        The name of the database to use. If this is None, the ``defaultDB`` item
+        within the file ``../config/db.json`` is used.
+
+    Yields
+    ------
+    psycopg2.extensions.connection
+        A connection to the database
+    '''
+    dbName, pool, semaphore, stats = getPool(dbName)
+
+    start = time()
+    semaphore.acquire()
+    try:
+        while True:
+            conn = pool.getconn()
+            idle = time() - lastUsed.get(id(conn), time()) > stats['healthCheckAfter']
+            if healthy(conn, idle):
+                break
+            with poolsLock:
+                stats['discarded'] += 1
+            pool.putconn(conn, close=True)
+    except Exception:
+        semaphore.release()
+        raise
+
+    with poolsLock:
+        stats['healthChecks'] += int(idle)
+        stats['waitTime']     += time() - start
+        stats['borrowed']     += 1
+        stats['inUse']        += 1
+
+    try:
+        yield conn
+    finally:
+        broken = conn.closed or (conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN)
+        with poolsLock:
+            stats['discarded'] += int(broken)
+            stats['inUse']     -= 1
+            lastUsed[id(conn)]  = time()
+        try:
+            pool.putconn(conn, close=broken)
+        finally:
+            semaphore.release()
+
+    return
+
+def getPoolStats():
+    '''statistics of the connection pools of this process
+
+    Returns
+    -------
+    dict
+        For every database, the configured sizes, the number of connections
+        that are open and in use, the number of times a connection was
+        borrowed, health checked and discarded, and the total time spent
+        waiting for a connection
+    '''
+    result = {}
+    with poolsLock:
+        for dbName, (pool, semaphore, stats) in pools.items():
+            result[dbName] = dict(stats, open=len(pool._pool) + len(pool._used))
+    return result
+
+def closePools():
+    '''close all the connections of the pools of this process
+    '''
+    with poolsLock:
+        if os.getpid() == poolsPid:
+            for pool, semaphore, stats in pools.values():
+                pool.closeall()
+        pools.clear()
+        lastUsed.clear()
+    return
+
+@lD.log(logBase + '.stageTables')
+def stageTables(logger, conn, stage):
+    '''upload lists of ids into temporary tables
+
+    Rather than placing a large list of ids within the text of a query (as in 
+    ``where id in (1, 2, ...)``), the ids are uploaded with ``COPY`` into a 
+    temporary table with a single ``id`` column, which the query then joins 
+    against. The tables are analyzed, so that the planner knows their sizes,
+    and are dropped at the end of the transaction. Duplicate ids are dropped.
+
+    .. code-block:: python
+
+        pgIO.getAllData('select tp.* from rwe_version1_2.typepatient tp '
+                        'join cohort_patients cp on tp.patientid = cp.id', 
+            stage={'cohort_patients': patientList})
+
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    conn : {psycopg2.extensions.connection}
+        The connection on which the query is going to be run
+    stage : {dict}
+        Lists of integer ids, with the name of each temporary table as the key
+    '''
+
+    cur = conn.cursor()
+    for name, ids in stage.items():
+        start = time()
+        ids = list(dict.fromkeys(int(i) for i in ids))
+        cur.execute('create temporary table {} (id bigint primary key) on commit drop'.format(name))
+        cur.copy_expert('copy {} (id) from stdin with (format csv)'.format(name), CopyEncoder([(i,) for i in ids]))
+        cur.execute('analyze {}'.format(name))
+        logger.info('Staged {} ids into {} in {:.3f} seconds'.format(len(ids), name, time() - start))
+    cur.close()
+
+    return
+
 @lD.log(logBase + '.getAllData')
-def getAllData(logger, query, values=None, dbName=None):
+def getAllData(logger, query, values=None, dbName=None, stage=None):
     '''query data from the database
     
     Query the data over here. If there is a problem with the data, it is going 
@@ -27,6 +260,10 @@ def getAllData(logger, query, values=None, dbName=None):
         The name of the database to use. If this is None, the function will 
         attempt to read the name from the ``defaultDB`` item within the 
         file ``../config/db.json``. 
+    stage : {dict}, optional
+        Lists of ids that are uploaded into temporary tables before the query
+        is run, with the name of each table as the key. See ``stageTables()``
+        (the default is None)
     
     Returns
     -------
@@ -37,50 +274,34 @@ def getAllData(logger, query, values=None, dbName=None):
     '''
 
     vals = None
-    
-    try:
-        db = jsonref.load(open('../config/db.json'))
-
-        # Check whether a dbName is available
-        if (dbName is None) and ('defaultDB' in db):
-            dbName = db['defaultDB']
-
-        # Check whether a dbName has been specified
-        if dbName is None:
-            logger.error('A database name has not been specified.')
-            return None
-
-        conn = psycopg2.connect(db[dbName]['connection'])
-        cur  = conn.cursor()
-    except Exception as e:
-        logger.error('Unable to connect to the database')
-        logger.error(str(e))
-        return
 
     try:
+        with connection(dbName) as conn:
+            cur = conn.cursor()
+            try:
 
-        if values is None:
-            cur.execute(query)
-        else:
-            cur.execute(query, values)
+                if stage:
+                    stageTables(conn, stage)
 
-        # We assume that the data is small so we
-        # can download the entire thing here ...
-        # -------------------------------------------
-        vals = cur.fetchall()
+                if values is None:
+                    cur.execute(query)
+                else:
+                    cur.execute(query, values)
 
-    except Exception as e:
-        logger.error('Unable to obtain data from the database for:\n query: {}\nvalues'.format(query, values))
-        logger.error(str(e))
+                # We assume that the data is small so we
+                # can download the entire thing here ...
+                # -------------------------------------------
+                vals = cur.fetchall()
 
+            except Exception as e:
+                logger.error('Unable to obtain data from the database for:\n query: {}\nvalues'.format(query, values))
+                logger.error(str(e))
 
-    try:
-        cur.close()
-        conn.close()
+            cur.close()
     except Exception as e:
-        logger.error('Unable to disconnect to the database')
+        logger.error('Unable to connect to the database')
         logger.error(str(e))
-        return 
+        return
 
     return vals
 
@@ -115,51 +336,280 @@ def getDataIterator(logger, query, values=None, chunks=100, dbName=None):
     '''
 
     try:
-        db = jsonref.load(open('../config/db.json'))
+        with connection(dbName) as conn:
+            # The server side cursor is closed when the connection is 
+            # returned to the pool, even if the iterator is not exhausted
+            cur = conn.cursor('remote')
+            try:
 
-        # Check whether a dbName is available
-        if (dbName is None) and ('defaultDB' in db):
-            dbName = db['defaultDB']
+                if values is None:
+                    cur.execute(query)
+                else:
+                    cur.execute(query, values)
 
-        # Check whether a dbName has been specified
-        if dbName is None:
-            logger.error('A database name has not been specified.')
-            return None
+                while True:
+                    vals = cur.fetchmany(chunks)
+                    if len(vals) == 0:
+                        break
+
+                    yield vals
+
+            except Exception as e:
+                logger.error('Unable to obtain data from the database for:\n query: {}\nvalues'.format(query, values))
+                logger.error(str(e))
 
-        conn = psycopg2.connect(db[dbName]['connection'])
-        cur  = conn.cursor('remote')
     except Exception as e:
         logger.error('Unable to connect to the database')
         logger.error(str(e))
         return
 
+    return
+
+def rowBytes(rows, sample=100):
+    '''approximate memory used by a row of a query result
+
+    Parameters
+    ----------
+    rows : {list of tuples}
+        Rows returned by the cursor. Only the first ``sample`` rows are used.
+    sample : {int}, optional
+        Number of rows to measure (the default is 100)
+
+    Returns
+    -------
+    float
+        Average number of bytes used by a row and its values
+    '''
+    rows = rows[:sample]
+    total = sum(sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r) for r in rows)
+    return total / max(len(rows), 1)
+
+@lD.log(logBase + '.getAdaptiveIterator')
+def getAdaptiveIterator(logger, query, values=None, chunkMB=4, minChunk=100, maxChunk=1000000, dbName=None, stage=None, raiseErrors=False):
+    '''Create an iterator from a large query, with chunks of a fixed size in memory
+    
+    This is similar to ``getDataIterator()``. However, rather than a fixed number 
+    of rows, every chunk holds approximately ``chunkMB`` of data. The width of the
+    rows is measured on every chunk, and the number of rows fetched next is adjusted
+    accordingly. Narrow rows are thus fetched in fewer round trips, while wide rows
+    do not blow up the memory.
+    
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    query : {str}
+        The query to be made to the databse
+    values : {tuple or list-like}, optional
+        Additional values to be passed to the query (the default 
+        is None)
+    chunkMB : {number}, optional
+        Approximate size of every chunk in MB (the default is 4)
+    minChunk : {int}, optional
+        Minimum number of rows in a chunk (the default is 100)
+    maxChunk : {int}, optional
+        Maximum number of rows in a chunk (the default is 1000000)
+    dbName : {str or None}, optional
+        The name of the database to use. If this is None, the function will 
+        attempt to read the name from the ``defaultDB`` item within the 
+        file ``../config/db.json``. 
+    stage : {dict}, optional
+        Lists of ids that are uploaded into temporary tables before the query
+        is run, with the name of each table as the key. See ``stageTables()``
+        (the default is None)
+    raiseErrors : {bool}, optional
+        Raise errors after logging them, instead of ending the iteration, so
+        that a failed query can be told apart from an empty result (the 
+        default is False)
+    
+    Yields
+    ------
+    list of tuples
+        A list of tuples from the query
+    '''
+
+    chunks = 1000
     try:
+        with connection(dbName) as conn:
+            cur = conn.cursor('remote')
+            try:
 
-        if values is None:
-            cur.execute(query)
-        else:
-            cur.execute(query, values)
+                if stage:
+                    stageTables(conn, stage)
 
-        while True:
-            vals = cur.fetchmany(chunks)
-            if len(vals) == 0:
-                break
+                if values is None:
+                    cur.execute(query)
+                else:
+                    cur.execute(query, values)
 
-            yield vals
+                while True:
+                    vals = cur.fetchmany(chunks)
+                    if len(vals) == 0:
+                        break
+
+                    chunks = int(chunkMB * 1024 * 1024 / max(rowBytes(vals), 1))
+                    chunks = min(max(chunks, minChunk), maxChunk)
+
+                    yield vals
+
+            except Exception as e:
+                logger.error('Unable to obtain data from the database for:\n query: {}\nvalues'.format(query, values))
+                logger.error(str(e))
+                if raiseErrors:
+                    raise
 
     except Exception as e:
-        logger.error('Unable to obtain data from the database for:\n query: {}\nvalues'.format(query, values))
+        if raiseErrors:
+            raise
+        logger.error('Unable to connect to the database')
         logger.error(str(e))
+        return
+
+    return
 
+@lD.log(logBase + '.copyToColumns')
+def copyToColumns(logger, query, columns=None, values=None, chunkMB=4, dbName=None, stage=None, raiseErrors=False):
+    '''download the result of a query with ``COPY ... TO STDOUT``
+    
+    The query is run within a ``COPY`` statement, which streams the result as CSV
+    text instead of sending it as rows over a cursor. The text is decoded into 
+    typed column arrays as it arrives, a chunk at a time. The types of the columns
+    are found from the query (with ``limit 0``) before it is run. Integers, floats,
+    numerics, booleans, dates and timestamps are converted, while all other types
+    are kept as strings.
+    
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    query : {str}
+        The query to be made to the databse. This must be a single ``select``
+        statement.
+    columns : {list of str}, optional
+        Names of the columns (the default is None, which uses the names within
+        the query)
+    values : {tuple or list-like}, optional
+        Additional values to be passed to the query (the default 
+        is None)
+    chunkMB : {number}, optional
+        Size of the text decoded at a time in MB (the default is 4)
+    dbName : {str or None}, optional
+        The name of the database to use. If this is None, the function will 
+        attempt to read the name from the ``defaultDB`` item within the 
+        file ``../config/db.json``. 
+    stage : {dict}, optional
+        Lists of ids that are uploaded into temporary tables before the query
+        is run, with the name of each table as the key. See ``stageTables()``
+        (the default is None)
+    raiseErrors : {bool}, optional
+        Raise errors after logging them, instead of returning None (the
+        default is False)
+    
+    Returns
+    -------
+    columnBuffer.ColumnBuffers or None
+        The result of the query. Use its ``toDataFrame()`` method to get a 
+        DataFrame. In case there is an error, the error will be logged, and 
+        a None will be returned
+    '''
+
+    vals = None
 
     try:
-        conn.close()
+        with connection(dbName) as conn:
+            cur = conn.cursor()
+            try:
+                if stage:
+                    stageTables(conn, stage)
+
+                query = query.strip().rstrip(';')
+                if values is not None:
+                    query = cur.mogrify(query, values).decode()
+
+                cur.execute('select * from ({}) as q limit 0'.format(query))
+                typeCodes = [d.type_code for d in cur.description]
+                if columns is None:
+                    columns = [d.name for d in cur.description]
+
+                buffers = ColumnBuffers(columns)
+                decoder = CopyDecoder(buffers, typeCodes, chunkMB=chunkMB)
+                cur.copy_expert("copy ({}) to stdout with (format csv, null '{}')".format(query, nullText), decoder)
+                decoder.close()
+                vals = buffers
+
+            except Exception as e:
+                logger.error('Unable to copy data from the database for:\n query: {}\nvalues'.format(query, values))
+                logger.error(str(e))
+                if raiseErrors:
+                    cur.close()
+                    raise
+
+            cur.close()
     except Exception as e:
-        logger.error('Unable to disconnect to the database')
+        if raiseErrors:
+            raise
+        logger.error('Unable to connect to the database')
         logger.error(str(e))
-        return 
+        return
 
-    return
+    return vals
+
+@lD.log(logBase + '.copyFrom')
+def copyFrom(logger, table, data, columns=None, chunkRows=100000, dbName=None):
+    '''upload rows into a table with ``COPY ... FROM STDIN``
+    
+    The rows are encoded as CSV text a chunk at a time, and streamed to the 
+    database within a single ``COPY`` statement. This is much faster than 
+    ``commitDataList()`` for a large number of rows.
+    
+    Parameters
+    ----------
+    logger : {logging.logger}
+        logging element 
+    table : {str}
+        The table (optionally with its schema) into which to insert the rows
+    data : {pandas.DataFrame or list of tuples}
+        The rows to upload. Missing values are uploaded as ``NULL``.
+    columns : {list of str}, optional
+        The columns of the table into which the values are inserted (the default 
+        is None, which uses all the columns of the table in order)
+    chunkRows : {int}, optional
+        Number of rows encoded at a time (the default is 100000)
+    dbName : {str or None}, optional
+        The name of the database to use. If this is None, the function will 
+        attempt to read the name from the ``defaultDB`` item within the 
+        file ``../config/db.json``. 
+    
+    Returns
+    -------
+    True or None
+        A successful completion of this function returns a ``True``. 
+        In case there is an error, the error will be logged, and a ``None`` will
+        be returned
+    '''
+
+    val = True
+    target = table if columns is None else '{} ({})'.format(table, ', '.join(columns))
+
+    try:
+        with connection(dbName) as conn:
+            cur = conn.cursor()
+            try:
+                cur.copy_expert("copy {} from stdin with (format csv, null '{}')".format(target, nullText), 
+                    CopyEncoder(data, chunkRows=chunkRows))
+                conn.commit()
+            except Exception as e:
+                logger.error('Unable to copy data into the table: {}'.format(target))
+                logger.error(str(e))
+                val = None
+
+            cur.close()
+    except Exception as e:
+        logger.error('Unable to connect to the database')
+        logger.error(str(e))
+        return None
+
+    return val
 
 @lD.log(logBase + '.getSingleDataIterator')
 def getSingleDataIterator(logger, query, values=None, dbName=None):
@@ -189,49 +639,30 @@ def getSingleDataIterator(logger, query, values=None, dbName=None):
     '''
 
     try:
-        db = jsonref.load(open('../config/db.json'))
-
-        # Check whether a dbName is available
-        if (dbName is None) and ('defaultDB' in db):
-            dbName = db['defaultDB']
-
-        # Check whether a dbName has been specified
-        if dbName is None:
-            logger.error('A database name has not been specified.')
-            return None
-
-        conn = psycopg2.connect(db[dbName]['connection'])
-        cur  = conn.cursor('remote')
-    except Exception as e:
-        logger.error('Unable to connect to the database')
-        logger.error(str(e))
-        return
-
-    try:
+        with connection(dbName) as conn:
+            cur = conn.cursor('remote')
+            try:
 
-        if values is None:
-            cur.execute(query)
-        else:
-            cur.execute(query, values)
+                if values is None:
+                    cur.execute(query)
+                else:
+                    cur.execute(query, values)
 
-        while True:
-            vals = cur.fetchone()
-            if vals is None:
-                break
+                while True:
+                    vals = cur.fetchone()
+                    if vals is None:
+                        break
 
-            yield vals
+                    yield vals
 
-    except Exception as e:
-        logger.error('Unable to obtain data from the database for:\n query: {}\nvalues'.format(query, values))
-        logger.error(str(e))
+            except Exception as e:
+                logger.error('Unable to obtain data from the database for:\n query: {}\nvalues'.format(query, values))
+                logger.error(str(e))
 
-
-    try:
-        conn.close()
     except Exception as e:
-        logger.error('Unable to disconnect to the database')
+        logger.error('Unable to connect to the database')
         logger.error(str(e))
-        return 
+        return
 
     return
 
@@ -268,48 +699,29 @@ def commitData(logger, query, values=None, dbName=None):
     '''
 
     vals = True
-    
-    try:
-        db = jsonref.load(open('../config/db.json'))
 
-        # Check whether a dbName is available
-        if (dbName is None) and ('defaultDB' in db):
-            dbName = db['defaultDB']
-
-        # Check whether a dbName has been specified
-        if dbName is None:
-            logger.error('A database name has not been specified.')
-            return None
-
-        conn = psycopg2.connect(db[dbName]['connection'])
-        cur  = conn.cursor()
+    try:
+        with connection(dbName) as conn:
+            cur = conn.cursor()
+            try:
+
+                if values is None:
+                    cur.execute(query)
+                else:
+                    cur.execute(query, values)
+
+            except Exception as e:
+                logger.error('Unable to obtain data from the database for:\n query: {}\nvalues'.format(query, values))
+                logger.error(str(e))
+                vals = None
+
+            conn.commit()
+            cur.close()
     except Exception as e:
         logger.error('Unable to connect to the database')
         logger.error(str(e))
         return None
 
-    try:
-
-        if values is None:
-            cur.execute(query)
-        else:
-            cur.execute(query, values)
-
-    except Exception as e:
-        logger.error('Unable to obtain data from the database for:\n query: {}\nvalues'.format(query, values))
-        logger.error(str(e))
-        vals = None
-
-
-    try:
-        conn.commit()
-        cur.close()
-        conn.close()
-    except Exception as e:
-        logger.error('Unable to disconnect to the database')
-        logger.error(str(e))
-        return 
-
     return vals
 
 @lD.log(logBase + '.commitDataList')
@@ -347,39 +759,21 @@ def commitDataList(logger, query, values, dbName=None):
     val = True
 
     try:
-        db = jsonref.load(open('../config/db.json'))
-
-        # Check whether a dbName is available
-        if (dbName is None) and ('defaultDB' in db):
-            dbName = db['defaultDB']
-
-        # Check whether a dbName has been specified
-        if dbName is None:
-            logger.error('A database name has not been specified.')
-            return None
-
-        conn = psycopg2.connect(db[dbName]['connection'])
-        cur  = conn.cursor()
+        with connection(dbName) as conn:
+            cur = conn.cursor()
+            try:
+                query = cur.mogrify(query)
+                extras.execute_values(cur, query, values)
+            except Exception as e:
+                logger.error('Unable to execute query for:\n query: {}\nvalues'.format(query, values))
+                logger.error(str(e))
+                val = None
+
+            conn.commit()
+            cur.close()
     except Exception as e:
         logger.error('Unable to connect to the database')
         logger.error(str(e))
         return None
 
-    try:
-        query = cur.mogrify(query)
-        execute_values(cur, query, values)
-    except Exception as e:
-        logger.error('Unable to execute query for:\n query: {}\nvalues'.format(query, values))
-        logger.error(str(e))
-        val = None
-
-    try:
-        conn.commit()
-        cur.close()
-        conn.close()
-    except Exception as e:
-        logger.error('Unable to disconnect to the database')
-        logger.error(str(e))
-        return None
-
     return val
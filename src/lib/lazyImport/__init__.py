@@ -0,0 +1,33 @@
+'''Deferred imports of heavy dependencies, and profiling of import times
+
+Libraries such as ``matplotlib``, ``networkx``, ``sklearn`` and ``psycopg2`` take
+a large part of the startup time of ``VDL.py``, even when the modules that are run
+never use them. ``lazyImport.LazyModule`` stands in for such a module, and imports
+it the first time that one of its attributes is used:
+
+.. code-block:: python
+
+    from lib.lazyImport.lazyImport import LazyModule
+
+    plt = LazyModule('matplotlib.pyplot')
+
+    def plotSomething():
+        plt.figure()   # matplotlib is imported here
+
+Modules that are needed in any case should still be imported normally, so that
+import errors show up at startup.
+
+Import profiling
+----------------
+
+``python VDL.py --execution_importProfile_todo ...`` runs the program again with
+``python -X importtime``, and writes a report of the slowest imports into the log
+folder (see ``importProfile``). Use it to find, and keep an eye on, the imports
+that are responsible for the startup time.
+
+Available modules:
+------------------
+
+ - ``lazyImport``: ``LazyModule``, a module that is imported when first used
+ - ``importProfile``: Run a command with ``-X importtime`` and summarize the times
+'''
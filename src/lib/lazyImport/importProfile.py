@@ -0,0 +1,108 @@
+import os, sys, subprocess
+from datetime import datetime as dt
+
+def parseImportTime(lines):
+    '''parse the output of ``python -X importtime``
+
+    Parameters
+    ----------
+    lines : {iterable of str}
+        Lines written to stderr. Lines that are not import times are ignored.
+
+    Returns
+    -------
+    list of dict
+        The ``module``, its ``self`` and ``cumulative`` times in microseconds,
+        and the ``depth`` at which it was imported (0 for a top-level import),
+        in the order of the output
+    '''
+    entries = []
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue # the header
+        name = parts[2].rstrip('\n')
+        entries.append({
+            'module'     : name.strip(),
+            'self'       : int(parts[0]),
+            'cumulative' : int(parts[1]),
+            'depth'      : (len(name) - len(name.lstrip()) - 1) // 2})
+    return entries
+
+def summarize(entries, top=30):
+    '''a report of the slowest imports
+
+    Parameters
+    ----------
+    entries : {list of dict}
+        The import times (see ``parseImportTime``)
+    top : {int}, optional
+        The number of modules listed (the default is 30)
+
+    Returns
+    -------
+    str
+        The total import time, the top-level imports, and the modules with
+        the largest cumulative and self times
+    '''
+    total = sum(e['self'] for e in entries)
+    lines = ['Imported {} modules in {:.3f} s'.format(len(entries), total / 1e6), '']
+
+    def table(title, rows, key):
+        lines.append(title)
+        lines.append('{:>12s} {:>12s}  {}'.format('self [ms]', 'cumul. [ms]', 'module'))
+        for e in sorted(rows, key=lambda e: -e[key])[:top]:
+            lines.append('{:12.1f} {:12.1f}  {}'.format(e['self'] / 1e3, e['cumulative'] / 1e3, e['module']))
+        lines.append('')
+        return
+
+    table('Top-level imports', [e for e in entries if e['depth'] == 0], 'cumulative')
+    table('Largest cumulative times', entries, 'cumulative')
+    table('Largest self times', entries, 'self')
+    return '\n'.join(lines)
+
+def profileCommand(command, logFolder='logs', top=30):
+    '''run a Python command with ``-X importtime`` and report the import times
+
+    The output of the command is passed through, except for the import times,
+    which are summarized (see ``summarize``) into ``importtime_<now>.txt``
+    within ``logFolder``. The raw times are kept next to it as ``.raw``.
+
+    Parameters
+    ----------
+    command : {list of str}
+        The arguments of the Python interpreter, such as ``['VDL.py', '-m', 'cleanData']``
+    logFolder : {str}, optional
+        Folder of the report (the default is ``'logs'``)
+    top : {int}, optional
+        The number of modules listed in the report (the default is 30)
+
+    Returns
+    -------
+    int
+        The exit code of the command
+    '''
+    os.makedirs(logFolder, exist_ok=True)
+    path = os.path.join(logFolder, 'importtime_{}'.format(dt.now().strftime('%Y-%m-%d_%H-%M-%S')))
+
+    process = subprocess.Popen([sys.executable, '-X', 'importtime'] + list(command),
+                    stderr=subprocess.PIPE, universal_newlines=True)
+    timings = []
+    with open(path + '.raw', 'w') as raw:
+        for line in process.stderr:
+            if line.startswith('import time:'):
+                timings.append(line)
+                raw.write(line)
+            else:
+                sys.stderr.write(line)
+    process.wait()
+
+    report = summarize(parseImportTime(timings), top)
+    with open(path + '.txt', 'w') as f:
+        f.write(report)
+    print(report)
+    print('Import times written to {}.txt'.format(path))
+
+    return process.returncode
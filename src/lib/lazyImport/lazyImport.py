@@ -0,0 +1,42 @@
+import importlib, threading
+
+class LazyModule():
+    '''a module that is only imported when one of its attributes is used
+    '''
+
+    def __init__(self, name):
+        '''initialize the module
+
+        Parameters
+        ----------
+        name : {str}
+            The full name of the module, such as ``'matplotlib.pyplot'``
+        '''
+        self.__dict__['_name']   = name
+        self.__dict__['_module'] = None
+        self.__dict__['_lock']   = threading.Lock()
+        return
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with self.__dict__['_lock']:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self.__dict__['_name'])
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+        return
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return '<lazy module {} ({})>'.format(self.__dict__['_name'], state)
@@ -0,0 +1,27 @@
+'''Sampling profiler for the runs of VDL and the callbacks of the Dash app
+
+``python VDL.py --profile ...`` (or ``"todo": true`` in ``config/profile.json``)
+runs the main program under a ``profiler.Sampler``. A background thread takes
+the stack of the main thread every ``"interval"`` seconds, which costs little
+as long as the interval is not much shorter than the default 5 ms.
+
+When the Dash app is run with ``"dash": true`` (``--profile_dash true``), every
+callback of the app gets a label of its own. The stacks of the server threads
+are sampled while they run a callback, under the name of the callback, so that
+the latency of the dashboard can be attributed to ``add_filt``,
+``getCGIchangeData``, or the serialization of the figures.
+
+At the end of the run, the samples are written next to the log files as
+``logs/profile_<now>.folded``, one ``label;outer;...;inner samples`` line per
+distinct stack. This is the input of ``flamegraph.pl``, and can be opened
+directly with https://www.speedscope.app. A summary of the calls, seconds and
+samples of every label, with the most sampled frames, is logged as well.
+
+Modules that run in processes of their own (``--execution_processes_todo``)
+are not sampled.
+
+Available modules:
+------------------
+
+ - ``profiler``: ``Sampler``, and the ``profile`` wrapper of the main program
+'''
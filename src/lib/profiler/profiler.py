@@ -0,0 +1,257 @@
+import os, sys, threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime as dt
+from functools import wraps
+from time import perf_counter
+
+from logs import logDecorator as lD
+from lib.configService import configService as cS
+
+config = cS.getConfig('config.json')
+logBase = config['logging']['logBase'] + '.lib.profiler.profiler'
+
+# The sampler of the current run, if it is being profiled
+active = None
+
+class Sampler():
+    '''sampling profiler of labelled threads
+
+    A background thread takes the stack of every thread that is running a
+    labelled piece of code (see ``label``) every ``interval`` seconds. The
+    stacks are kept as folded stacks: the label, followed by the frames from
+    the outermost to the innermost, separated by semicolons, with the number
+    of times that it was sampled. Threads without a label are not sampled.
+    '''
+
+    def __init__(self, interval=0.005):
+        '''initialize the sampler
+
+        Parameters
+        ----------
+        interval : {float}, optional
+            Seconds between two samples (the default is 0.005)
+        '''
+        self.interval = interval
+        self.stacks   = Counter() # folded stack -> samples
+        self.samples  = Counter() # label -> samples
+        self.calls    = Counter() # label -> calls
+        self.seconds  = Counter() # label -> seconds
+        self.labels   = {}        # thread id -> label
+        self.lock     = threading.Lock()
+        self.stopped  = threading.Event()
+        self.thread   = None
+        return
+
+    def start(self):
+        '''start sampling
+        '''
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, name='Sampler', daemon=True)
+        self.thread.start()
+        return
+
+    def stop(self):
+        '''stop sampling
+        '''
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        return
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for tid, name in list(self.labels.items()):
+                frame = frames.get(tid)
+                if frame is None or tid == me:
+                    continue
+                stack = self.fold(name, frame)
+                with self.lock:
+                    self.stacks[stack] += 1
+                    self.samples[name]  += 1
+        return
+
+    @staticmethod
+    def fold(name, frame):
+        '''the folded stack of a frame
+
+        Parameters
+        ----------
+        name : {str}
+            The label, which is the root of the stack
+        frame : {frame}
+            The innermost frame
+
+        Returns
+        -------
+        str
+            The label and the frames, from the outermost to the innermost,
+            as ``function (file:line)``, separated by semicolons
+        '''
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append('{} ({}:{})'.format(code.co_name,
+                os.path.basename(code.co_filename), code.co_firstlineno).replace(';', ':'))
+            frame = frame.f_back
+        return ';'.join([name.replace(';', ':')] + frames[::-1])
+
+    @contextmanager
+    def label(self, name):
+        '''sample the current thread under a label
+
+        Labels may be nested, in which case the innermost one is used.
+
+        Parameters
+        ----------
+        name : {str}
+            The label, such as the name of a Dash callback
+        '''
+        tid      = threading.get_ident()
+        previous = self.labels.get(tid)
+        self.labels[tid] = name
+        t0 = perf_counter()
+        try:
+            yield
+        finally:
+            seconds = perf_counter() - t0
+            if previous is None:
+                del self.labels[tid]
+            else:
+                self.labels[tid] = previous
+            with self.lock:
+                self.calls[name]   += 1
+                self.seconds[name] += seconds
+        return
+
+    def wrap(self, name):
+        '''decorator sampling every call of a function under a label
+
+        Parameters
+        ----------
+        name : {str}
+            The label
+        '''
+        def decorator(f):
+
+            @wraps(f)
+            def wrappedF(*args, **kwargs):
+                with self.label(name):
+                    return f(*args, **kwargs)
+
+            return wrappedF
+
+        return decorator
+
+    def folded(self):
+        '''the folded stacks, as read by ``flamegraph.pl`` and speedscope
+
+        Returns
+        -------
+        str
+            One ``stack samples`` line per distinct stack
+        '''
+        with self.lock:
+            return ''.join('{} {}\n'.format(s, n) for s, n in sorted(self.stacks.items()))
+
+    def summary(self, top=3):
+        '''the time spent under every label
+
+        Parameters
+        ----------
+        top : {int}, optional
+            The number of innermost frames with the most samples listed for
+            every label (the default is 3)
+
+        Returns
+        -------
+        str
+            A table with the calls, seconds and samples of every label, by
+            decreasing seconds, and the frames where most of the samples
+            were taken
+        '''
+        with self.lock:
+            inner = {}
+            for stack, n in self.stacks.items():
+                name, *frames = stack.split(';')
+                inner.setdefault(name, Counter())[frames[-1] if frames else name] += n
+            labels = sorted(self.calls, key=lambda l: -self.seconds[l])
+
+            width = max([len('label')] + [len(l) for l in labels])
+            lines = ['{:<{w}s} {:>8s} {:>12s} {:>8s}  {}'.format(
+                'label', 'calls', 'seconds', 'samples', 'most sampled frames', w=width)]
+            for l in labels:
+                frames = ', '.join('{} ({})'.format(f, n) for f, n in inner.get(l, Counter()).most_common(top))
+                lines.append('{:<{w}s} {:8d} {:12.3f} {:8d}  {}'.format(
+                    l, self.calls[l], self.seconds[l], self.samples[l], frames, w=width))
+        return '\n'.join(lines)
+
+@lD.log(logBase + '.writeProfile')
+def writeProfile(logger, sampler, logFolder='logs'):
+    '''write the folded stacks of a run, and log the summary
+
+    Parameters
+    ----------
+    logger : {logging.Logger}
+        The logger used for logging the summary
+    sampler : {Sampler}
+        The sampler of the run
+    logFolder : {str}, optional
+        Folder of the output (the default is 'logs')
+
+    Returns
+    -------
+    str
+        Path of the ``profile_<now>.folded`` file
+    '''
+    os.makedirs(logFolder, exist_ok=True)
+    path = os.path.join(logFolder, 'profile_{}.folded'.format(dt.now().strftime('%Y-%m-%d_%H-%M-%S')))
+    with open(path, 'w') as f:
+        f.write(sampler.folded())
+
+    logger.info('Profile written to {}:\n{}'.format(path, sampler.summary()))
+    return path
+
+def profile(f, name, interval=0.005, logFolder='logs'):
+    '''profile every call of a function
+
+    While the function runs, the sampler is the ``active`` one, so that
+    other code, such as the Dash app, can label its own threads with it.
+    When the function finishes, or fails, the profile is written to
+    ``logFolder`` (see ``writeProfile``).
+
+    Parameters
+    ----------
+    f : {callable}
+        The function, such as the main program
+    name : {str}
+        The label of the thread calling the function
+    interval : {float}, optional
+        Seconds between two samples (the default is 0.005)
+    logFolder : {str}, optional
+        Folder of the output (the default is 'logs')
+
+    Returns
+    -------
+    callable
+        The profiled function
+    '''
+
+    @wraps(f)
+    def wrappedF(*args, **kwargs):
+        global active
+        sampler = Sampler(interval)
+        active  = sampler
+        sampler.start()
+        try:
+            with sampler.label(name):
+                return f(*args, **kwargs)
+        finally:
+            sampler.stop()
+            active = None
+            writeProfile(sampler, logFolder)
+
+    return wrappedF
@@ -113,11 +113,63 @@ There are functions provided that will be able to take the entire graph and uplo
 directly into the databases. 
 
 
+Running modules from the graph:
+^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+``pipeline.runPipeline()`` runs a set of modules in the order given by the graph. A module
+starts as soon as the modules producing its inputs are done, so that independent modules
+run in parallel. When the cache is used, a module is skipped when all of its ``file-`` and
+``folder-`` outputs exist, and nothing that it depends on has changed since they were last
+produced. This is checked with a hash of its ``inputs`` and ``params``, of the contents of
+its ``file-`` and ``folder-`` inputs, and of its source. The hashes are saved within the 
+``stateFile``. Inputs that cannot be hashed (such as tables of a database) are not noticed,
+so modules reading them should be listed within ``always``. ``VDL.py`` reads these settings
+from ``config/execution.json``:
+
+.. code-block:: javascript
+
+    {
+        "mode"       : "sequential",
+        "maxWorkers" : 4,
+        "force"      : false,
+        "cache"      : {
+            "todo"      : false,
+            "stateFile" : "../data/intermediate/_pipeline.json",
+            "always"    : ["getData"]
+        }
+    }
+
+By default, the modules run one after the other in the order of ``modules.json``, and none
+is skipped. Both are opt-in for a single run with ``--execution_mode graph`` and 
+``--execution_cache_todo``. Since the flags of the command line can only switch a setting 
+on, turn them on within ``config/execution.json`` only if every run should use them, and use
+``--execution_force`` to run every module then.
+
+With ``processes``, every module runs within a process of its own (``pipeline.runProcess()``),
+so that ``maxWorkers`` CPU-heavy modules (``--execution_maxWorkers``) really run at once. The
+process is terminated after ``timeout`` seconds, and its address space is limited to 
+``memoryMB``. Both can be overridden by a ``timeout`` or ``memoryMB`` within the entry of the
+module in ``modules.json``. Everything that the module prints or logs goes to its own file
+within ``logFolder``. The outcome of every module (its status, time, log file, and the value
+returned by its ``main`` or the error) is gathered within ``resultsDict['moduleResults']``.
+
+.. code-block:: javascript
+
+    "processes"  : {
+        "todo"      : false,
+        "timeout"   : 86400,
+        "memoryMB"  : 16384,
+        "logFolder" : "logs/modules"
+    }
+
+
 Available Graph Libraries:
 --------------------------
 
  - ``graphLib``: General purpose libraries for constructing graphs from the module
                  configurations. 
+ - ``pipeline``: Runs modules in the order of the graph, skipping modules that are 
+                 up to date.
 
 
 '''
\ No newline at end of file
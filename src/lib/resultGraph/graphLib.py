@@ -1,16 +1,30 @@
 from logs import logDecorator as lD
-import jsonref, os
-import matplotlib.pyplot as plt # This comes before networkx
-import networkx as nx
-from networkx.drawing.nx_pydot import graphviz_layout
+import os, json
 from datetime import datetime as dt
-from lib.databaseIO import pgIO
+from lib.configService import configService as cS
+from lib.lazyImport.lazyImport import LazyModule
 
-config = jsonref.load(open('../config/config.json'))
+# Imported when first used
+plt     = LazyModule('matplotlib.pyplot') # This comes before networkx
+nx      = LazyModule('networkx')
+nxPydot = LazyModule('networkx.drawing.nx_pydot')
+pgIO    = LazyModule('lib.databaseIO.pgIO')
+
+config = cS.getConfig('config.json')
 logBase = config['logging']['logBase'] + '.lib.resultGraph.graphLib'
 
+def nodeType(spec):
+    '''the type of an input or output node
+
+    Inputs and outputs are normally dictionaries with a ``type``. Plain values
+    (such as the ``dbName`` input of some modules) are nodes of type ``value``.
+    '''
+    if isinstance(spec, dict):
+        return spec.get('type', 'value')
+    return 'value'
+
 @lD.log(logBase + '.generateGraph')
-def generateGraph(logger):
+def generateGraph(logger, folder='../config/modules'):
     '''generate a directed graph from the modules config
     
     generate a networkX.Graph object by reading the contents
@@ -20,6 +34,9 @@ def generateGraph(logger):
     ----------
     logger : {logging.logger}
         logging element 
+    folder : {str}, optional
+        folder with the configuration of the modules (the default
+        is ``'../config/modules'``)
     
     Returns
     -------
@@ -31,11 +48,10 @@ def generateGraph(logger):
 
         graph = nx.DiGraph()
 
-        folder = '../config/modules'
         files  = [f for f in os.listdir(folder) if f.endswith('.json')]
 
         for f in files:
-            data = jsonref.load(open(os.path.join(folder, f)))
+            data = cS.getConfig(f, folder)
             inp  = list(data['inputs'].keys())
             out  = list(data['outputs'].keys())
             f = f.replace('.json', '')
@@ -45,9 +61,9 @@ def generateGraph(logger):
             # Add the incoming edges
             for n in inp:
                 if n not in graph.nodes:
-                    summary = jsonref.dumps(data['inputs'][n])
+                    summary = json.dumps(data['inputs'][n])
                     graph.add_node( n, 
-                        type    = data['inputs'][n]['type'],
+                        type    = nodeType(data['inputs'][n]),
                         summary = summary)
 
                 graph.add_edge(n, f)
@@ -55,9 +71,9 @@ def generateGraph(logger):
             # Add the outgoing edges
             for n in out:
                 if n not in graph.nodes:
-                    summary = jsonref.dumps(data['outputs'][n])
+                    summary = json.dumps(data['outputs'][n])
                     graph.add_node( n, 
-                        type    = data['outputs'][n]['type'],
+                        type    = nodeType(data['outputs'][n]),
                         summary = summary)
 
                 graph.add_edge(f, n)
@@ -89,7 +105,7 @@ def plotGraph(logger, graph, fileName=None):
         otherNodes  = [m for m, d in graph.nodes(data=True) if ('module' != d['type'])]
         lables      = {m:m for m in graph.nodes}
 
-        pos = graphviz_layout(graph, prog='dot')
+        pos = nxPydot.graphviz_layout(graph, prog='dot')
         nx.draw_networkx_nodes(graph, pos, nodelist=moduleNodes, node_color='orange', node_size=500)
         nx.draw_networkx_nodes(graph, pos, nodelist=otherNodes, node_color='cyan', node_size=500)
         nx.draw_networkx_edges(graph, pos,  arrows=True)
@@ -219,7 +235,7 @@ def serializedToGraph(logger, nodes, edges):
     return graph
 
 @lD.log(logBase + '.uploadGraph')
-def uploadGraph(logger, graph, dbName=None):
+def uploadGraph(logger, graph, dbName=None, useCopy=False):
     '''upload the supplied graph to a database
     
     Given a graph, this function is going to upload the graph into
@@ -237,12 +253,20 @@ def uploadGraph(logger, graph, dbName=None):
         is the identifier within the ``db.json`` configuration file. (the 
         default is ``None``, which would use the default database specified
         within the same file)
+    useCopy : {bool}, optional
+        Upload the nodes and edges with ``COPY`` rather than with an ``insert``
+        statement, which is faster for large graphs (the default is ``False``)
     '''
 
     try:
 
         nodes, edges = graphToSerialized(graph)
 
+        if useCopy:
+            pgIO.copyFrom('graphs.nodes', nodes, dbName=dbName)
+            pgIO.copyFrom('graphs.edges', edges, dbName=dbName)
+            return
+
         queryNodes = '''insert into graphs.nodes values %s'''
         queryEdges = '''insert into graphs.edges values %s'''
 
@@ -0,0 +1,451 @@
+from logs import logDecorator as lD
+from logs import timings
+import json, os, hashlib, threading, logging, traceback, multiprocessing
+from importlib import util
+from time import time
+from datetime import datetime as dt
+from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from lib.resultGraph import graphLib
+from lib.profiler import profiler
+from lib.lazyImport.lazyImport import LazyModule
+from lib.configService import configService as cS
+
+nx = LazyModule('networkx')
+
+config = cS.getConfig('config.json')
+logBase = config['logging']['logBase'] + '.lib.resultGraph.pipeline'
+
+def moduleDependencies(graph, names):
+    '''the modules that every module depends on
+
+    A module depends on another module when one of its inputs is (possibly
+    through other modules) an output of the other module.
+
+    Parameters
+    ----------
+    graph : {networkX.DiGraph}
+        The graph of the modules (see ``graphLib.generateGraph``)
+    names : {list of str}
+        The modules to run. Dependencies on other modules are ignored.
+
+    Returns
+    -------
+    dict
+        The set of modules within ``names`` that each module depends on
+    '''
+    deps = {}
+    for n in names:
+        ancestors = nx.ancestors(graph, n) if n in graph.nodes else set()
+        deps[n] = set(m for m in names if m in ancestors)
+    return deps
+
+def _locations(spec):
+    # The files and folders among the inputs or outputs of a module
+    locations = []
+    for v in spec.values():
+        if isinstance(v, dict) and str(v.get('type', '')).startswith(('file-', 'folder-')) and 'location' in v:
+            locations.append(v['location'])
+    return locations
+
+def hashPath(path, fileHashes):
+    '''the content hash of a file or folder
+
+    The hash of every file is kept in ``fileHashes`` together with its size
+    and modification time, so that a file is only read again when it has
+    changed.
+
+    Parameters
+    ----------
+    path : {str}
+        The file or folder. A missing path has a hash of its own.
+    fileHashes : {dict}
+        The hashes of files computed earlier, ``{path: [size, mtime, hash]}``.
+        It is updated in place.
+
+    Returns
+    -------
+    str
+        The SHA-256 hash of the contents
+    '''
+    if os.path.isdir(path):
+        h = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for f in sorted(files):
+                full = os.path.join(root, f)
+                h.update(os.path.relpath(full, path).encode())
+                h.update(hashPath(full, fileHashes).encode())
+        return h.hexdigest()
+
+    if not os.path.exists(path):
+        return hashlib.sha256(b'missing').hexdigest()
+
+    stat = os.stat(path)
+    known = fileHashes.get(path)
+    if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return known[2]
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    fileHashes[path] = [stat.st_size, stat.st_mtime_ns, h.hexdigest()]
+    return h.hexdigest()
+
+def moduleHash(module, fileHashes, folder='../config/modules'):
+    '''the content hash of everything a module depends on
+
+    This covers the ``inputs`` and ``params`` of the module config, the
+    contents of the inputs that are files or folders, and the source file of
+    the module.
+
+    Parameters
+    ----------
+    module : {dict}
+        The entry of the module within ``modules.json``
+    fileHashes : {dict}
+        The file hashes computed earlier (see ``hashPath``)
+    folder : {str}, optional
+        Folder with the module configurations (the default is
+        ``'../config/modules'``)
+
+    Returns
+    -------
+    str
+        The SHA-256 hash
+    '''
+    h = hashlib.sha256()
+    configPath = os.path.join(folder, module['moduleName'] + '.json')
+    if os.path.exists(configPath):
+        spec = cS.getConfig(configPath, folder='')
+        h.update(json.dumps({'inputs': spec['inputs'], 'params': spec['params']}, sort_keys=True, default=str).encode())
+        for location in sorted(_locations(spec['inputs'])):
+            h.update(location.encode())
+            h.update(hashPath(location, fileHashes).encode())
+    h.update(hashPath(module['path'], fileHashes).encode())
+    return h.hexdigest()
+
+def outputsExist(module, folder='../config/modules'):
+    '''whether a module has outputs, all of which exist
+
+    Parameters
+    ----------
+    module : {dict}
+        The entry of the module within ``modules.json``
+    folder : {str}, optional
+        Folder with the module configurations (the default is
+        ``'../config/modules'``)
+
+    Returns
+    -------
+    bool
+        False when the module has no file or folder outputs, since it
+        cannot be known whether it is up to date
+    '''
+    configPath = os.path.join(folder, module['moduleName'] + '.json')
+    if not os.path.exists(configPath):
+        return False
+    locations = _locations(cS.getConfig(configPath, folder='')['outputs'])
+    return len(locations) > 0 and all(os.path.exists(l) for l in locations)
+
+def readState(stateFile):
+    '''the hashes saved by earlier runs, ``{'modules': {}, 'files': {}}``
+    '''
+    if stateFile is None or not os.path.exists(stateFile):
+        return {'modules': {}, 'files': {}}
+    with open(stateFile) as f:
+        return json.load(f)
+
+def writeState(stateFile, state):
+    '''save the hashes, replacing the file atomically
+    '''
+    folder = os.path.dirname(stateFile)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    with open(stateFile + '.tmp', 'w') as f:
+        json.dump(state, f, indent=1)
+    os.replace(stateFile + '.tmp', stateFile)
+    return
+
+def runModule(module, resultsDict):
+    '''load a module from its path and run its ``main``
+
+    Parameters
+    ----------
+    module : {dict}
+        The entry of the module within ``modules.json``
+    resultsDict : {dict}
+        The parsed command line arguments, passed on to the module
+
+    Returns
+    -------
+    object
+        The value returned by the ``main`` of the module
+    '''
+    # When the run is profiled, the module may run in a thread of the 
+    # pool, which is sampled under the name of the module
+    sampler = profiler.active
+    if sampler is not None:
+        with sampler.label('module.' + module['moduleName']):
+            return _runModule(module, resultsDict)
+    return _runModule(module, resultsDict)
+
+def _runModule(module, resultsDict):
+    module_spec = util.spec_from_file_location(module['moduleName'], module['path'])
+    m = util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(m)
+    return m.main(resultsDict)
+
+def _processMain(module, resultsDict, memoryMB, logFile, writer):
+    # Runs within the child process: limit the memory, send everything
+    # printed or logged to the log file of the module, and send the
+    # outcome back through the pipe
+    if memoryMB is not None:
+        import resource
+        limit = int(memoryMB * 1024 * 1024)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    with open(logFile, 'w') as f, redirect_stdout(f), redirect_stderr(f):
+        handler = logging.StreamHandler(f)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        logger = logging.getLogger(config['logging']['logBase'])
+        logger.addHandler(handler)
+        level = resultsDict.get('config', {}).get('logging', {}).get('level', config['logging']['level'])
+        logger.setLevel(level)
+
+        try:
+            outcome = {'status': 'done', 'value': runModule(module, resultsDict)}
+        except BaseException:
+            traceback.print_exc()
+            outcome = {'status': 'failed', 'error': traceback.format_exc()}
+
+    outcome['metrics'] = timings.state()
+    try:
+        writer.send(outcome)
+    except Exception:
+        # The returned value cannot be pickled
+        outcome['value'] = repr(outcome['value'])
+        writer.send(outcome)
+    writer.close()
+    return
+
+@lD.log(logBase + '.runProcess')
+def runProcess(logger, module, resultsDict, results, timeout=None, memoryMB=None, logFolder='logs/modules'):
+    '''run a module within a process of its own
+
+    The module runs within a new (spawned) process, so that CPU-heavy modules
+    do not block each other, and a crash or a runaway module does not affect
+    the rest. Whatever the module prints or logs goes into a log file of its
+    own. The entry of the module within ``modules.json`` may give its own
+    ``timeout`` and ``memoryMB``.
+
+    Parameters
+    ----------
+    logger : {logging.Logger}
+        The logger used for logging error information
+    module : {dict}
+        The entry of the module within ``modules.json``
+    resultsDict : {dict}
+        The parsed command line arguments, passed on to the module
+    results : {dict}
+        The outcome of the module is added to this under its name: the
+        ``status`` (``'done'``, ``'failed'`` or ``'timeout'``), the ``seconds``
+        taken, the ``logFile``, and either the ``value`` returned by its
+        ``main`` or the ``error``
+    timeout : {number}, optional
+        Seconds after which the process is terminated (the default is None,
+        which waits for ever)
+    memoryMB : {number}, optional
+        Limit of the address space of the process (``RLIMIT_AS``) in MB.
+        Allocations beyond it raise a ``MemoryError`` within the module (the
+        default is None, which sets no limit)
+    logFolder : {str}, optional
+        Folder of the log files (the default is ``'logs/modules'``)
+
+    Returns
+    -------
+    object
+        The value returned by the ``main`` of the module
+
+    Raises
+    ------
+    RuntimeError
+        When the module fails, times out or its process dies
+    '''
+    name     = module['moduleName']
+    timeout  = module.get('timeout', timeout)
+    memoryMB = module.get('memoryMB', memoryMB)
+
+    os.makedirs(logFolder, exist_ok=True)
+    logFile = os.path.join(logFolder, '{}_{}.log'.format(name, dt.now().strftime('%Y-%m-%d_%H-%M-%S')))
+
+    ctx = multiprocessing.get_context('spawn')
+    reader, writer = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_processMain, name=name, args=(module, resultsDict, memoryMB, logFile, writer))
+
+    t0 = time()
+    process.start()
+    writer.close()
+    try:
+        if reader.poll(timeout):
+            outcome = reader.recv()
+        else:
+            outcome = {'status': 'timeout', 'error': 'Timed out after {} seconds'.format(timeout)}
+            process.terminate()
+    except EOFError:
+        outcome = {'status': 'failed', 'error': 'The process died'}
+    finally:
+        reader.close()
+
+    process.join(5)
+    if process.is_alive():
+        process.kill()
+        process.join()
+    if outcome['status'] == 'failed' and process.exitcode not in (0, None):
+        outcome['error'] += ' (exit code {})'.format(process.exitcode)
+
+    timings.merge(outcome.pop('metrics', {}))
+    outcome.update({'seconds': time() - t0, 'logFile': logFile})
+    results[name] = outcome
+    log = logger.info if outcome['status'] == 'done' else logger.error
+    log('Module {} finished with status {} in {:.2f} seconds, see {}'.format(
+        name, outcome['status'], outcome['seconds'], logFile))
+
+    if outcome['status'] != 'done':
+        raise RuntimeError('Module {} {}: {}'.format(name, outcome['status'], outcome['error']))
+
+    return outcome['value']
+
+@lD.log(logBase + '.runPipeline')
+def runPipeline(logger, modules, run, maxWorkers=4, cache=None, force=False, folder='../config/modules'):
+    '''run modules in the order of their dependencies
+
+    The dependencies between the modules are found from the graph of
+    their inputs and outputs (see ``graphLib.generateGraph``). A module is
+    started as soon as the modules that it depends on have finished, so that
+    independent modules run in parallel. When a module fails, the modules that
+    depend on it are not run.
+
+    A module runs on the calling thread, rather than on a worker of the pool,
+    when it is the only one that can be started and no other module is
+    running, or when its entry sets ``"mainThread": true``. Such modules,
+    like the Dash app, need the main thread (for example to install signal
+    handlers). Modules already running on the pool go on meanwhile.
+
+    With the cache, a module is skipped (like ``make``) when its outputs exist
+    and the hash of its inputs, params and source (see ``moduleHash``) is the
+    one saved when the outputs were last produced.
+
+    Parameters
+    ----------
+    logger : {logging.Logger}
+        The logger used for logging error information
+    modules : {list of dict}
+        The entries of the modules to run within ``modules.json``
+    run : {callable}
+        Function that runs a module, given its entry. An exception marks the
+        module as failed.
+    maxWorkers : {int}, optional
+        Modules run at once (the default is 4)
+    cache : {dict}, optional
+        The ``cache`` section of ``execution.json``, with ``todo``,
+        ``stateFile`` and ``always`` (the modules never skipped). The default
+        is None, which runs every module.
+    force : {bool}, optional
+        Run every module, but still save the hashes (the default is False)
+    folder : {str}, optional
+        Folder with the module configurations (the default is
+        ``'../config/modules'``)
+
+    Returns
+    -------
+    dict
+        The status of every module: ``'done'``, ``'skipped'``, ``'failed'``
+        or ``'blocked'`` (a module that it depends on failed)
+    '''
+    cache   = cache or {'todo': False}
+    useHash = cache.get('todo', False) and cache.get('stateFile') is not None
+    state   = readState(cache.get('stateFile')) if useHash else None
+    lock    = threading.Lock()
+
+    byName  = {m['moduleName']: m for m in modules}
+    graph   = graphLib.generateGraph(folder)
+    pending = moduleDependencies(graph, list(byName))
+    status  = {}
+
+    def execute(name):
+        m = byName[name]
+        if not useHash:
+            run(m)
+            return 'done'
+
+        with lock:
+            fileHashes = dict(state['files'])
+        h = moduleHash(m, fileHashes, folder)
+        if (not force) and (name not in cache.get('always', [])) and outputsExist(m, folder) \
+                and state['modules'].get(name) == h:
+            logger.info('Module {} is up to date and is being skipped'.format(name))
+            return 'skipped'
+
+        run(m)
+        with lock:
+            state['files'].update(fileHashes)
+            state['modules'][name] = h
+            writeState(cache['stateFile'], state)
+        return 'done'
+
+    with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        running = {}
+        while pending or running:
+
+            ready = []
+            for name, deps in list(pending.items()):
+                if any(status.get(d) in ('failed', 'blocked') for d in deps):
+                    logger.error('Module {} is not run since a module it depends on failed'.format(name))
+                    status[name] = 'blocked'
+                    del pending[name]
+                elif all(status.get(d) in ('done', 'skipped') for d in deps):
+                    ready.append(name)
+                    del pending[name]
+
+            if len(ready) == 1 and not running:
+                onMain = ready
+            else:
+                onMain = [n for n in ready if byName[n].get('mainThread', False)]
+
+            for name in ready:
+                if name not in onMain:
+                    logger.info('Module {} is being executed'.format(name))
+                    running[executor.submit(execute, name)] = name
+
+            for name in onMain:
+                logger.info('Module {} is being executed on the main thread'.format(name))
+                try:
+                    status[name] = execute(name)
+                except Exception as e:
+                    logger.error('Module {} failed: {}'.format(name, e))
+                    status[name] = 'failed'
+
+            if onMain:
+                continue
+
+            if not running:
+                # Only modules on a cycle of the graph are left
+                for name in pending:
+                    logger.error('Module {} is not run since its dependencies form a cycle'.format(name))
+                    status[name] = 'blocked'
+                break
+
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    status[name] = future.result()
+                except Exception as e:
+                    logger.error('Module {} failed: {}'.format(name, e))
+                    status[name] = 'failed'
+
+    logger.info('Pipeline finished: {}'.format(status))
+
+    return status
@@ -27,6 +27,12 @@ which, given a particular version and library, will load and return the right
 library. In fact, it is possible to load multiple versions of the library, and
 this will allow one version to be compared with another efficiently.
 
+Every library is loaded only once per process by ``getLib()``, and kept within a 
+registry keyed by the name and version of the library. It is loaded again only when 
+the modification time of its file changes. Hence ``getLib()`` can be called within 
+loops that switch between versions. ``preload()`` loads the libraries of a list of
+versions ahead of their use, for example when a module starts.
+
 You are encouraged to maintain this structure for consistency in all your projects.
 
 '''
\ No newline at end of file
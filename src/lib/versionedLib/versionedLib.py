@@ -1,13 +1,25 @@
 from logs       import logDecorator as lD
 from importlib  import util
-import jsonref, os
+import os, threading
+from lib.configService import configService as cS
 
-config = jsonref.load(open('../config/config.json'))
+config = cS.getConfig('config.json')
 logBase = config['logging']['logBase'] + '.lib.versionedLib.versionedLib'
 
+# Folder with one subfolder ``ver_<version>`` per version
+versionsFolder = 'lib/versionedLib/versions'
+
+# Modules loaded so far: (libName, version) -> (mtime, module)
+_registry = {}
+_lock     = threading.Lock()
+
 def getLib(version, libName):
     '''return a particular library dynamically, based upon a 
     version number.
+
+    Every library is loaded once per process and kept in a registry.
+    It is only loaded again when the modification time of its file
+    changes, so this can be called within loops.
     
     Parameters
     ----------
@@ -26,15 +38,72 @@ def getLib(version, libName):
 
     '''
 
-    
-    name = libName + '__' + version
-    path = f"lib/versionedLib/versions/ver_{version}/{libName}.py"
+    key  = (libName, version)
+    path = f"{versionsFolder}/ver_{version}/{libName}.py"
+
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        raise AssertionError(f'Unable to find the library: {path}')
 
-    assert os.path.exists(path), f'Unable to find the library: {path}'
-            
-    module_spec = util.spec_from_file_location(name, path)
-    module = util.module_from_spec(module_spec)
-    module_spec.loader.exec_module(module)
+    entry = _registry.get(key)
+    if entry is not None and entry[0] == mtime:
+        return entry[1]
+
+    with _lock:
+        entry = _registry.get(key)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+
+        name = libName + '__' + version
+        module_spec = util.spec_from_file_location(name, path)
+        module = util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+        _registry[key] = (mtime, module)
 
     return module
 
+@lD.log(logBase + '.preload')
+def preload(logger, versions, libNames=None):
+    '''load libraries ahead of their use
+
+    Loading the libraries at startup means that code switching between
+    versions later on only looks them up within the registry.
+
+    Parameters
+    ----------
+    logger : {logging.Logger}
+        The logger used for logging error information
+    versions : list of str
+        The versions to load
+    libNames : list of str, optional
+        The libraries to load (the default is None, which loads every
+        library present within the folder of each version)
+
+    Returns
+    -------
+    list of tuple
+        The ``(libName, version)`` of the libraries loaded
+    '''
+
+    loaded = []
+    for version in versions:
+        names = libNames
+        if names is None:
+            folder = f"{versionsFolder}/ver_{version}"
+            names  = sorted(f[:-3] for f in os.listdir(folder) 
+                        if f.endswith('.py') and not f.startswith('__'))
+        for libName in names:
+            getLib(version, libName)
+            loaded.append((libName, version))
+
+    logger.info('Preloaded {} versioned libraries'.format(len(loaded)))
+
+    return loaded
+
+def clearLibs():
+    '''forget all the loaded libraries
+    '''
+    with _lock:
+        _registry.clear()
+    return
@@ -1,7 +1,7 @@
 from logs       import logDecorator as lD
-import jsonref
+from lib.configService import configService as cS
 
-config = jsonref.load(open('../config/config.json'))
+config = cS.getConfig('config.json')
 logBase = config['logging']['logBase'] + '.lib.versionedLib.versionedLib.ver_1_001'
 
 class someVersionedClass:
@@ -18,12 +18,16 @@ example if the ``logging`` section is shown below. Details of the different
 sections will be described in the documentation that follows.
 
 .. code-block:: python
-    :emphasize-lines: 5,10,14
+    :emphasize-lines: 4,5,9
 
     "logging":{
         
         "logBase" : "VDL",
         "level"   : "INFO",
+        "decorator" : {
+            "mode"       : "verbose",
+            "flushEvery" : 60
+        },
         "specs"   : {
 
             "file":{
@@ -39,7 +43,11 @@ sections will be described in the documentation that follows.
                 "todo"     : false,
                 "version"  : 1,
                 "port"     : 5959,
-                "host"     : "localhost"
+                "host"     : "localhost",
+                "queueSize"     : 10000,
+                "batchSize"     : 500,
+                "flushInterval" : 1.0,
+                "blockTimeout"  : 0
             }
 
         }
@@ -58,6 +66,42 @@ to their respective logging levels.
  - ``'INFO'``     mapped to ``logging.INFO``
  - ``'DEBUG'``    mapped to ``logging.DEBUG``
 
+The ``"decorator"`` Segment
+---------------------------
+
+The ``logDecorator.log`` decorator resolves the logger of a function once, when the 
+function is decorated, and comes in two modes:
+
+ - ``"verbose"`` logs the start of every call and the time it took. This is the 
+   default, and the output that ``bin/checkTime.sh`` summarizes. Nothing is formatted 
+   when the ``INFO`` level is disabled.
+ - ``"histogram"`` adds the time taken by every call to an in-memory histogram of the
+   function (``logs.timings``) instead of writing log lines. Every ``"flushEvery"``
+   seconds, at the end of the main program and at exit, each function called since 
+   the last flush gets a single line with the number of calls, and the total, mean,
+   median, 95th percentile and maximum time. 
+
+The histogram mode is meant for functions that are called millions of times in batch
+jobs. It can be turned on for all the functions here, or for a single hot function 
+with ``@lD.log(logBase + '.f', mode='histogram')``. The overhead per call of each mode
+is measured by ``benchmarks/benchLogDecorator.py``.
+
+Timing Metrics
+^^^^^^^^^^^^^^
+
+In both modes, the time taken by every call, and whether it raised an exception, is
+added to a registry of metrics (``logs.timings``), under the name of the logger of the 
+function. Functions that do not take a logger, such as methods and Dash callbacks, can
+be added with ``@timings.timed(name)``. For every function, the registry gives the 
+number of calls and failures, and the total, mean, p50, p95, p99 and maximum time. These
+can be obtained at any time with ``timings.metrics()``, ``timings.toJSON()`` and 
+``timings.toPrometheus()``. The Dash app serves them at ``/metrics`` and 
+``/metrics.json``.
+
+At the end of ``VDL.main``, a table of the metrics is logged, including those of the 
+modules that ran in processes of their own. ``bin/checkTime.sh`` prints this table 
+from the last log file, rather than adding up the lines of the individual calls.
+
 The ``"specs"`` Segment
 -----------------------
 
@@ -122,4 +166,13 @@ along with the port. An example output is shown:
 This can then be sent to elasticsearch. If you need specific things filtered, you can 
 directly use the filtering capabilities of logstash to generate this information. 
 
+Records are shipped by ``logs.asyncLogstash.AsyncLogstashHandler``, so that a slow or 
+unreachable logstash does not stall the program. Logging a record only puts it on a 
+queue of at most ``"queueSize"`` records. A background thread sends the records in 
+batches of up to ``"batchSize"`` records, or whatever has arrived within 
+``"flushInterval"`` seconds. When the queue is full, a record is dropped after waiting 
+``"blockTimeout"`` seconds for room (by default it is dropped at once). The number of
+records sent, dropped and lost to failed connections is given by the ``stats`` method
+of the handler, and printed on stderr at exit when records went missing.
+
 '''
\ No newline at end of file
@@ -0,0 +1,220 @@
+'''Asynchronous, batched shipping of log records to logstash
+
+The ``logstash.TCPLogstashHandler`` writes every record to its socket on the
+thread that logs it, so that a slow or unreachable logstash stalls the
+program. The ``AsyncLogstashHandler`` only puts the record on a bounded queue.
+A background thread takes the records off the queue, formats them with the
+formatter of ``python-logstash``, and sends them over TCP in batches of up to
+``batchSize`` records, or whatever has been gathered within ``flushInterval``
+seconds.
+
+When the queue is full, the logging thread waits at most ``blockTimeout``
+seconds for room, after which the record is dropped. Records are also lost
+when a batch cannot be sent, in which case the connection is opened again for
+the next batch. These are counted in ``dropped`` and ``failed``, next to the
+``sent`` records, and reported by ``stats``.
+'''
+
+import copy, logging, queue, socket, sys, threading
+from time import monotonic, sleep
+
+class AsyncLogstashHandler(logging.Handler):
+    '''logging handler that ships records to logstash from a background thread
+    '''
+
+    def __init__(self, host, port=5959, version=1, tags=None, messageType='logstash',
+        queueSize=10000, batchSize=500, flushInterval=1.0, blockTimeout=0, sendTimeout=5.0):
+        '''initialize the handler and start its thread
+
+        Parameters
+        ----------
+        host : {str}
+            The host of the logstash server
+        port : {int}, optional
+            The TCP port of the logstash server (the default is 5959)
+        version : {int}, optional
+            The version of the logstash event schema (the default is 1)
+        tags : {list of str}, optional
+            Tags added to every event (the default is None)
+        messageType : {str}, optional
+            The ``type`` of every event (the default is 'logstash')
+        queueSize : {int}, optional
+            The largest number of records waiting to be sent (the default is
+            10000)
+        batchSize : {int}, optional
+            The largest number of records sent at once (the default is 500)
+        flushInterval : {float}, optional
+            The longest time in seconds that a record waits for a batch to
+            fill (the default is 1.0)
+        blockTimeout : {float}, optional
+            The longest time in seconds that the logging thread waits for room
+            in a full queue before the record is dropped (the default is 0)
+        sendTimeout : {float}, optional
+            The timeout in seconds of connecting and sending, after which the
+            batch is lost (the default is 5.0)
+        '''
+        super().__init__()
+
+        from logstash import formatter
+        if version == 1:
+            self.formatter = formatter.LogstashFormatterVersion1(messageType, tags)
+        else:
+            self.formatter = formatter.LogstashFormatterVersion0(messageType, tags)
+
+        self.address       = (host, port)
+        self.batchSize     = batchSize
+        self.flushInterval = flushInterval
+        self.blockTimeout  = blockTimeout
+        self.sendTimeout   = sendTimeout
+
+        self.queue   = queue.Queue(maxsize=queueSize)
+        self.sock    = None
+        self.sent    = 0
+        self.dropped = 0
+        self.failed  = 0
+
+        self.thread = threading.Thread(target=self._run, name='AsyncLogstashHandler', daemon=True)
+        self.thread.start()
+        return
+
+    def emit(self, record):
+        '''put a record on the queue, or drop it when the queue stays full
+
+        Parameters
+        ----------
+        record : {logging.LogRecord}
+            The record
+        '''
+        try:
+            # The message is merged on this thread, as the arguments may
+            # change once the call returns
+            record      = copy.copy(record)
+            record.msg  = record.getMessage()
+            record.args = None
+            if self.blockTimeout > 0:
+                self.queue.put(record, timeout=self.blockTimeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+        return
+
+    def _run(self):
+        # The background thread: gather batches and send them, until the
+        # sentinel None is found on the queue
+        while True:
+            record = self.queue.get()
+            if record is None:
+                self.queue.task_done()
+                return
+
+            batch    = [record]
+            deadline = monotonic() + self.flushInterval
+            stop     = False
+            while len(batch) < self.batchSize:
+                try:
+                    record = self.queue.get(timeout=max(deadline - monotonic(), 0))
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                    break
+                batch.append(record)
+
+            self._send(batch)
+            for _ in range(len(batch) + stop):
+                self.queue.task_done()
+            if stop:
+                return
+
+    def _send(self, batch):
+        # Send a batch over TCP, connecting if necessary
+        try:
+            data = b''.join(self.formatter.format(r) + b'\n' for r in batch)
+            if self.sock is None:
+                self.sock = socket.create_connection(self.address, timeout=self.sendTimeout)
+            self.sock.sendall(data)
+            self.sent += len(batch)
+        except Exception:
+            self.failed += len(batch)
+            if self.sock is not None:
+                self.sock.close()
+                self.sock = None
+        return
+
+    def stats(self):
+        '''the number of records sent, dropped and lost
+
+        Returns
+        -------
+        dict
+            ``sent``, ``dropped`` (the queue was full), ``failed`` (the batch
+            could not be sent) and ``queued`` (waiting to be sent)
+        '''
+        return {'sent': self.sent, 'dropped': self.dropped,
+            'failed': self.failed, 'queued': self.queue.qsize()}
+
+    def flush(self, timeout=None):
+        '''wait for the queued records to be sent
+
+        Parameters
+        ----------
+        timeout : {float}, optional
+            The longest time to wait in seconds (the default is None, which
+            uses ``flushInterval + sendTimeout``)
+        '''
+        timeout  = self.flushInterval + self.sendTimeout if timeout is None else timeout
+        deadline = monotonic() + timeout
+        while self.thread.is_alive() and self.queue.unfinished_tasks and monotonic() < deadline:
+            sleep(0.01)
+        return
+
+    def close(self):
+        '''send the queued records, stop the thread and close the connection
+
+        Records that are dropped or lost are reported on stderr.
+        '''
+        if self.thread.is_alive():
+            try:
+                self.queue.put(None, timeout=self.sendTimeout)
+            except queue.Full:
+                pass
+            self.thread.join(self.flushInterval + self.sendTimeout)
+
+        if self.sock is not None and not self.thread.is_alive():
+            self.sock.close()
+            self.sock = None
+
+        if self.dropped or self.failed:
+            print('AsyncLogstashHandler: {sent} records sent, {dropped} dropped '
+                'and {failed} lost'.format(**self.stats()), file=sys.stderr)
+
+        super().close()
+        return
+
+def fromSpecs(specs, tags):
+    '''the handler for the ``specs.logstash`` section of config.json
+
+    Parameters
+    ----------
+    specs : {dict}
+        The ``logging.specs.logstash`` section, with ``host``, ``port``,
+        ``version`` and optionally ``tags``, ``queueSize``, ``batchSize``,
+        ``flushInterval`` and ``blockTimeout``
+    tags : {list of str}
+        Tags added to every event, before those of ``specs``
+
+    Returns
+    -------
+    AsyncLogstashHandler
+        The handler
+    '''
+    options = ['queueSize', 'batchSize', 'flushInterval', 'blockTimeout', 'sendTimeout']
+    return AsyncLogstashHandler(
+        host    = specs['host'],
+        port    = specs['port'],
+        version = specs['version'],
+        tags    = tags + specs.get('tags', []),
+        **{k: specs[k] for k in options if k in specs})
@@ -1,8 +1,27 @@
 from datetime import datetime as dt
-from time import time
-import json, logging, sys
+from time import time, perf_counter
+import inspect, json, logging, sys
 from functools import wraps
-import logstash
+
+from logs import timings, asyncLogstash
+from lib.configService import configService as cS
+
+def decoratorSettings():
+    '''the ``logging.decorator`` section of config.json
+
+    Returns
+    -------
+    dict
+        The ``mode`` (``'verbose'`` or ``'histogram'``) and ``flushEvery``
+        (seconds) of the decorator, with their defaults when they are not
+        specified
+    '''
+    settings = {'mode': 'verbose', 'flushEvery': 60}
+    try:
+        settings.update(cS.getConfig('config.json')['logging'].get('decorator', {}))
+    except (OSError, KeyError):
+        pass
+    return settings
 
 class log(object):
     '''decorator for logging values
@@ -18,7 +37,7 @@ class log(object):
     inserting values into the decorator. 
     '''
 
-    def __init__(self, base):
+    def __init__(self, base, mode=None):
         '''initialize the decorator
         
         Parameters
@@ -26,23 +45,73 @@ class log(object):
         base : {str}
             The string used for prepending the value of the decorator
             with the right path for this function. 
+        mode : {str}, optional
+            ``'verbose'`` logs the start and the run time of every call, 
+            and ``'histogram'`` adds the run time of every call to an 
+            in-memory histogram (see ``logs.timings``) that is flushed 
+            periodically. The default is None, which uses the ``mode`` of
+            ``logging.decorator`` in config.json. In both modes, the run 
+            time of every call, and whether it failed, are added to the 
+            metrics of ``logs.timings``. Generator functions are not timed,
+            as a call only creates the generator: they just get the logger.
         '''
         self.base   = base
+        self.mode   = mode
         return
 
     def __call__(self, f):
 
-        from time import time
+        settings = decoratorSettings()
+        mode     = self.mode or settings['mode']
+        logger   = logging.getLogger(self.base)
+        name     = f.__name__
+
+        if inspect.isgeneratorfunction(f):
+
+            @wraps(f)
+            def wrappedF(*args, **kwargs):
+                return f(logger, *args, **kwargs)
+
+            return wrappedF
+
+        histogram = timings.getHistogram(self.base, summarize=(mode == 'histogram'))
+
+        if mode == 'histogram':
+
+            timings.flushEvery = settings['flushEvery']
+
+            @wraps(f)
+            def wrappedF(*args, **kwargs):
+                t0 = perf_counter()
+                try:
+                    result = f(logger, *args, **kwargs)
+                except BaseException:
+                    histogram.add(perf_counter() - t0, failed=True)
+                    raise
+                t1 = perf_counter()
+                histogram.add(t1 - t0)
+                if t1 >= timings.nextFlush:
+                    timings.flush()
+
+                return result
+
+            return wrappedF
 
         # Function to return
         @wraps(f)
         def wrappedF(*args, **kwargs):
-            logger = logging.getLogger(self.base)
-            logger.info('Starting the function [{}] ...'.format(f.__name__))
-            t0     = time()
-            result = f(logger, *args, **kwargs)
-            logger.info('Finished the function [{}] in {:.6e} seconds'.format( 
-                f.__name__, time() - t0 ))
+            if logger.isEnabledFor(logging.INFO):
+                logger.info('Starting the function [%s] ...', name)
+            t0 = perf_counter()
+            try:
+                result = f(logger, *args, **kwargs)
+            except BaseException:
+                histogram.add(perf_counter() - t0, failed=True)
+                raise
+            t1 = perf_counter()
+            histogram.add(t1 - t0)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info('Finished the function [%s] in %.6e seconds', name, t1 - t0)
 
             return result
 
@@ -121,18 +190,7 @@ class logInit(object):
             # Generate a file handler if necessary
             if ('logstash' in self.specs) and self.specs['logstash']['todo']:
 
-                tags = [ 'VDL' , now]
-
-                if 'tags' in self.specs['logstash']:
-                    tags += self.specs['logstash']['tags']
-                
-
-                lH = logstash.TCPLogstashHandler(
-                    host    = self.specs['logstash']['host'], 
-                    port    = self.specs['logstash']['port'], 
-                    version = self.specs['logstash']['version'],
-                    tags    = tags)
-                
+                lH = asyncLogstash.fromSpecs(self.specs['logstash'], [ 'VDL' , now])
                 logger.addHandler(lH)
 
             # set the level of the handler
@@ -141,6 +199,7 @@ class logInit(object):
             logger.info('Starting the main program ...')
             t0     = time()
             result = f(logger, *args, **kwargs)
+            timings.flush()
             logger.info('Finished the main program in {:.6e} seconds'.format( time() - t0 ))
 
             return result
@@ -0,0 +1,344 @@
+'''Registry of the run times of functions
+
+Every function decorated with ``logs.logDecorator.log`` (or with ``timed``)
+has a histogram of the run times of its calls, kept under the name of its
+logger. Generator functions are left out, since a call only creates the
+generator. The histograms
+have log-spaced buckets, ten to a decade, from 100 ns to 100000 s, so that a
+call costs a ``math.log10`` and an increment. Failed calls (those raising an
+exception) are counted as well.
+
+The histograms cover the whole run, and can be exported at any time:
+
+- ``metrics``: the count, failures, total, mean, p50, p95, p99 and maximum run
+  time of every function, as a dictionary
+- ``toJSON``: the same as JSON
+- ``toPrometheus``: the same in the Prometheus text format
+- ``summaryTable``: the same as a table, which is logged at the end of the
+  main program
+
+In the ``histogram`` mode of the decorator, the functions do not log their
+calls. Instead, all the histograms are flushed together every ``flushEvery``
+seconds, at the end of the main program and at exit: every such function
+called since the last flush gets one summary line on its logger.
+
+Modules running in processes of their own send the ``state`` of their
+histograms back to the main process, where it is added with ``merge``.
+'''
+
+import atexit, json, logging, math, threading
+from time import perf_counter
+from functools import wraps
+
+# Buckets of the histograms
+minTime    = 1e-7
+perDecade  = 10
+nBuckets   = 12 * perDecade
+
+# Seconds between two flushes, and the (perf_counter) time of the next one
+flushEvery = 60
+nextFlush  = perf_counter() + flushEvery
+
+_histograms = {} # logger name -> Histogram
+_lock       = threading.Lock()
+
+def _quantile(counts, count, q, maxTime):
+    # The upper edge of the bucket holding the quantile q, at most maxTime
+    needed = q * count
+    seen   = 0
+    for i, c in enumerate(counts):
+        seen += c
+        if c and seen >= needed:
+            return min(minTime * 10 ** ((i + 1) / perDecade), maxTime)
+    return 0.0
+
+class Histogram():
+    '''log-spaced histogram of run times
+
+    Calls are added without a lock, which would cost more than the rest of
+    ``add``. Calls from several threads that finish at the same moment may
+    therefore, rarely, be counted once.
+    '''
+
+    def __init__(self):
+        '''initialize an empty histogram
+        '''
+        self.counts    = [0] * nBuckets
+        self.count     = 0
+        self.failures  = 0
+        self.total     = 0.0
+        self.max       = 0.0
+        self.summarize = False # summarized by flush
+
+        # The state at the last flush
+        self.flushed   = ([0] * nBuckets, 0, 0.0)
+        self.recentMax = 0.0
+        return
+
+    def add(self, seconds, failed=False):
+        '''add the run time of a call
+
+        Parameters
+        ----------
+        seconds : {float}
+            The run time
+        failed : {bool}, optional
+            Whether the call raised an exception (the default is False)
+        '''
+        i = int(perDecade * math.log10(seconds / minTime)) if seconds > minTime else 0
+        self.counts[min(i, nBuckets - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if failed:
+            self.failures += 1
+        if seconds > self.recentMax:
+            self.recentMax = seconds
+            if seconds > self.max:
+                self.max = seconds
+        return
+
+    def quantile(self, q):
+        '''approximate quantile of the run times
+
+        Parameters
+        ----------
+        q : {float}
+            The quantile, between 0 and 1
+
+        Returns
+        -------
+        float
+            The upper edge of the bucket that holds the quantile (at most the
+            largest run time), or 0 for an empty histogram
+        '''
+        return _quantile(self.counts, self.count, q, self.max)
+
+    def state(self):
+        '''the contents of the histogram
+
+        Returns
+        -------
+        dict
+            The ``counts`` of the buckets, and the ``count``, ``failures``,
+            ``total`` and ``max``
+        '''
+        return {'counts': list(self.counts), 'count': self.count,
+            'failures': self.failures, 'total': self.total, 'max': self.max}
+
+def getHistogram(name, summarize=False):
+    '''the histogram of a logger name
+
+    Parameters
+    ----------
+    name : {str}
+        The name of the logger of the function
+    summarize : {bool}, optional
+        Whether ``flush`` logs summaries of this histogram (the default is
+        False)
+
+    Returns
+    -------
+    Histogram
+        The single histogram kept for this name
+    '''
+    with _lock:
+        if name not in _histograms:
+            _histograms[name] = Histogram()
+        h = _histograms[name]
+        h.summarize = h.summarize or summarize
+        return h
+
+def timed(name):
+    '''decorator adding the run times of a function to its histogram
+
+    Unlike ``logs.logDecorator.log``, no logger is injected, so that methods
+    and callbacks keep their signature.
+
+    Parameters
+    ----------
+    name : {str}
+        The name of the histogram, like the name of the logger of the function
+    '''
+    histogram = getHistogram(name)
+
+    def decorator(f):
+
+        @wraps(f)
+        def wrappedF(*args, **kwargs):
+            t0 = perf_counter()
+            try:
+                result = f(*args, **kwargs)
+            except BaseException:
+                histogram.add(perf_counter() - t0, failed=True)
+                raise
+            histogram.add(perf_counter() - t0)
+            return result
+
+        return wrappedF
+
+    return decorator
+
+def flush():
+    '''log a summary of the calls since the last flush
+
+    Every function of the ``histogram`` mode with calls since the last flush
+    gets one ``INFO`` line on its logger, with the number of calls, the total
+    and mean run time, and the median, 95th percentile and maximum run time
+    of these calls.
+    '''
+    global nextFlush
+    with _lock:
+        nextFlush  = perf_counter() + flushEvery
+        histograms = [(n, h) for n, h in _histograms.items() if h.summarize]
+
+    for name, h in histograms:
+        counts, count, total = h.flushed
+        if h.count == count:
+            continue
+
+        counts  = [c - p for c, p in zip(h.counts, counts)]
+        count   = h.count - count
+        total   = h.total - total
+        summary = (count, total, total / count, _quantile(counts, count, 0.5, h.recentMax),
+            _quantile(counts, count, 0.95, h.recentMax), h.recentMax)
+        h.flushed   = (list(h.counts), h.count, h.total)
+        h.recentMax = 0.0
+
+        logger = logging.getLogger(name)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('Timings of [%s] over %d calls: total %.6e s, mean %.6e s, '
+                'p50 %.6e s, p95 %.6e s, max %.6e s', name.split('.')[-1], *summary)
+
+    return
+
+def state():
+    '''the contents of all the histograms
+
+    Returns
+    -------
+    dict
+        The ``Histogram.state`` of every logger name
+    '''
+    with _lock:
+        return {n: h.state() for n, h in _histograms.items() if h.count}
+
+def merge(states):
+    '''add the contents of histograms, such as those of another process
+
+    Parameters
+    ----------
+    states : {dict}
+        The ``Histogram.state`` of every logger name, as returned by ``state``
+    '''
+    for name, s in states.items():
+        h = getHistogram(name)
+        h.counts    = [c + d for c, d in zip(h.counts, s['counts'])]
+        h.count    += s['count']
+        h.failures += s['failures']
+        h.total    += s['total']
+        h.max       = max(h.max, s['max'])
+    return
+
+def metrics():
+    '''the metrics of every function
+
+    Returns
+    -------
+    dict
+        For every logger name, the ``count`` of calls, the ``failures``, and
+        the ``total``, ``mean``, ``p50``, ``p95``, ``p99`` and ``max`` run
+        time in seconds
+    '''
+    with _lock:
+        histograms = [(n, h) for n, h in _histograms.items() if h.count]
+
+    result = {}
+    for name, h in sorted(histograms):
+        result[name] = {
+            'count'    : h.count,
+            'failures' : h.failures,
+            'total'    : h.total,
+            'mean'     : h.total / h.count,
+            'p50'      : h.quantile(0.5),
+            'p95'      : h.quantile(0.95),
+            'p99'      : h.quantile(0.99),
+            'max'      : h.max}
+    return result
+
+def toJSON(path=None):
+    '''the metrics of every function as JSON
+
+    Parameters
+    ----------
+    path : {str}, optional
+        File to which the JSON is written as well (the default is None)
+
+    Returns
+    -------
+    str
+        The JSON of ``metrics``
+    '''
+    text = json.dumps(metrics(), indent=4)
+    if path is not None:
+        with open(path, 'w') as f:
+            f.write(text)
+    return text
+
+def toPrometheus(prefix='vdl'):
+    '''the metrics of every function in the Prometheus text format
+
+    Parameters
+    ----------
+    prefix : {str}, optional
+        Prefix of the names of the metrics (the default is 'vdl')
+
+    Returns
+    -------
+    str
+        A summary ``<prefix>_function_seconds`` with the quantiles 0.5, 0.95
+        and 0.99, and a counter ``<prefix>_function_failures_total``, labelled
+        by function
+    '''
+    values   = metrics()
+    seconds  = f'{prefix}_function_seconds'
+    failures = f'{prefix}_function_failures_total'
+
+    lines = [f'# HELP {seconds} Run time of the functions logged with lD.log',
+             f'# TYPE {seconds} summary']
+    for name, m in values.items():
+        for q, key in [('0.5', 'p50'), ('0.95', 'p95'), ('0.99', 'p99')]:
+            lines.append(f'{seconds}{{function="{name}",quantile="{q}"}} {m[key]!r}')
+        lines.append(f'{seconds}_sum{{function="{name}"}} {m["total"]!r}')
+        lines.append(f'{seconds}_count{{function="{name}"}} {m["count"]}')
+
+    lines += [f'# HELP {failures} Calls of the functions logged with lD.log that raised an exception',
+              f'# TYPE {failures} counter']
+    for name, m in values.items():
+        lines.append(f'{failures}{{function="{name}"}} {m["failures"]}')
+
+    return '\n'.join(lines) + '\n'
+
+def summaryTable(top=None):
+    '''the metrics of every function as a table
+
+    Parameters
+    ----------
+    top : {int}, optional
+        Only the functions with the largest total run time (the default is
+        None, which gives all the functions)
+
+    Returns
+    -------
+    str
+        One line per function, by decreasing total run time
+    '''
+    values = sorted(metrics().items(), key=lambda v: -v[1]['total'])[:top]
+    width  = max([len('function')] + [len(n) for n, _ in values])
+    lines  = ['{:<{w}s} {:>9s} {:>8s} {:>10s} {:>10s} {:>10s} {:>10s} {:>10s}'.format(
+        'function', 'count', 'failures', 'total [s]', 'mean [s]', 'p50 [s]', 'p95 [s]', 'p99 [s]', w=width)]
+    for name, m in values:
+        lines.append('{:<{w}s} {:9d} {:8d} {:10.3e} {:10.3e} {:10.3e} {:10.3e} {:10.3e}'.format(
+            name, m['count'], m['failures'], m['total'], m['mean'], m['p50'], m['p95'], m['p99'], w=width))
+    return '\n'.join(lines)
+
+atexit.register(flush)
@@ -29,6 +29,18 @@ The VDl module has three main python files:
 - ``utils.py`` has some helper functions to generate plots, extract and process 
     data from the raw_data that has been extracted locally.
 -  ``app.py`` runs the Dash app. It contains layout specicifcations and callback functions.
+-  ``sessionStore.py`` keeps the selected patient and filters of every browser session, so 
+    that several users (and several workers of the app) can use the dashboard at once.
+-  ``cohortIndex.py`` is built once when the app starts, and filters the comparative
+    population without scanning the complete data.
+-  ``heatmapAggregates.py`` precomputes per-patient sums and counts for the CGI heatmap, 
+    so that the heatmap of a population is a sum over its patients.
+-  ``figureCache.py`` caches the figures of the comparative population, so that 
+    switching back to a previous view does not regenerate the figure.
+-  ``diseaseCategories.py`` recodes DSM codes into disease categories. Every distinct 
+    code is matched against the regular expressions once, and the result is cached.
+-  ``normalizer.py`` cleans the ``Race`` and ``Sex`` values of the demographics with the 
+    rules of ``cleanData.json``, applied to every distinct value once.
 
 There are also some notebooks in the ``src`` folder which have been used in the testing phase:
 -  ``Queries.ipynb`` was used to generate the queries used in the ``utils.py``folder.
@@ -72,5 +84,126 @@ and for all subsequent times of running the app on ``app.py``.
     "description": "",
     "owner"      : ""
 
+Specifications for ``getData.json``
+-----------------------------------
+
+The demographics and TRIPS data of the cohort are pulled in ranges of ``partitionSize``
+patients, with ``concurrency`` ranges pulled at once. Each range is appended to the
+``patient_demographics`` and ``visits_data`` datasets as soon as it arrives. The number
+of connections in the pool of the database (see ``lib.databaseIO``) should be at least
+``concurrency``. With ``useCopy``, the TRIPS data is streamed with ``COPY`` rather than
+through a cursor.
+
+The highest ``typepatientid`` and ``days`` of every extraction are saved as watermarks within
+``_watermarks.json`` next to the datasets. With ``incremental``, only the patients with visits
+beyond the watermarks (or that joined or left the cohort) are pulled again, and their rows
+are replaced within the existing datasets. Only new visits are detected: rows of visits
+already extracted that are changed within the database (such as a corrected CGI) are not
+pulled again until the next full extraction. Set ``full`` (or ``--getData_full`` on the
+command line) to rebuild the datasets from scratch once, or ``incremental`` to ``false`` to
+always do so. Deleting the watermarks has the same effect.
+
+With ``clean``, every partition is cleaned (see ``cleanData.py``) as soon as it is pulled,
+and the datasets are written already clean. Otherwise, ``cleanData.py`` cleans the extracted
+datasets one partition at a time, so that neither step holds the complete data in memory.
+
+.. code-block:: python
+
+    "useCopy"    : false,
+    "extraction" : {
+        "concurrency"   : 4,
+        "partitionSize" : 5000,
+        "incremental"   : true,
+        "full"          : false,
+        "clean"         : false
+    }
+
+Specifications for ``cleanData.json``
+-------------------------------------
+
+The ``normalize`` parameters are the rules used to clean every column of the demographics,
+applied in order (see ``normalizer.py`` for the operations). For example, the ``Sex`` of a
+patient is kept only when it is ``M`` or ``F``:
+
+.. code-block:: python
+
+    "normalize" : {
+        "Race" : [
+            {"op": "equals",     "pattern": "",            "value": "other"},
+            {"op": "startswith", "pattern": "multiracial", "value": "mixed race"},
+            ...
+        ],
+        "Sex"  : [
+            {"op": "notin",      "pattern": ["M", "F"],    "value": "Unknown"}
+        ]
+    }
+
+Specifications for ``DaskApp.json``
+-----------------------------------
+
+The ``inputs`` are the column store datasets (see ``lib.columnStore``) that the app shows: the
+demographics extracted by ``getData`` and the visits cleaned by ``cleanData``. Being declared as
+inputs, they order the app after both modules in the graph mode of ``VDL.py``, and their contents
+are part of the hash of the app (see ``lib.resultGraph``). With ``mmap`` set, the files are 
+memory-mapped instead of read, so that the app starts without reading the complete data, and 
+the numeric columns are shared by all the workers through the page cache. For this, the datasets
+should be written as a single partition. Anything derived from the data (such as the cohort 
+index) is computed when it is first needed. The time taken for the data to load and for the 
+first request, together with the resident memory of the worker, are logged.
+
+.. code-block:: python
+
+    "inputs"  : {
+        "patient_demographics" : {
+            "type"        : "folder-dataset",
+            "location"    : "../data/intermediate/patient_demographics"
+        },
+        "visits_data2" : {
+            "type"        : "folder-dataset",
+            "location"    : "../data/intermediate/visits_data2"
+        }
+    },
+    "params"  : {
+        "data" : {
+            "mmap"          : true
+        }
+    }
+
+No data is shipped with the code. Without access to the database, the samples pickled by the
+``PatientSampler.ipynb`` notebook can be converted into these datasets instead, with 
+``columnStore.convertPickle``, from the ``src`` folder:
+
+.. code-block:: bash
+
+    python -c "from lib.columnStore import columnStore as cs; \
+        cs.convertPickle('../data/intermediate/demographics_sample.pkl', \
+                         '../data/intermediate/patient_demographics'); \
+        cs.convertPickle('../data/intermediate/visits_data_sample.pkl', \
+                         '../data/intermediate/visits_data2')"
+
+The app may also be served by several worker processes, for example with 
+``gunicorn --preload -w 4 modules.VDL.app:server`` run from the ``src`` folder.
+
+The ``sessionStore`` parameters control where the per-session state is kept and how many
+patients each worker caches in memory. The ``folder`` must be shared by all the workers
+serving the app. It may be placed under ``/dev/shm`` to keep the state in shared memory.
+Sessions beyond ``maxStored``, or unused for ``maxAge`` seconds, are removed from the folder
+every ``pruneEvery`` writes of a worker, or after ``pruneInterval`` seconds.
+
+.. code-block:: python
+
+    "sessionStore" : {
+        "folder"        : "../data/intermediate/sessions",
+        "maxCached"     : 32,
+        "memoryLimitMB" : 1024,
+        "maxStored"     : 10000,
+        "maxAge"        : 86400,
+        "pruneEvery"    : 100,
+        "pruneInterval" : 60
+    }
+
+The ``figureCache`` parameters bound the number of cached figures (``maxEntries``), their 
+total size (``maxMB``) and the number of seconds after which they expire (``ttl``). The 
+hit and miss counts of the cache are logged every ``logEvery`` lookups.
 
 '''
\ No newline at end of file
@@ -5,17 +5,48 @@ from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
 import dash_daq as dqq
 from modules.VDL import utils
+from modules.VDL.sessionStore import SessionStore
+from modules.VDL.cohortIndex import CohortIndex, scanFilter
+from modules.VDL.figureCache import FigureCache, makeKey
+from modules.VDL.heatmapAggregates import HeatmapAggregates
+from lib.columnStore import columnStore
+from lib.profiler import profiler
+from logs import logDecorator as lD
+from logs import timings
 # import utils
 
-import pickle
+import uuid, os, resource, flask
+from time import time
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 from plotly.subplots import make_subplots
 
 # avoid the pandas item deprecation warnings
 import warnings
+from lib.configService import configService as cS
 warnings.filterwarnings('ignore') 
 
+config = cS.getConfig('config.json')
+logBase = config['logging']['logBase'] + '.modules.VDL.app'
+startTime = time()
+
+def residentMB():
+    # Resident memory of this process. Falls back to the peak 
+    # resident memory where /proc is not available.
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024**2
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+@lD.log(logBase + '.logResources')
+def logResources(logger, event):
+    logger.info('{}: {:.2f} s after start, {:.1f} MB resident (pid {})'.format(
+        event, time() - startTime, residentMB(), os.getpid()))
+    return
+
 ###########################
 ######### Styling #########
 ###########################
@@ -32,26 +63,61 @@ colors = {
 ######### Get Data ########
 ###########################
 
-df = pickle.load(open('../data/intermediate/patient_demographics_sample.pkl','rb'))
-visits_data = pickle.load(open('../data/intermediate/visits_data_sample.pkl','rb'))
-visit_types_list = list(visits_data.groupby('VisitType')['VisitID'].count().sort_values(ascending=False).index.dropna())
-colorsIdx = {val:i+1 for i, val in enumerate(visit_types_list)}
-disease_list = visits_data.DiseaseCat.unique().tolist() 
+projConfig = cS.getConfig('modules/DaskApp.json')
+dataConfig = projConfig['params']['data']
+dataInputs = projConfig['inputs']
+sessionConfig = projConfig['params']['sessionStore']
+cacheConfig = projConfig['params']['figureCache']
+
+# With mmap, the numeric columns and the codes of the string columns 
+# (read as categoricals) are backed by the page cache, and are shared 
+# by all the workers of the app rather than copied.
+visit_columns = ['PatientID', 'VisitID', 'Days', 'VisitType', 'CGI', 'Medication', 'DiseaseCat']
+df = columnStore.readDataset(dataInputs['patient_demographics']['location'], mmap=dataConfig['mmap'], categorical=True)
+visits_data = columnStore.readDataset(dataInputs['visits_data2']['location'], columns=visit_columns, 
+                mmap=dataConfig['mmap'], categorical=True)
+logResources('Data loaded')
+
 cgi_change_options = ['CGI_Initial','CGI']
 period_options = {'Week':7, 'Month':28,'Year':365}
 default_filters = {'Sex': None, 'Race': None, 'Age': None,
                     'Medication': 'all', # not added yet. 
                     'DiseaseCat': 'all'}
 
+# Everything derived from the data is computed when it is first 
+# needed, so that the server binds as soon as the data is mapped.
+@lru_cache(maxsize=None)
+def getVisitTypes():
+    return list(visits_data.groupby('VisitType', observed=True)['VisitID'].count().sort_values(ascending=False).index.dropna())
+
+@lru_cache(maxsize=None)
+def getColorsIdx():
+    return {val:i+1 for i, val in enumerate(getVisitTypes())}
+
+@lru_cache(maxsize=None)
+def getDiseaseList():
+    return visits_data.DiseaseCat.unique().tolist() 
+
+@lru_cache(maxsize=None)
+def getCohortIndex():
+    return CohortIndex(df, visits_data) # built once for fast filtering
+
+@lru_cache(maxsize=None)
+def getHeatmapAggregates():
+    return HeatmapAggregates(visits_data, list(period_options))
+
 class patientQ():
-    def __init__(self, pid, df=df):
+    def __init__(self, pid, df=df, filt_values=None):
         if type(pid) != int: 
             pid = int(pid)
         self.pid = pid
-        self.patientData = visits_data[visits_data.PatientID == self.pid]
+        self.patientData = getCohortIndex().patientRows(self.pid)
         self.cpData = self.getCPData(visits_data)
         self.filteredData = None
         self.filt_values = default_filters.copy()
+        if filt_values is not None and filt_values != default_filters:
+            self.filt_values.update(filt_values)
+            self.add_filt()
         self.age = df.loc[df.PatientID == self.pid, 'Age'].item()
         self.sex = df.loc[df.PatientID == self.pid, 'Sex'].item()
         self.race = df.loc[df.PatientID == self.pid, 'Race'].item()
@@ -59,52 +125,81 @@ class patientQ():
 
     def getCPData(self, visits=visits_data):
         # Resets the patient's cpData from the original dataset. 
-        return visits_data[visits_data.PatientID != self.pid] 
+        return getCohortIndex().filter(default_filters, self.pid)
 
+    @timings.timed(logBase + '.patientQ.add_filt')
     def add_filt(self, demog=df, visits=visits_data, age_band=5):
         """For adding demographics filters to the comparative pop dataframe.
+        The precomputed cohort index is used for the app data, while any 
+        other data is filtered by scanning it.
         """
-        filt_values = self.filt_values
-        demog_filters = []
-        visit_filters = [visits.PatientID != self.pid]
-
-        for filt, val in filt_values.items():
-            if val != None:
-                if filt=='Medication' or filt=='DiseaseCat':
-                    if not val == 'all':
-                        if not isinstance(val, list): val = [val]
-                        f = visits[filt].isin(val)
-                        visit_filters.append(f)
-                    # else: 
-                        # visit_filters.append(visits.all(axis=1))
-                        
-                elif filt=='Age':
-                    f = abs(demog['Age']-filt_values['Age'])<=age_band
-                    demog_filters.append(f)
-                    
-                elif filt in ['Sex','Race']: 
-                    f = demog[filt]== val
-                    demog_filters.append(f)
-                    
-        if demog_filters != []:           
-            demog_pids = demog[pd.concat(demog_filters, axis=1).all(axis=1)]
-            visit_filters.append(visits.PatientID.isin(demog_pids.PatientID))
-
-        data_out = visits[pd.concat(visit_filters,axis=1).all(axis=1)] 
+        if demog is df and visits is visits_data:
+            data_out = getCohortIndex().filter(self.filt_values, self.pid, age_band=age_band)
+        else:
+            data_out = scanFilter(self.filt_values, self.pid, demog, visits, age_band=age_band)
         self.cpData = data_out
         
         return data_out
-    
-# Defining patient instance as global variable for easy refernecing.
-initial_pid = df.iloc[0,0] #516
-p = patientQ(initial_pid)
+
+    def state(self):
+        # The serializable part of the patient, saved per session.
+        return {'pid': self.pid, 'filt_values': dict(self.filt_values)}
+
+    def wholePatients(self):
+        # True if the population contains all the visits of its patients, 
+        # i.e. no visit-level filters are applied.
+        return all(self.filt_values.get(f, 'all') in (None, 'all') 
+                   for f in ['Medication', 'DiseaseCat'])
+
+    def populationKey(self):
+        # Identifies the comparative population for caching figures.
+        return makeKey(self.pid, self.filt_values)
+
+    def nbytes(self):
+        # Approximate memory held by this instance.
+        return int(self.patientData.memory_usage(deep=False).sum() + 
+                   self.cpData.memory_usage(deep=False).sum())
+
+# Each browser session works on its own patient. The state is shared by all the 
+# workers through the session folder, and the patients are cached per worker. 
+initial_pid = int(df.iloc[0,0]) #516
+sessions = SessionStore(sessionConfig['folder'],
+                factory       = lambda state: patientQ(state['pid'], filt_values=state['filt_values']),
+                sizeOf        = lambda p: p.nbytes(),
+                maxCached     = sessionConfig['maxCached'],
+                memoryLimitMB = sessionConfig['memoryLimitMB'],
+                maxStored     = sessionConfig['maxStored'],
+                maxAge        = sessionConfig['maxAge'],
+                pruneEvery    = sessionConfig['pruneEvery'],
+                pruneInterval = sessionConfig['pruneInterval'])
+
+# Figures of the comparative population, shared by all sessions of a worker
+figureCache = FigureCache(maxEntries = cacheConfig['maxEntries'],
+                          maxMB      = cacheConfig['maxMB'],
+                          ttl        = cacheConfig['ttl'],
+                          logEvery   = cacheConfig['logEvery'])
+
+def getPatient(session_id):
+    return sessions.get(session_id, 
+        default = lambda: {'pid': initial_pid, 'filt_values': default_filters.copy()})
 
 ####################
 ###### Layout ######
 ####################
 
-app.layout = html.Div(style={'backgroundColor':colors['background']},
+def serve_layout():
+    # Dash also calls this without a request, to validate the layout. No 
+    # session (and no patient) is needed for that.
+    if not flask.has_request_context():
+        session_id, cpop_count = None, ''
+    else:
+        # A new session id is generated every time the page is loaded
+        session_id = str(uuid.uuid4())
+        p = getPatient(session_id)
+        cpop_count = 'There are {} similar patients in this population.'.format(len(p.cpData.PatientID.unique()))
+    return html.Div(style={'backgroundColor':colors['background']},
     children=[
+    dcc.Store(id='session_id', data=session_id),
     html.H1(children='VisualDecisionLinc',
             style={'textAlign': 'center', 'color':colors['text']}),
     ## Left side Bar
@@ -129,8 +224,7 @@ app.layout = html.Div(style={'backgroundColor':colors['background']},
     dcc.Store(id='filt_values'),
     html.Div([
         html.H3('Comparative Population', style={'color':colors['text']}),
-        html.Div('There are {} similar patients in this population.'.format(len(p.cpData.PatientID.unique())),
-                id='cpop_count'),
+        html.Div(cpop_count, id='cpop_count'),
         html.Hr(), 
         dcc.Loading(id="loading-plot2", children=[dcc.Graph(id='plot2')]),
         html.Hr(),
@@ -141,7 +235,7 @@ app.layout = html.Div(style={'backgroundColor':colors['background']},
             html.Br(),
             html.Div([ ## visible only if view_options button is clicked
                 dcc.Dropdown(id='comorbid_dropdown',
-                     options=[{'label' :d, 'value': d} for d in disease_list],
+                     options=[{'label' :d, 'value': d} for d in getDiseaseList()],
                      value='major depressive disorder'
                     #  ,style={'width': '50%', 'float':'right', 'display': 'inline-block'}
                      ),
@@ -173,6 +267,28 @@ app.layout = html.Div(style={'backgroundColor':colors['background']},
     ],style={'width': '48%', 'float': 'right', 'display': 'inline-block'})
 ])
 
+app.layout = serve_layout
+server = app.server
+
+served = False
+
+@server.before_request
+def firstRequest():
+    # Time to the first request and the memory of this worker
+    global served
+    if not served:
+        served = True
+        logResources('First request')
+
+@server.route('/metrics')
+def metrics():
+    # Run times of the timed functions, for Prometheus
+    return flask.Response(timings.toPrometheus(), mimetype='text/plain')
+
+@server.route('/metrics.json')
+def metricsJSON():
+    return flask.Response(timings.toJSON(), mimetype='application/json')
+
 ###############################
 ###### Reactive Elements ######
 ###############################
@@ -180,9 +296,9 @@ app.layout = html.Div(style={'backgroundColor':colors['background']},
 @app.callback(
     Output('selected_pid', 'value'),
     [Input('reset_pid_button','n_clicks')],
-    [State('selected_pid','value')])
-def reset_patient(n_clicks, pid):
-    global p 
+    [State('selected_pid','value'),
+     State('session_id','data')])
+def reset_patient(n_clicks, pid, session_id):
     # only changes the pid if button is clicked. 
     if n_clicks is None: 
         raise PreventUpdate
@@ -193,6 +309,7 @@ def reset_patient(n_clicks, pid):
             raise PreventUpdate
         else:
             p = patientQ(pid) # update new selected patient
+            sessions.set(session_id, p.state(), p)
             return pid
 
 @app.callback(
@@ -206,9 +323,10 @@ def hide_div_toggle(n_clicks):
 
 @app.callback(
     Output('demog_filt', 'options'),
-    [Input('selected_pid','value')])
-def apply_demog_filter(pid):
-    global p 
+    [Input('selected_pid','value')],
+    [State('session_id','data')])
+def apply_demog_filter(pid, session_id):
+    p = getPatient(session_id)
     return [{'label': 'Age: {}'.format( p.age ), 'value':p.age},
             {'label': 'Sex: {}'.format( p.sex ), 'value':p.sex},
             {'label': 'Race: {}'.format( p.race ), 'value': p.race}]
@@ -217,10 +335,12 @@ def apply_demog_filter(pid):
     Output('comorbid_filt', 'options'),
     [Input('reset_filter','n_clicks'),
     Input('apply_filter','n_clicks')],
-    [State('comorbid_dropdown','value')])
-def apply_comorbid_filter(reset_filter, apply_filter, selected_diagnosis):
-    left = pd.DataFrame(disease_list, columns=['DiseaseCat'])
-    right = p.cpData[p.cpData.DiseaseCat!=selected_diagnosis].groupby('DiseaseCat')[['PatientID']].nunique().reset_index()
+    [State('comorbid_dropdown','value'),
+     State('session_id','data')])
+def apply_comorbid_filter(reset_filter, apply_filter, selected_diagnosis, session_id):
+    p = getPatient(session_id)
+    left = pd.DataFrame(getDiseaseList(), columns=['DiseaseCat'])
+    right = p.cpData[p.cpData.DiseaseCat!=selected_diagnosis].groupby('DiseaseCat', observed=True)[['PatientID']].nunique().reset_index()
     tbl = pd.merge(right = right, left = left).fillna(0).set_index('DiseaseCat')
     dropdownlist = [{'label': '{} ({}){}\n'.format(name, count.item(), '*' if name in p.comorbidities else ''),
                     'value':name} for name, count in tbl.iterrows()]
@@ -246,11 +366,12 @@ def reset_filters(reset_patient, reset_filter):
     [Input('reset_filter','n_clicks'),
     Input('apply_filter','n_clicks')], 
     [State('demog_filt', 'value'),
-    State('comorbid_filt', 'value')]
+    State('comorbid_filt', 'value'),
+    State('session_id','data')]
     )
-def update_filt_values_dict(reset_filter, apply_filter, demogs, comorbids):
+def update_filt_values_dict(reset_filter, apply_filter, demogs, comorbids, session_id):
     """Data Storage for the dictionary of filter values."""
-    global p
+    p = getPatient(session_id)
     ctx = dash.callback_context
     if not ctx.triggered:
         button_id = 'No clicks yet'
@@ -281,14 +402,18 @@ def update_filt_values_dict(reset_filter, apply_filter, demogs, comorbids):
 
     print('Updated Filters: ',p.filt_values)
     p.cpData = p.add_filt()
-    with open('../data/intermediate/temp.pkl','wb') as f:
-        pickle.dump(p.cpData, f)
+    sessions.set(session_id, p.state(), p)
+    # The figures of the previous population are left to expire, since they
+    # are keyed by content and may be shared by other sessions, or be needed
+    # again when the filters are toggled back
     return p.filt_values
 
 @app.callback(
     Output('cpop_count','children'),
-    [Input('filt_values','data')])
-def update_cpop_count(dic):
+    [Input('filt_values','data')],
+    [State('session_id','data')])
+def update_cpop_count(dic, session_id):
+    p = getPatient(session_id)
     count = p.cpData.PatientID.nunique()
     count_msg = 'There are {} similar patients in this population.'.format(count)
     print(count_msg)
@@ -302,13 +427,14 @@ def update_cpop_count(dic):
 @app.callback(
     Output('plot1', 'figure'),
     [Input('reset_pid_button','n_clicks')],
-    [State('selected_pid','value')])
-def plot1(n_clicks, pid):
-    global p
+    [State('selected_pid','value'),
+     State('session_id','data')])
+def plot1(n_clicks, pid, session_id):
+    p = getPatient(session_id)
     patientData = p.patientData
 
     fig1 = make_subplots(rows=2, cols=1, shared_xaxes=True)
-    fig1.append_trace(utils.plot_cgi_time(pid, patientData, colorsIdx, visit_types_list), 
+    fig1.append_trace(utils.plot_cgi_time(pid, patientData, getColorsIdx(), getVisitTypes()), 
                     row=1, col=1)
     fig1.append_trace(utils.plot_meds_time(pid, patientData), 
                     row=2, col=1)
@@ -326,26 +452,58 @@ def plot1(n_clicks, pid):
      Input('filt_values', 'data'),
      Input('cgi_change_col', 'value'),
      Input('period_selection', 'value'),
-     Input('change_in_cgi_toggle', 'on')])
-def plot2(reset_filter, filt_values, col, period, change_in_cgi):
-    cp_data = utils.getCGIchangeData(p.cpData, period=period) 
-    plot2 = utils.plot_cgi_change(cp_data, col=col, period=period, change_in_cgi=change_in_cgi)
+     Input('change_in_cgi_toggle', 'on')],
+    [State('session_id','data')])
+def plot2(reset_filter, filt_values, col, period, change_in_cgi, session_id):
+    p = getPatient(session_id)
+    population = p.populationKey()
+
+    def compute():
+        if p.wholePatients():
+            # sum of the precomputed per-patient aggregates
+            data_crosstab = getHeatmapAggregates().crosstab(p.cpData.PatientID.unique(), 
+                                change_in_cgi=change_in_cgi, period=period, col=col)
+            return utils.plot_cgi_heatmap(data_crosstab, change_in_cgi=change_in_cgi, period=period)
+        cp_data = utils.getCGIchangeData(p.cpData, period=period) 
+        return utils.plot_cgi_change(cp_data, col=col, period=period, change_in_cgi=change_in_cgi)
+
+    key = makeKey('plot2', population, col, period, change_in_cgi)
+    plot2 = figureCache.getOrCompute(key, compute, tags=[population])
     return plot2
 
 @app.callback(
     Output('plot3','figure'),
     [Input('reset_pid_button', 'n_clicks'),
      Input('filt_values', 'data'),
-     Input('num_meds_to_show', 'value')]
+     Input('num_meds_to_show', 'value')],
+    [State('session_id','data')]
     )
-def plot3(reset_filter, filt_values, n):
-    plot3 = utils.plot_meds_box(p.cpData, n) 
+def plot3(reset_filter, filt_values, n, session_id):
+    p = getPatient(session_id)
+    population = p.populationKey()
+    key = makeKey('plot3', population, n)
+    plot3 = figureCache.getOrCompute(key, lambda: utils.plot_meds_box(p.cpData, n), 
+                tags=[population])
     return plot3
 
 
 
+def profileCallbacks(sampler):
+    # Sample every callback under a label of its own, so that the time
+    # of a callback (including the serialization of its figures) adds up
+    for entry in app.callback_map.values():
+        f = entry['callback']
+        entry['callback'] = sampler.wrap(logBase + '.' + f.__name__)(f)
+    return
+
 def main(resultsDict):
     print('Starting...')
+    profile = resultsDict.get('profile', {})
+    if profile.get('todo') and profile.get('dash') and (profiler.active is not None):
+        profileCallbacks(profiler.active)
+        # the reloader would serve the app from a process that is not profiled
+        app.run_server(debug=True, use_reloader=False)
+        return
     app.run_server(debug=True)
 
 # app.run_server(debug=True) # for debugging; so that it updates when i save 
@@ -1,70 +1,75 @@
 import os
 import pandas as pd
 import numpy as np
-import pickle
+from lib.columnStore import columnStore
+from modules.VDL.diseaseCategories import getRecoder
+from modules.VDL.normalizer import getNormalizer
 
 def cleanRace(df):
-    df.loc[df.Race=='','Race'] = 'other'
-    df.loc[df.Race.str.startswith('multiracial'),'Race'] = 'mixed race'
-    df.loc[df.Race.str.startswith('white'),'Race'] = 'white'
-    df.loc[df.Race.str.startswith('black'),'Race'] = 'black'
-    df.loc[df.Race.str.startswith('asian'),'Race'] = 'asian'
-    df.loc[df.Race.str.startswith('hispanic'),'Race'] = 'hispanic'
-    df.loc[df.Race.str.contains('or'),'Race'] = 'other'
-    df.loc[df.Race.str.contains('other'),'Race'] = 'other'
-    df.loc[df.Race.str.contains('pacific'),'Race'] = 'native american'
-    df.loc[df.Race.str.contains('hawaiian'),'Race'] = 'native american'
-    df.Race = df.Race.replace({'^[a-z]{1}$|[0-9]':'other',
-                        'mexican|puerto rican|jamaican|dominican' : 'hispanic',
-                        'caucasian' : 'white',
-                        'african american' : 'black',
-                        'americanindianalaskannative': 'native american',
-                        'amer indian/alaskan native' : 'native american',
-                        'mixed race|multi raci|biracial|multiracial' : 'mixed race',
-                        'unable to obtain|other race|declined to specify|unknown|otherotherotherother-other|other not elsewhere classified|declined|patient unavailable':'other'
-                        },
-                        regex=True)
+    # rules of params.normalize.Race in cleanData.json, applied to every distinct race once
+    df['Race'] = getNormalizer('Race').normalize(df.Race)
     return df
 
 def cleanSex(df):
-    sexes=['M','F'] # not very progressive, but
-    df.loc[~df.Sex.isin(sexes),'Sex'] = 'Unknown'
+    # anything other than M and F becomes Unknown (params.normalize.Sex in cleanData.json)
+    df['Sex'] = getNormalizer('Sex').normalize(df.Sex)
     return df
 
-def cleanDemogs(in_file,out_file):
-    demogs = pickle.load(open(in_file,'rb'))
-    df = cleanRace(demogs)
+def cleanDemogsChunk(df):
+    df = cleanRace(df)
     df = cleanSex(df)
+    return df
 
-    with open(out_file, 'wb') as f:
-        pickle.dump(df, f)
-
-def cleanVisits(in_file,out_file):
+def cleanVisitsChunk(df):
     # create disease categories 
-    visits_data = pickle.load(open(in_file,'rb'))
-    diagnosis_dsmno = pd.read_csv('../data/raw_data/disorders_dsmno.csv')
+    recoder = getRecoder('../data/raw_data/disorders_dsmno.csv')
 
-    visits_data['DiseaseCat'] = 'others'
-    # use masking to map for each dsm (replace entire string based on substring match)
-    for i, (disorders, counts, regex, dsmno) in diagnosis_dsmno.iterrows():
-        if disorders != 'others':
-            visits_data.loc[visits_data.DSMNo.str.contains(regex), 'DiseaseCat'] = disorders
+    # match every distinct dsm once (replace entire string based on substring match)
+    df['DiseaseCat'] = recoder.recode(df.DSMNo)
 
     # visits_data.loc[visits_data.DiseaseCat.str.contains('[0-9]|code'), 'DiseaseCat'] = 'others'
-    print(visits_data.DiseaseCat.unique())
+    return df
+
+def cleanChunks(chunks, clean):
+    # generator: read chunk -> clean -> yield, so that only one chunk is held at a time.
+    # the rows keep the order (and the index) of the input
+    for chunk in chunks:
+        yield clean(chunk)
+
+def writeChunks(chunks, out_file):
+    # append every chunk to the output as soon as it is cleaned
+    nRows = 0
+    with columnStore.DatasetWriter(out_file) as writer:
+        for chunk in chunks:
+            writer.append(chunk)
+            nRows += len(chunk)
+    print('{} rows written to {}'.format(nRows, out_file))
+    return nRows
+
+def cleanDemogs(in_file,out_file):
+    demogs = columnStore.iterDataset(in_file)
+    writeChunks(cleanChunks(demogs, cleanDemogsChunk), out_file)
+
+def cleanVisits(in_file,out_file):
+    visits_data = columnStore.iterDataset(in_file)
+    writeChunks(cleanChunks(visits_data, cleanVisitsChunk), out_file)
 
-    with open(out_file,'wb') as f:
-        pickle.dump(visits_data, f) 
+def cleanPartition(demogs, visits):
+    # clean one partition of the extraction (see getData.pullPartitions), so that the
+    # extracted datasets are written already clean, without the raw data on disk
+    demogs = next(cleanChunks([demogs], cleanDemogsChunk))
+    visits = next(cleanChunks([visits], cleanVisitsChunk))
+    return demogs, visits
 
 
 def main(resultsDict):
 
     ### Cleaning Demographics ###
-    # in_file = '../data/intermediate/patient_demographics.pkl'
-    # out_file = '../data/intermediate/patient_demographics2.pkl'
+    # in_file = '../data/intermediate/patient_demographics'
+    # out_file = '../data/intermediate/patient_demographics2'
     # cleanDemogs(in_file, out_file)
 
     ### Cleaning Visits Data ###
-    in_file = '../data/intermediate/visits_data.pkl'
-    out_file = '../data/intermediate/visits_data2.pkl'
+    in_file = '../data/intermediate/visits_data'
+    out_file = '../data/intermediate/visits_data2'
     cleanVisits(in_file, out_file)
\ No newline at end of file
@@ -0,0 +1,253 @@
+'''Precomputed index for filtering the comparative population
+
+Filtering the comparative population by scanning the demographics and visits
+data for every click of the "Apply Filters" button becomes slow for large
+datasets. The ``CohortIndex`` is built once when the app starts, and contains:
+
+- category codes for the ``Sex``, ``Race``, ``DiseaseCat`` and ``Medication``
+  columns, together with bitmaps (boolean arrays) for each category value that
+  are generated the first time that they are used,
+- a sorted array of ages, so that an age band is found with a binary search,
+- the offsets of the rows of each patient within the visits data, so that the
+  visits of a small set of patients are gathered without a full scan.
+
+Filters are then resolved with bitmap intersections. The result is identical to
+``scanFilter()``, which is the original implementation of ``patientQ.add_filt``.
+'''
+
+import numpy as np
+import pandas as pd
+
+visitFilters = ['Medication', 'DiseaseCat']
+demogFilters = ['Sex', 'Race']
+
+def scanFilter(filt_values, pid, demog, visits, age_band=5):
+    '''filter the visits by scanning the complete data
+
+    This is the reference implementation for filtering the comparative
+    population. Each filter is evaluated over all the rows of the data.
+
+    Parameters
+    ----------
+    filt_values : {dict}
+        Values of the ``Sex``, ``Race``, ``Age``, ``Medication`` and ``DiseaseCat``
+        filters. Filters with a value of ``None`` (or ``'all'`` for visit filters)
+        are not applied.
+    pid : {int}
+        The selected patient, whose visits are excluded
+    demog : {pandas.DataFrame}
+        The demographics data
+    visits : {pandas.DataFrame}
+        The visits data
+    age_band : {number}, optional
+        Patients within this many years of the ``Age`` filter are kept (the
+        default is 5)
+
+    Returns
+    -------
+    pandas.DataFrame
+        The visits of the comparative population
+    '''
+    demog_filters = []
+    visit_filters = [visits.PatientID != pid]
+
+    for filt, val in filt_values.items():
+        if val != None:
+            if filt in visitFilters:
+                if not val == 'all':
+                    if not isinstance(val, list): val = [val]
+                    visit_filters.append(visits[filt].isin(val))
+            elif filt == 'Age':
+                demog_filters.append(abs(demog['Age'] - val) <= age_band)
+            elif filt in demogFilters:
+                demog_filters.append(demog[filt] == val)
+
+    if demog_filters != []:
+        demog_pids = demog[pd.concat(demog_filters, axis=1).all(axis=1)]
+        visit_filters.append(visits.PatientID.isin(demog_pids.PatientID))
+
+    return visits[pd.concat(visit_filters, axis=1).all(axis=1)]
+
+class CohortIndex():
+    '''columnar index over the demographics and visits data
+    '''
+
+    def __init__(self, demog, visits):
+        '''build the index
+
+        Parameters
+        ----------
+        demog : {pandas.DataFrame}
+            The demographics data, with the columns ``PatientID``, ``Sex``, ``Race``
+            and ``Age``
+        visits : {pandas.DataFrame}
+            The visits data, with the columns ``PatientID``, ``Medication`` and
+            ``DiseaseCat``
+        '''
+        self.demog  = demog
+        self.visits = visits
+
+        # Patients present within the visits and the position of every
+        # visit row within the sorted list of patients
+        visitPids         = visits['PatientID'].to_numpy()
+        self.patients     = np.unique(visitPids)
+        self.visitPatient = np.searchsorted(self.patients, visitPids)
+
+        # Offsets of the rows of each patient. The rows of patient i are
+        # rowOrder[offsets[i]:offsets[i+1]], in their original order
+        self.rowOrder = np.argsort(self.visitPatient, kind='stable')
+        self.offsets  = np.zeros(len(self.patients) + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum(np.bincount(self.visitPatient, minlength=len(self.patients)))
+
+        # Category codes. Missing values get the code -1
+        self.codes, self.categories = {}, {}
+        for col, data in [(c, demog) for c in demogFilters] + [(c, visits) for c in visitFilters]:
+            codes, categories = pd.factorize(data[col])
+            self.codes[col]      = codes
+            self.categories[col] = {v: i for i, v in enumerate(categories)}
+        self.bitmaps = {}
+
+        # Sorted ages, with missing ages dropped since they never match
+        ages = demog['Age'].to_numpy(dtype=float)
+        valid = np.flatnonzero(~np.isnan(ages))
+        order = np.argsort(ages[valid], kind='stable')
+        self.ageOrder  = valid[order]
+        self.ageSorted = ages[self.ageOrder]
+        self.demogPids = demog['PatientID'].to_numpy()
+
+        return
+
+    def bitmap(self, col, value):
+        '''boolean array of the rows where ``col`` equals ``value``
+
+        Bitmaps are generated the first time they are requested and are
+        cached thereafter.
+        '''
+        key = (col, value)
+        if key not in self.bitmaps:
+            code = self.categories[col].get(value, None)
+            if code is None:
+                self.bitmaps[key] = np.zeros(len(self.codes[col]), dtype=bool)
+            else:
+                self.bitmaps[key] = self.codes[col] == code
+        return self.bitmaps[key]
+
+    def ageRows(self, age, age_band):
+        '''demographic rows within ``age_band`` years of ``age``
+
+        The band is found with a binary search over the sorted ages. The
+        search window is widened slightly and then checked with the exact
+        condition, so that rounding at the edges of the band does not change
+        the result.
+        '''
+        eps = 1e-9 * (abs(age) + abs(age_band) + 1)
+        lo  = np.searchsorted(self.ageSorted, age - age_band - eps, side='left')
+        hi  = np.searchsorted(self.ageSorted, age + age_band + eps, side='right')
+        rows = self.ageOrder[lo:hi]
+        return rows[np.abs(self.ageSorted[lo:hi] - age) <= age_band]
+
+    def patientRows(self, pid):
+        '''return the visits of a single patient
+
+        Parameters
+        ----------
+        pid : {int}
+            The id of the patient
+
+        Returns
+        -------
+        pandas.DataFrame
+            Identical to ``visits[visits.PatientID == pid]``
+        '''
+        i = np.searchsorted(self.patients, pid)
+        if i == len(self.patients) or self.patients[i] != pid:
+            return self.visits.iloc[[]]
+        rows = self.rowOrder[self.offsets[i]:self.offsets[i+1]]
+        return self.visits.iloc[rows]
+
+    def _gather(self, patients):
+        # Row numbers of all the visits of the selected patients
+        starts  = self.offsets[patients]
+        lengths = self.offsets[patients + 1] - starts
+        shifts  = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        rows    = self.rowOrder[np.arange(lengths.sum()) + shifts]
+        return np.sort(rows)
+
+    def filter(self, filt_values, pid, age_band=5):
+        '''filter the visits with the index
+
+        The parameters and the result are the same as for ``scanFilter()``.
+
+        Parameters
+        ----------
+        filt_values : {dict}
+            Values of the filters
+        pid : {int}
+            The selected patient, whose visits are excluded
+        age_band : {number}, optional
+            Patients within this many years of the ``Age`` filter are kept (the
+            default is 5)
+
+        Returns
+        -------
+        pandas.DataFrame
+            The visits of the comparative population
+        '''
+        demogMask, visitLuts = None, []
+        for filt, val in filt_values.items():
+            if val is None:
+                continue
+
+            if filt in visitFilters:
+                if isinstance(val, str) and val == 'all':
+                    continue
+                if not isinstance(val, list): val = [val]
+                # Lookup table over the codes. The extra last element
+                # is for the code -1 of the missing values
+                lut = np.zeros(len(self.categories[filt]) + 1, dtype=bool)
+                for v in val:
+                    code = self.categories[filt].get(v, None)
+                    if code is not None:
+                        lut[code] = True
+                visitLuts.append((filt, lut))
+
+            elif filt == 'Age':
+                mask = np.zeros(len(self.demogPids), dtype=bool)
+                mask[self.ageRows(val, age_band)] = True
+                demogMask = mask if demogMask is None else (demogMask & mask)
+
+            elif filt in demogFilters:
+                mask = self.bitmap(filt, val)
+                demogMask = mask if demogMask is None else (demogMask & mask)
+
+        # Patients excluded by the demographic filters and the
+        # selected patient itself
+        patientMask = np.ones(len(self.patients), dtype=bool)
+        if demogMask is not None:
+            pids  = np.unique(self.demogPids[demogMask])
+            pos   = np.searchsorted(self.patients, pids)
+            found = pos < len(self.patients)
+            pos, pids = pos[found], pids[found]
+            patientMask[:] = False
+            patientMask[pos[self.patients[pos] == pids]] = True
+
+        i = np.searchsorted(self.patients, pid)
+        if i < len(self.patients) and self.patients[i] == pid:
+            patientMask[i] = False
+
+        # Gather the rows of a small set of patients, otherwise
+        # evaluate the bitmaps over all the rows
+        selected = np.flatnonzero(patientMask)
+        nRows    = (self.offsets[selected + 1] - self.offsets[selected]).sum()
+        if nRows < len(self.visitPatient) // 4:
+            rows = self._gather(selected)
+            keep = np.ones(len(rows), dtype=bool)
+            for filt, lut in visitLuts:
+                keep &= lut[self.codes[filt][rows]]
+            return self.visits.iloc[rows[keep]]
+
+        mask = patientMask[self.visitPatient]
+        for filt, lut in visitLuts:
+            mask &= lut[self.codes[filt]]
+
+        return self.visits[mask]
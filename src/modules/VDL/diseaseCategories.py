@@ -0,0 +1,110 @@
+'''Recoding of DSM codes into disease categories
+
+The disease category of a visit is found by matching its DSM code against the
+regular expression of every disorder in a table such as ``dsmno_regex.csv``,
+with the last matching disorder winning. Scanning all the visits once per
+disorder becomes slow for large extracts, although the number of distinct DSM
+codes is small. The ``DSMRecoder`` therefore matches every distinct code only
+once, keeps the category of every code that it has seen in a dictionary, and
+broadcasts the categories back to the rows through the factorized codes.
+
+The result is identical to the original loop over the disorders:
+
+.. code-block:: python
+
+    data['DiseaseCat'] = 'others'
+    for i, (disorders, counts, regex, dsmno) in table.iterrows():
+        if disorders != 'others':
+            data.loc[data.DSMNo.str.contains(regex), 'DiseaseCat'] = disorders
+'''
+
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+
+class DSMRecoder():
+    '''cached mapping from DSM codes to disease categories
+    '''
+
+    def __init__(self, table, default='others', othersPattern=None):
+        '''initialize the recoder
+
+        Parameters
+        ----------
+        table : {pandas.DataFrame}
+            Table with the disorder in the first column and its regular
+            expression in the third column (the layout of ``dsmno_regex.csv``).
+            The ``'others'`` disorder is not matched.
+        default : {str}, optional
+            Category of codes that do not match any disorder (the default is
+            'others')
+        othersPattern : {str}, optional
+            Categories matching this regular expression are replaced by
+            ``'others'`` (the default is None, which keeps all the categories)
+        '''
+        self.rules = [(d, r) for d, r in zip(table.iloc[:, 0], table.iloc[:, 2]) if d != 'others']
+        self.default       = default
+        self.othersPattern = othersPattern
+        self.cache         = {} # DSM code -> category
+        return
+
+    def _match(self, codes):
+        # Categories of a list of distinct codes, from the same
+        # sequence of masks as the original loop
+        codes = pd.Series(codes, dtype=object)
+        categories = pd.Series(self.default, index=codes.index, dtype=object)
+        for disorder, regex in self.rules:
+            mask = codes.str.contains(regex).fillna(False).to_numpy(dtype=bool)
+            categories[mask] = disorder
+        if self.othersPattern is not None:
+            mask = categories.str.contains(self.othersPattern).fillna(False).to_numpy(dtype=bool)
+            categories[mask] = 'others'
+        return categories.tolist()
+
+    def recode(self, dsmno):
+        '''disease categories of DSM codes
+
+        Parameters
+        ----------
+        dsmno : {pandas.Series}
+            The DSM code of every row
+
+        Returns
+        -------
+        pandas.Series
+            The disease category of every row, with the index of ``dsmno``.
+            Missing codes get the default category.
+        '''
+        codes, uniques = pd.factorize(dsmno)
+        new = [u for u in uniques if u not in self.cache]
+        if new:
+            self.cache.update(zip(new, self._match(new)))
+
+        # The last element is for the code -1 of the missing values
+        lut = np.array([self.cache[u] for u in uniques] + [self.default], dtype=object)
+        return pd.Series(lut[codes], index=dsmno.index, name='DiseaseCat')
+
+@lru_cache(maxsize=None)
+def getRecoder(path, default='others', othersPattern=None):
+    '''the recoder for a table of DSM codes
+
+    A single recoder (and hence a single cache) is kept for every table,
+    so that all the callers share the codes that have been matched.
+
+    Parameters
+    ----------
+    path : {str}
+        Path to the CSV file of the table
+    default : {str}, optional
+        Category of codes that do not match any disorder (the default is
+        'others')
+    othersPattern : {str}, optional
+        Categories matching this regular expression are replaced by
+        ``'others'`` (the default is None)
+
+    Returns
+    -------
+    DSMRecoder
+        The recoder
+    '''
+    return DSMRecoder(pd.read_csv(path), default=default, othersPattern=othersPattern)
@@ -0,0 +1,211 @@
+'''Cache for the figures of the Dash app
+
+Generating the figures of the comparative population is expensive, and users
+frequently toggle back to a view that they have seen a moment ago. Figures are
+therefore cached in their serialized (JSON) form, keyed by a canonical hash of
+everything that they depend upon: the patient, the filter values and the plot
+parameters.
+
+The cache is bounded by the number of entries and by the total size of the
+serialized figures, and entries expire after a fixed time. Every entry may be
+tagged, so that all the entries generated from a particular comparative
+population can be dropped together. The app does not do so when a session
+changes its filters: the entries are keyed by content, so that other sessions
+(or the same one, toggling back) may still use them, and they are left to
+expire or be evicted.
+Hit and miss counts are periodically written to the log.
+'''
+
+from logs import logDecorator as lD
+import json, hashlib, threading
+from time import time
+from collections import OrderedDict
+from lib.configService import configService as cS
+
+config = cS.getConfig('config.json')
+logBase = config['logging']['logBase'] + '.modules.VDL.figureCache'
+
+def makeKey(*parts):
+    '''canonical hash of the supplied values
+
+    The values are serialized as JSON with sorted keys, so that dictionaries
+    with the same content always generate the same key, irrespective of the
+    order in which the items were inserted.
+
+    Parameters
+    ----------
+    *parts : {JSON-serializable values}
+        The values that the key depends upon
+
+    Returns
+    -------
+    str
+        Hex digest of the serialized values
+    '''
+    text = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+@lD.log(logBase + '.logStats')
+def logStats(logger, stats):
+    '''write the statistics of the cache to the log
+
+    Parameters
+    ----------
+    logger : {logging.Logger}
+        The logger used for logging information
+    stats : {dict}
+        Statistics returned by ``FigureCache.stats()``
+    '''
+    logger.info('Figure cache: {hits} hits, {misses} misses, {evictions} evictions, '
+        '{entries} entries ({bytes} bytes)'.format(**stats))
+    return
+
+class FigureCache():
+    '''bounded cache of serialized figures
+    '''
+
+    def __init__(self, maxEntries=256, maxMB=64, ttl=900, logEvery=100):
+        '''initialize the cache
+
+        Parameters
+        ----------
+        maxEntries : {int}, optional
+            Maximum number of figures in the cache (the default is 256)
+        maxMB : {number}, optional
+            Maximum total size of the serialized figures in MB (the default is 64)
+        ttl : {number}, optional
+            Number of seconds after which a figure expires (the default is 900)
+        logEvery : {int}, optional
+            The statistics are logged after this many lookups (the default
+            is 100)
+        '''
+        self.maxEntries = maxEntries
+        self.maxBytes   = maxMB * 1024 * 1024
+        self.ttl        = ttl
+        self.logEvery   = logEvery
+
+        self.entries = OrderedDict() # key -> (created, tags, serialized figure)
+        self.nBytes  = 0
+        self.hits, self.misses, self.evictions = 0, 0, 0
+        self.lock = threading.Lock()
+
+        return
+
+    def get(self, key):
+        '''return a cached figure
+
+        Parameters
+        ----------
+        key : {str}
+            Key generated by ``makeKey()``
+
+        Returns
+        -------
+        dict or None
+            The deserialized figure, or ``None`` if the figure is not
+            present in the cache or has expired
+        '''
+        with self.lock:
+            entry = self.entries.get(key, None)
+            if (entry is not None) and (time() - entry[0] > self.ttl):
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            lookups = self.hits + self.misses
+
+        if lookups % self.logEvery == 0:
+            logStats(self.stats())
+
+        return None if entry is None else json.loads(entry[2])
+
+    def set(self, key, fig, tags=()):
+        '''add a figure to the cache
+
+        Parameters
+        ----------
+        key : {str}
+            Key generated by ``makeKey()``
+        fig : {plotly.graph_objects.Figure}
+            The figure to be cached
+        tags : {iterable of str}, optional
+            Tags that can later be used for invalidating this entry (the
+            default is an empty tuple)
+
+        Returns
+        -------
+        dict
+            The serialized figure, deserialized again. This is what a cache
+            hit returns for this figure.
+        '''
+        serialized = fig.to_json()
+        with self.lock:
+            self._remove(key)
+            self.entries[key] = (time(), frozenset(tags), serialized)
+            self.nBytes += len(serialized)
+
+            while len(self.entries) > 1 and (
+                (len(self.entries) > self.maxEntries) or (self.nBytes > self.maxBytes)):
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+        return json.loads(serialized)
+
+    def getOrCompute(self, key, compute, tags=()):
+        '''return a cached figure, computing it on a miss
+
+        Parameters
+        ----------
+        key : {str}
+            Key generated by ``makeKey()``
+        compute : {callable}
+            Function without arguments that generates the figure
+        tags : {iterable of str}, optional
+            Tags for the entry, in case it needs to be generated (the default
+            is an empty tuple)
+
+        Returns
+        -------
+        dict
+            The figure
+        '''
+        fig = self.get(key)
+        if fig is None:
+            fig = self.set(key, compute(), tags)
+        return fig
+
+    def invalidate(self, tag):
+        '''drop all the entries with a particular tag
+
+        Parameters
+        ----------
+        tag : {str}
+            The tag of the entries to drop
+        '''
+        with self.lock:
+            for key in [k for k, v in self.entries.items() if tag in v[1]]:
+                self._remove(key)
+        return
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.nBytes -= len(entry[2])
+        return
+
+    def stats(self):
+        '''statistics of the cache
+
+        Returns
+        -------
+        dict
+            Hit, miss and eviction counts, along with the number of entries
+            and their total size in bytes
+        '''
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self.entries), 'bytes': self.nBytes}
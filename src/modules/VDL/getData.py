@@ -1,16 +1,32 @@
 from logs import logDecorator as lD 
-import jsonref, pprint
+import pprint, json
 from lib.databaseIO import pgIO
+from lib.databaseIO.columnBuffer import ColumnBuffers
+from lib.columnStore import columnStore
+from modules.VDL.diseaseCategories import getRecoder
+from modules.VDL import cleanData
 
 import os
+from time import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from functools import lru_cache
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import pickle
+from lib.configService import configService as cS
 
-config = jsonref.load(open('../config/config.json'))
+config = cS.getConfig('config.json')
 logBase = config['logging']['logBase'] + '.modules.VDL.getData'
 
+# The table of DSM codes of every disorder. It is not shipped with the code,
+# and is only read when the cohort is selected or the visits are recoded.
+dsmnoTable = '../data/raw_data/dsmno_regex.csv'
+
+@lru_cache(maxsize=None)
+def readDiagnoses(path):
+    return pd.read_csv(path)
+
 class Database:
     '''Database static (stateful) class
     Used to manage database session details and contains common database
@@ -20,12 +36,16 @@ class Database:
        dbVersion {string} -- Operating schema (representing the version
                              of database) to be used
     '''
-    projConfig = jsonref.load(open('../config/modules/getData.json'))
+    projConfig = cS.getConfig('modules/getData.json')
     dbName    = projConfig['inputs']['dbName']
     dbVersion = projConfig['inputs']['dbVersion']
-    patientsFilter = '../data/intermediate/filtered_patients.pkl'
-    visitsFilter = '../data/intermediate/filtered_visits.pkl'
-    diagnoses_dsmno = pd.read_csv('../data/raw_data/dsmno_regex.csv')
+    useCopy   = projConfig['params']['useCopy']
+    patientsFilter = '../data/intermediate/filtered_patients'
+    visitsFilter = '../data/intermediate/filtered_visits'
+
+    @property
+    def diagnoses_dsmno(self):
+        return readDiagnoses(dsmnoTable)
    
     @lD.log(logBase + '.getData')
     def getData(logger, self, query, columns=None, saveData=True, savePath='../data/intermediate', saveName='temp'):
@@ -35,34 +55,46 @@ class Database:
         if saveData:
             if not os.path.exists(savePath):
                 os.makedirs(savePath)
-            dataOut.to_pickle(os.path.join(savePath,saveName+'.pkl'))
-            print(saveName+'.pkl saved.')
-        return dfmake
+            columnStore.writeDataset(df, os.path.join(savePath,saveName))
+            print(saveName+' saved.')
+        return df
         
     @lD.log(logBase + '.PullData')
-    def PullData(logger, self, query, columns, saveData=True, savePath='../data/intermediate', saveName='temp'):
+    def PullData(logger, self, query, columns, saveData=True, savePath='../data/intermediate', saveName='temp', useCopy=False, stage=None, raiseErrors=False):
         '''Function for pulling from the database
         [description]
         Arguments:
             query {string} -- PostgreSQL query to be sent to the server.
             columns {list} -- List of strings corresponding to the column names.
+        Keyword Arguments:
+            useCopy {bool} -- Stream the result with COPY instead of a cursor.
+            stage {dict} -- Lists of ids staged into temp tables (see pgIO.stageTables).
+            raiseErrors {bool} -- Raise database errors instead of returning an empty result.
         Returns:
             Output {pandas DataFrame} -- Returns output data.
         '''
-        # Iterator for query
-        dataIterator = pgIO.getDataIterator(query, dbName = self.dbName, chunks=1000)
-        # Run through iterator, appending to buffer
-        dataBuffer = []
-        for data in dataIterator:
-            dataBuffer += data
-        # Convert data in bufer to dataframe
-        dataOut = pd.DataFrame(dataBuffer, columns=columns)
+        start = time()
+        if useCopy:
+            # The CSV stream is decoded straight into typed column arrays
+            dataBuffer = pgIO.copyToColumns(query, columns, dbName = self.dbName, stage = stage, raiseErrors = raiseErrors)
+            if dataBuffer is None:
+                dataBuffer = ColumnBuffers(columns)
+        else:
+            # Iterator for query, with chunks sized by the width of the rows
+            dataIterator = pgIO.getAdaptiveIterator(query, dbName = self.dbName, stage = stage, raiseErrors = raiseErrors)
+            # Run through iterator, appending each chunk to typed column arrays
+            dataBuffer = ColumnBuffers(columns)
+            for data in dataIterator:
+                dataBuffer.append(data)
+        # Convert the column arrays to dataframe
+        dataOut = dataBuffer.toDataFrame()
+        logger.info('Query for {} returned {} rows in {:.2f} seconds'.format(saveName, len(dataOut), time() - start))
 
         if saveData:
             if not os.path.exists(savePath):
                 os.makedirs(savePath)
-            dataOut.to_pickle(os.path.join(savePath,saveName+'.pkl'))
-            print(saveName+'.pkl saved.')
+            columnStore.writeDataset(dataOut, os.path.join(savePath,saveName))
+            print(saveName+' saved.')
 
         return dataOut
 
@@ -104,24 +136,26 @@ def getPatientCohort(logger, disease_cat):
     return data
 
 @lD.log(logBase + '.getDemographics')
-def getDemographics(logger, patientList=None):
+def getDemographics(logger, patientList=None, saveData=True, raiseErrors=False):
     
     q = Database()
     # if patientList == None:
-    #     patientList = pickle.load(open(q.patientsFilter, 'rb'))['PatientID'].unique()
-    patientTuple = tuple(patientList)
+    #     patientList = columnStore.readDataset(q.patientsFilter, columns=['PatientID'])['PatientID'].unique()
 
+    # The patients are staged into a temp table that the query joins 
+    # against, rather than being written into the query as a tuple
     query = f'''
         select bg.patientid, bg.sex, bg.race, temp.age
         from rwe_version1_2.background bg
+        join cohort_patients cp on bg.patientid = cp.id
         left join ( select tp.patientid, max(tp.age) as age
                 from rwe_version1_2.typepatient tp
-                where tp.patientid in {patientTuple}
+                join cohort_patients cp on tp.patientid = cp.id
                 group by tp.patientid
         ) temp on bg.patientid = temp.patientid
-        where bg.patientid in {patientTuple}
     '''
-    data = q.PullData(query, ['PatientID','Sex', 'Race', 'Age'], saveName='patient_demographics')
+    data = q.PullData(query, ['PatientID','Sex', 'Race', 'Age'], saveName='patient_demographics',
+                    saveData=saveData, stage={'cohort_patients': patientList}, raiseErrors=raiseErrors)
 
     # Clean Race/Sex using Filter Tables
 
@@ -131,37 +165,40 @@ def getDemographics(logger, patientList=None):
     return data
 
 @lD.log(logBase + '.getTripsData')
-def getTripsData(logger, visit_list=None):
+def getTripsData(logger, visit_list=None, useCopy=None, saveData=True, raiseErrors=False):
     '''This function's method of Select Distinct works faster than separate indexing.
+    The data is streamed with COPY if ``useCopy`` (or ``useCopy`` within the
+    ``getData.json`` params if it is None) is set. With ``raiseErrors``, a failed query
+    raises instead of giving an empty result.
     '''
     
     q = Database()
-    visitTuple = tuple(visit_list)
+    if useCopy is None:
+        useCopy = q.useCopy
 
+    # The visits are staged into a temp table that the query joins against
     query = f"""select distinct on (tp.patientid, tp.typepatientid, tp.days, meds.medication )
                     tp.patientid, tp.typepatientid, tp.days, tp.visit_type, 
                     cgi.severity, meds.medication, meds.dose, meds.regimen,
                     pd.diagnosis, pd.dsmno
                 from 
-                    rwe_version1_2.typepatient tp, 
+                    cohort_visits cv
+                    join rwe_version1_2.typepatient tp on tp.typepatientid = cv.id,
                     rwe_version1_2.cgi cgi, 
                     rwe_version1_2.meds meds,
                     rwe_version1_2.pdiagnose pd
                 where tp.typepatientid = cgi.typepatientid
                     and tp.typepatientid = meds.typepatientid
                     and tp.typepatientid = pd.typepatientid
-                    and tp.typepatientid in {visitTuple}
             """
     data = q.PullData(query, 
                     ['PatientID','VisitID','Days', 'VisitType', 'CGI','Medication','Dose','Regimen', 'Diagnosis','DSMNo'], 
-                    saveName='visits_data')
+                    saveName='visits_data', saveData=saveData, useCopy=useCopy, 
+                    stage={'cohort_visits': visit_list}, raiseErrors=raiseErrors)
 
     # Recode dsmno's into disease categories. 
-    for i, (disorders, counts, regex, dsmno) in q.diagnoses_dsmno.iterrows():
-        if disorders != 'others':
-            data.loc[data.DSMNo.str.contains(regex), 'DiseaseCat'] = disorders
-
-    data.loc[data.DiseaseCat.str.contains('[0-9]|code'), 'DiseaseCat'] = 'others'
+    recoder = getRecoder(dsmnoTable, othersPattern='[0-9]|code')
+    data['DiseaseCat'] = recoder.recode(data.DSMNo)
 
     print(data.head())
     print('Data was pulled successfully.')
@@ -184,24 +221,223 @@ def testQuery(logger):
     print(data.head())
     return data
 
+def pullPartitions(cohort, concurrency, partitionSize, clean=False):
+    '''Pull the demographics and TRIPS data of a cohort, one range of patients at a time.
+    The cohort is split into partitions of ``partitionSize`` patients (sorted by PatientID), 
+    and up to ``concurrency`` partitions are pulled at once, each over its own pooled 
+    connection. No more than ``concurrency`` partitions are pulled ahead of the one being consumed.
+    Arguments:
+        cohort {pandas DataFrame} -- PatientID and VisitID of the cohort (from getPatientCohort).
+        concurrency {int} -- Partitions pulled at once.
+        partitionSize {int} -- Patients per partition.
+    Keyword Arguments:
+        clean {bool} -- Clean every partition as it is pulled (see ``cleanData.cleanPartition``).
+    Yields:
+        (first PatientID, last PatientID), demographics, visits -- in the order of the partitions.
+    Raises:
+        Exception -- The error of a partition that cannot be pulled, rather than an empty partition.
+    '''
+    patients = np.sort(cohort.PatientID.unique())
+    ranges = [(patients[i], patients[min(i + partitionSize, len(patients)) - 1]) 
+                for i in range(0, len(patients), partitionSize)]
+
+    def pull(patientRange):
+        lo, hi = patientRange
+        inRange = cohort[cohort.PatientID.between(lo, hi)]
+        demogs = getDemographics(inRange.PatientID.unique(), saveData=False, raiseErrors=True)
+        visits = getTripsData(inRange.VisitID.unique(), saveData=False, raiseErrors=True)
+        if clean:
+            demogs, visits = cleanData.cleanPartition(demogs, visits)
+        return demogs, visits
+
+    # At most ``concurrency`` partitions are pulled, or waiting to be consumed, 
+    # at once. A slow partition thus holds up the following ones instead of 
+    # letting all of them pile up in memory.
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = deque()
+        try:
+            for patientRange in ranges:
+                pending.append((patientRange, executor.submit(pull, patientRange)))
+                if len(pending) < concurrency:
+                    continue
+                patientRange, future = pending.popleft()
+                yield (patientRange, *future.result())
+
+            while pending:
+                patientRange, future = pending.popleft()
+                yield (patientRange, *future.result())
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    return
+
+@lD.log(logBase + '.extractPartitions')
+def extractPartitions(logger, cohort, savePath='../data/intermediate', concurrency=None, partitionSize=None):
+    '''Pull the demographics and TRIPS data of a cohort concurrently (see ``pullPartitions``).
+    Every partition is appended to the ``patient_demographics`` and ``visits_data`` 
+    datasets as soon as it is available. With ``clean`` in getData.json, the partitions are 
+    cleaned before they are appended, so that the clean step needs no separate pass.
+    Arguments:
+        cohort {pandas DataFrame} -- PatientID and VisitID of the cohort (from getPatientCohort).
+    Keyword Arguments:
+        savePath {string} -- Folder of the datasets.
+        concurrency {int} -- Partitions pulled at once (default from getData.json).
+        partitionSize {int} -- Patients per partition (default from getData.json).
+    '''
+    params = Database.projConfig['params']['extraction']
+    if concurrency is None:
+        concurrency = params['concurrency']
+    if partitionSize is None:
+        partitionSize = params['partitionSize']
+
+    if not os.path.exists(savePath):
+        os.makedirs(savePath)
+
+    start, n = time(), 0
+    with columnStore.DatasetWriter(os.path.join(savePath, 'patient_demographics')) as demogWriter, \
+         columnStore.DatasetWriter(os.path.join(savePath, 'visits_data')) as visitWriter:
+        for (lo, hi), demogs, visits in pullPartitions(cohort, concurrency, partitionSize, params['clean']):
+            demogWriter.append(demogs)
+            visitWriter.append(visits)
+            n += 1
+            logger.info('Partition {} (patients {} to {}): {} patients, {} visits rows'.format(
+                n, lo, hi, len(demogs), len(visits)))
+
+    logger.info('Extracted {} partitions in {:.2f} seconds with {} workers'.format(
+        n, time() - start, concurrency))
+
+    return
+
+watermarkFile = '_watermarks.json'
+
+def readWatermarks(savePath='../data/intermediate'):
+    '''The high-water marks of the last extraction, or None if there are none.
+    '''
+    path = os.path.join(savePath, watermarkFile)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def writeWatermarks(cohort, savePath='../data/intermediate', empty=()):
+    '''Save the highest typepatientid (VisitID) and days of the extracted cohort, along with
+    the patients of the cohort that had no data at all (and are not within the datasets).
+    '''
+    marks = {'VisitID': int(cohort.VisitID.max()) if len(cohort) else None,
+             'Days'   : int(cohort.Days.max()) if len(cohort) else None,
+             'patients': int(cohort.PatientID.nunique()),
+             'empty'  : sorted(int(p) for p in empty),
+             'updated': datetime.now().isoformat()}
+    with open(os.path.join(savePath, watermarkFile + '.tmp'), 'w') as f:
+        json.dump(marks, f)
+    os.replace(os.path.join(savePath, watermarkFile + '.tmp'), os.path.join(savePath, watermarkFile))
+    return marks
+
+def extractedPatients(paths):
+    '''The patients with rows within either of the extracted datasets.
+    '''
+    return np.union1d(*[columnStore.readDataset(p, columns=['PatientID']).PatientID.unique() 
+                        for p in paths.values()])
+
+@lD.log(logBase + '.extractIncremental')
+def extractIncremental(logger, cohort, savePath='../data/intermediate', full=False):
+    '''Update the extracted datasets with the visits added since the last extraction.
+    Patients with a visit beyond the watermarks (a larger typepatientid or days), patients 
+    new to the cohort, and patients no longer in the cohort are found. The data of these
+    patients is pulled again in full and replaces their rows within the existing datasets,
+    while the rest of the datasets is copied over partition by partition. Without 
+    watermarks (or with ``full``), everything is extracted again. When a pull fails, the 
+    error is raised, and the datasets and the watermarks are left as they were. Only new 
+    visits are detected: changed rows of visits already extracted (such as a corrected CGI) 
+    are not, and need a full extraction to be pulled again. Patients 
+    without any data (neither demographics nor visits) are logged and left out, as in a 
+    full extraction. They are kept within the watermarks, so that they are only pulled 
+    again once they have new visits.
+    Arguments:
+        cohort {pandas DataFrame} -- PatientID, VisitID and Days of the cohort (from getPatientCohort).
+    Keyword Arguments:
+        savePath {string} -- Folder of the datasets.
+        full {bool} -- Rebuild the datasets from scratch.
+    '''
+    params = Database.projConfig['params']['extraction']
+    marks  = readWatermarks(savePath)
+    paths  = {name: os.path.join(savePath, name) for name in ['patient_demographics', 'visits_data']}
+
+    if full or (marks is None) or (marks['VisitID'] is None) or not all(os.path.exists(p) for p in paths.values()):
+        logger.info('Running a full extraction')
+        extractPartitions(cohort, savePath)
+        empty = np.setdiff1d(cohort.PatientID.unique(), extractedPatients(paths))
+        if len(empty) > 0:
+            logger.warning('{} patients of the cohort have no data, such as {}'.format(
+                len(empty), empty[:5].tolist()))
+        writeWatermarks(cohort, savePath, empty)
+        return
+
+    existing = extractedPatients(paths)
+    current  = cohort.PatientID.unique()
+    empty    = np.intersect1d(marks.get('empty', []), current)
+    newRows  = cohort[(cohort.VisitID > marks['VisitID']) | (cohort.Days > marks['Days'])]
+
+    touched  = np.union1d(newRows.PatientID.unique(), np.setdiff1d(current, np.union1d(existing, empty)))
+    removed  = np.setdiff1d(existing, current)
+    replaced = np.union1d(touched, removed)
+    logger.info('{} new visits rows, {} patients to pull again, {} patients to remove'.format(
+        len(newRows), len(touched), len(removed)))
+
+    if len(replaced) == 0:
+        logger.info('The datasets are up to date')
+        writeWatermarks(cohort, savePath, empty)
+        return
+
+    # Everything is pulled before anything is rewritten, and a failed pull 
+    # raises, so that the rows of the replaced patients are never dropped 
+    # without their new rows
+    pulled = {'patient_demographics': [], 'visits_data': []}
+    for _, demogs, visits in pullPartitions(cohort[cohort.PatientID.isin(touched)], 
+                                            params['concurrency'], params['partitionSize'], params['clean']):
+        pulled['patient_demographics'].append(demogs)
+        pulled['visits_data'].append(visits)
+
+    # Patients without any data are left out, like in a full extraction
+    found   = [c.PatientID.to_numpy() for chunks in pulled.values() for c in chunks]
+    missing = np.setdiff1d(touched, np.concatenate(found) if found else [])
+    if len(missing) > 0:
+        logger.warning('{} of the {} patients pulled again have no data and are left out, such as {}'.format(
+            len(missing), len(touched), missing[:5].tolist()))
+    empty = np.union1d(np.setdiff1d(empty, touched), missing)
+
+    # The existing rows of the replaced patients are dropped as the
+    # datasets are copied, and the new rows are appended at the end.
+    # Both datasets are moved into place once both have been written,
+    # and the watermarks are only written after that
+    with columnStore.DatasetWriter(paths['patient_demographics']) as demogWriter, \
+         columnStore.DatasetWriter(paths['visits_data']) as visitWriter:
+        for name, writer in [('patient_demographics', demogWriter), ('visits_data', visitWriter)]:
+            for chunk in columnStore.iterDataset(paths[name]):
+                writer.append(chunk[~chunk.PatientID.isin(replaced)].reset_index(drop=True))
+            for chunk in pulled[name]:
+                writer.append(chunk)
+
+    writeWatermarks(cohort, savePath, empty)
+
+    return
+
 @lD.log(logBase + '.main')
 def main(logger, resultsDict):
     print('Starting..')
     ## get pt/visit/days data ##
     disease_cat = 'major depressive disorder'
     data = getPatientCohort(disease_cat)
-    # data = pickle.load(open('../data/intermediate/filtered_patients.pkl','rb'))
-    # data = pickle.load(open('../data/intermediate/cohort_visitsdays.pkl','rb'))
+    # data = columnStore.readDataset('../data/intermediate/filtered_patients')
     
-    ## get List of unique patients and their demographics data ## 
-    patient_list = data.PatientID.unique()
-    print(patient_list[:10])
-    patients_data = getDemographics(patient_list)
-    # patients_data = pickle.load(open('../data/intermediate/patient_demographics.pkl','rb'))
-
-    ## get TRIPS:cgi/meds/diagnosis data for all patients in list ##
-    visit_list = data.VisitID.unique()
-    vists_data = getTripsData(visit_list) 
-    # vists_data = pickle.load(open('../data/intermediate/visitsdata2.pkl','rb'))
-
-    print('Done!')
\ No newline at end of file
+    ## get demographics and TRIPS:cgi/meds/diagnosis data for all patients, ##
+    ## pulling ranges of patients concurrently, and only the patients with  ##
+    ## new visits if the extraction is incremental                          ##
+    extraction = Database.projConfig['params']['extraction']
+    fullCLI    = resultsDict.get('getData', {}).get('params', {}).get('extraction', {}).get('full', False)
+    extractIncremental(data, full = (not extraction['incremental']) or extraction['full'] or fullCLI)
+    # patients_data = columnStore.readDataset('../data/intermediate/patient_demographics')
+    # vists_data = columnStore.readDataset('../data/intermediate/visits_data')
+
+    print('Done!')
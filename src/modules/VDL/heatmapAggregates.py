@@ -0,0 +1,134 @@
+'''Precomputed aggregates for the CGI progression heatmap
+
+The heatmap of the comparative population shows the average CGI (or the average
+change in CGI) for every initial CGI (or CGI) and every period. The initial CGI
+of a patient and the periods of the visits depend only upon the visits of that
+patient. Hence, for every patient, the sum and the count of the values falling
+within each cell of the heatmap can be computed once when the app starts. These
+are saved as sparse matrices with one row per patient and one column per cell.
+
+The heatmap for any population is then the sum of the rows of its patients
+(a sparse matrix-vector product), with the sums divided elementwise by the
+counts. Since this only holds when whole patients are selected, populations
+filtered by visit-level filters (``DiseaseCat`` and ``Medication``) have to be
+computed from their visits with ``utils.getCGIcrosstab()``.
+'''
+
+import threading
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from modules.VDL import utils
+
+# The columns for the rows of the heatmap, and the averaged values
+rowColumns   = ['CGI_Initial', 'CGI']
+valueColumns = ['CGI_Change', 'CGI']
+
+class HeatmapAggregates():
+    '''per-patient sums and counts for the cells of the heatmap
+    '''
+
+    def __init__(self, visits, periods=['Week', 'Month', 'Year']):
+        '''initialize the aggregates
+
+        The matrices of a period are generated the first time that the
+        period is used, for all the combinations of row and value columns
+        at once. The visits with the columns of ``utils.getCGIchangeData()``
+        are only held while the matrices are generated, so that the visits
+        (which may be memory-mapped) are not copied for the life of the app.
+
+        Parameters
+        ----------
+        visits : {pandas.DataFrame}
+            The complete visits data
+        periods : {list of str}, optional
+            The period options of ``utils.getCGIchangeData()`` (the default is
+            ``['Week', 'Month', 'Year']``)
+        '''
+        self.visits   = visits
+        self.periods  = periods
+        self.patients = np.unique(visits['PatientID'].to_numpy())
+        self.matrices = {} # (period, col, values_col) -> (rows, columns, sums, counts)
+        self.lock     = threading.Lock() # the matrices of a period are built once
+        return
+
+    def _build(self, period):
+        # The matrices of every (col, values_col) combination of a period,
+        # from a single pass of getCGIchangeData
+        data = utils.getCGIchangeData(self.visits[['PatientID', 'Days', 'CGI']], period=period)
+
+        colVals  = data[period].to_numpy()
+        columns  = np.unique(colVals)
+        patients = np.searchsorted(self.patients, data['PatientID'].to_numpy())
+        shape0   = len(self.patients)
+
+        for col in rowColumns:
+            rowVals = data[col].to_numpy(dtype=float)
+            rows    = np.unique(rowVals[~np.isnan(rowVals)])
+            shape   = (shape0, len(rows) * len(columns))
+
+            for values_col in valueColumns:
+                values = data[values_col].to_numpy(dtype=float)
+
+                # Rows with a missing value do not contribute to the mean
+                valid  = ~(np.isnan(rowVals) | np.isnan(values))
+                cells  = (np.searchsorted(rows, rowVals[valid]) * len(columns) +
+                          np.searchsorted(columns, colVals[valid]))
+                sums   = sparse.csr_matrix((values[valid], (patients[valid], cells)), shape=shape)
+                counts = sparse.csr_matrix((np.ones(valid.sum()), (patients[valid], cells)), shape=shape)
+
+                self.matrices[(period, col, values_col)] = (rows, columns, sums, counts)
+        return
+
+    def _matrices(self, period, col, values_col):
+        key = (period, col, values_col)
+        with self.lock:
+            if key not in self.matrices:
+                self._build(period)
+            return self.matrices[key]
+
+    def crosstab(self, patientIds, change_in_cgi=True, period='Week', col='CGI_Initial'):
+        '''heatmap values for a population of patients
+
+        Parameters
+        ----------
+        patientIds : {array-like}
+            The patients within the population. All the visits of these
+            patients are assumed to be part of the population.
+        change_in_cgi : {bool}, optional
+            Average the change in CGI instead of the CGI (the default is True)
+        period : {str}, optional
+            One of the period options (the default is 'Week')
+        col : {str}, optional
+            The column used for the rows of the heatmap, ``'CGI_Initial'`` or
+            ``'CGI'`` (the default is 'CGI_Initial')
+
+        Returns
+        -------
+        pandas.DataFrame
+            The same as ``utils.getCGIcrosstab()`` for the visits of the
+            population
+        '''
+        values_col = 'CGI_Change' if change_in_cgi else 'CGI'
+        rows, columns, sums, counts = self._matrices(period, col, values_col)
+
+        patientIds = np.unique(np.asarray(patientIds))
+        pos = np.searchsorted(self.patients, patientIds)
+        pos = pos[pos < len(self.patients)]
+        pos = pos[np.isin(self.patients[pos], patientIds)]
+
+        selection = np.zeros(len(self.patients))
+        selection[pos] = 1
+        totals = sums.T.dot(selection).reshape(len(rows), len(columns))
+        n      = counts.T.dot(selection).reshape(len(rows), len(columns))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(n > 0, totals / n, np.nan)
+
+        # Rows and columns without any values are dropped, like crosstab does
+        keepRows, keepCols = (n > 0).any(axis=1), (n > 0).any(axis=0)
+        data_crosstab = pd.DataFrame(means[keepRows][:, keepCols],
+                                     index   = pd.Index(rows[keepRows], name=col),
+                                     columns = pd.Index(columns[keepCols], name=period))
+
+        return data_crosstab.round(1)
@@ -0,0 +1,118 @@
+'''Rule-driven normalization of demographic values
+
+The values of columns such as ``Race`` and ``Sex`` are cleaned by a list of
+rules, applied in order. Each rule is a dictionary with an ``op``, a
+``pattern`` and the ``value`` that it writes:
+
+- ``equals``: values equal to the pattern are set to the value
+- ``startswith``: values starting with the pattern are set to the value
+- ``contains``: values matching the regular expression are set to the value
+- ``notin``: values that are not in the list of patterns are set to the value
+- ``replace``: the substrings matching the regular expression are replaced
+  by the value
+
+The rules of every column are given in ``params.normalize`` of
+``config/modules/cleanData.json``. As the number of distinct values is small,
+the ``RuleNormalizer`` applies the rules to every distinct value once, keeps
+the result in a dictionary, and writes the results back through the
+factorized codes of the column.
+'''
+
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from lib.configService import configService as cS
+
+class RuleNormalizer():
+    '''cached normalization of the values of a column
+    '''
+
+    def __init__(self, rules):
+        '''initialize the normalizer
+
+        Parameters
+        ----------
+        rules : {list of dict}
+            The rules, each with the keys ``op``, ``pattern`` and ``value``
+        '''
+        ops = ['equals', 'startswith', 'contains', 'notin', 'replace']
+        for rule in rules:
+            if rule['op'] not in ops:
+                raise ValueError(f'Unknown normalization rule {rule["op"]}, expected one of {ops}')
+        self.rules = list(rules)
+        self.cache = {} # value -> normalized value
+        return
+
+    def _apply(self, values):
+        # The rules applied to a list of distinct values
+        s = pd.Series(values, dtype=object)
+        for rule in self.rules:
+            op, pattern, value = rule['op'], rule['pattern'], rule['value']
+            if op == 'replace':
+                s = s.replace({pattern: value}, regex=True)
+                continue
+
+            if op == 'equals':
+                mask = s == pattern
+            elif op == 'startswith':
+                mask = s.str.startswith(pattern)
+            elif op == 'contains':
+                mask = s.str.contains(pattern)
+            else:
+                mask = ~s.isin(pattern)
+            s[mask.fillna(False).to_numpy(dtype=bool)] = value
+        return s.tolist()
+
+    def normalize(self, values, categorical=False):
+        '''normalized values of a column
+
+        Parameters
+        ----------
+        values : {pandas.Series}
+            The values of the column
+        categorical : {bool}, optional
+            Return a ``pandas.Categorical`` column instead of strings (the
+            default is False)
+
+        Returns
+        -------
+        pandas.Series
+            The normalized values, with the index and name of ``values``.
+            Missing values are kept missing.
+        '''
+        codes, uniques = pd.factorize(values)
+        new = [u for u in uniques if u not in self.cache]
+        if new:
+            self.cache.update(zip(new, self._apply(new)))
+
+        # Distinct values can be normalized to the same value, so the results
+        # are factorized again, and code -1 (missing) is kept as -1
+        results, categories = pd.factorize(pd.Series([self.cache[u] for u in uniques], dtype=object))
+        results = np.append(results, -1)[codes]
+        if categorical:
+            data = pd.Categorical.from_codes(results, categories=categories)
+        else:
+            data = np.append(np.asarray(categories, dtype=object), np.nan)[results]
+        return pd.Series(data, index=values.index, name=values.name)
+
+@lru_cache(maxsize=None)
+def getNormalizer(column, configPath='../config/modules/cleanData.json'):
+    '''the normalizer of a column
+
+    A single normalizer (and hence a single cache) is kept for every column.
+
+    Parameters
+    ----------
+    column : {str}
+        The column, a key within ``params.normalize`` of the config
+    configPath : {str}, optional
+        The config file with the rules (the default is
+        '../config/modules/cleanData.json')
+
+    Returns
+    -------
+    RuleNormalizer
+        The normalizer
+    '''
+    config = cS.getConfig(configPath, folder='')
+    return RuleNormalizer(config['params']['normalize'][column])
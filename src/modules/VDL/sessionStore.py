@@ -0,0 +1,262 @@
+'''Session-keyed storage for the state of the Dash app
+
+Every browser session of the Dash app gets its own patient and filter state.
+The small, serializable part of the state (the selected patient and the filter
+values) is kept as a JSON file per session within a folder on the local disk.
+Since all the workers of the app read and write to the same folder, a request
+may be served by any of the workers. Point the folder to ``/dev/shm`` if you
+would rather keep the state within shared memory.
+
+The heavy objects that are generated from this state (``patientQ`` instances
+with their comparative population) are cached within each process in a least
+recently used (LRU) fashion. The cache is bounded both by the number of objects
+and the total memory that they occupy. Objects evicted from the cache are simply
+regenerated from the state on the disk the next time they are required.
+
+Old sessions are removed from the disk by ``prune``, which lists the folder.
+Rather than on every write, it runs every ``pruneEvery`` writes, or on the
+first write after ``pruneInterval`` seconds, so that the folder may briefly
+hold a few more than ``maxStored`` sessions.
+'''
+
+import os, json, time, threading
+from collections import OrderedDict
+
+class SessionStore():
+    '''store for the per-session state of the Dash app
+
+    The state for a session is a JSON-serializable ``dict``. Objects are
+    generated from the state with the help of the ``factory`` function, and
+    are cached within the process until they are evicted.
+    '''
+
+    def __init__(self, folder, factory, sizeOf=None, maxCached=32,
+        memoryLimitMB=1024, maxStored=10000, maxAge=None, pruneEvery=100, pruneInterval=60):
+        '''initialize the store
+
+        Parameters
+        ----------
+        folder : {str}
+            The folder in which the state of each session is saved. This folder
+            should be shared by all the workers serving the app.
+        factory : {callable}
+            Function that takes the state of a session and returns the object
+            that is to be cached for the session.
+        sizeOf : {callable}, optional
+            Function that returns the size of a cached object in bytes (the
+            default is None, which results in the memory limit being ignored)
+        maxCached : {int}, optional
+            Maximum number of objects cached within this process (the default
+            is 32)
+        memoryLimitMB : {number}, optional
+            Maximum memory in MB that the cached objects within this process
+            are allowed to occupy (the default is 1024)
+        maxStored : {int}, optional
+            Maximum number of sessions whose state is kept on the disk. The
+            least recently used sessions are removed first (the default is 10000)
+        maxAge : {number}, optional
+            Number of seconds after which a session that has not been used is
+            removed from the disk (the default is None, in which case sessions
+            are only removed when ``maxStored`` is exceeded)
+        pruneEvery : {int}, optional
+            Old sessions are pruned after this many writes by this process
+            (the default is 100)
+        pruneInterval : {number}, optional
+            Old sessions are also pruned on the first write after this many
+            seconds since the last pruning (the default is 60)
+        '''
+        self.folder      = folder
+        self.factory     = factory
+        self.sizeOf      = sizeOf
+        self.maxCached   = maxCached
+        self.memoryLimit = memoryLimitMB * 1024 * 1024
+        self.maxStored   = maxStored
+        self.maxAge      = maxAge
+        self.pruneEvery    = pruneEvery
+        self.pruneInterval = pruneInterval
+
+        # Writes and (monotonic) time since the last pruning. The first
+        # write prunes the sessions left over by earlier runs.
+        self.writes    = 0
+        self.lastPrune = None
+
+        self.cache = OrderedDict() # sessionId -> (state, object, size)
+        self.cacheSize = 0
+        self.lock  = threading.RLock()
+
+        os.makedirs(self.folder, exist_ok=True)
+
+        return
+
+    def _path(self, sessionId):
+        # Only allow simple ids so that a session id can never point
+        # outside the session folder
+        sessionId = str(sessionId)
+        if not sessionId.replace('-', '').isalnum():
+            raise ValueError(f'Invalid session id: {sessionId}')
+        return os.path.join(self.folder, sessionId + '.json')
+
+    def getState(self, sessionId):
+        '''return the state of a session saved on the disk
+
+        Parameters
+        ----------
+        sessionId : {str}
+            The id of the session
+
+        Returns
+        -------
+        dict or None
+            The state of the session. ``None`` is returned if the session
+            does not exist (or has expired).
+        '''
+        path = self._path(sessionId)
+        try:
+            with open(path) as f:
+                state = json.load(f)
+            os.utime(path) # mark as recently used
+        except (OSError, ValueError):
+            return None
+
+        return state
+
+    def set(self, sessionId, state, obj=None):
+        '''update the state of a session
+
+        Parameters
+        ----------
+        sessionId : {str}
+            The id of the session
+        state : {dict}
+            The new state of the session. This must be JSON-serializable.
+        obj : {object}, optional
+            The object corresponding to this state, if it is already available.
+            This prevents the object from being regenerated by the factory (the
+            default is None)
+        '''
+        path = self._path(sessionId)
+        temp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp, 'w') as f:
+            json.dump(state, f)
+        os.replace(temp, path) # atomic for readers in other workers
+
+        with self.lock:
+            self._uncache(sessionId)
+            if obj is not None:
+                self._cache(sessionId, state, obj)
+
+            self.writes += 1
+            now = time.monotonic()
+            due = (self.lastPrune is None) or (self.writes >= self.pruneEvery) \
+                or (now - self.lastPrune >= self.pruneInterval)
+            if due:
+                self.writes, self.lastPrune = 0, now
+
+        if due:
+            self.prune()
+
+        return
+
+    def get(self, sessionId, default=None):
+        '''return the object for a session
+
+        The object is returned from the cache if the state saved on the disk
+        has not changed since it was generated. Otherwise it is regenerated
+        with the ``factory``.
+
+        Parameters
+        ----------
+        sessionId : {str}
+            The id of the session
+        default : {callable}, optional
+            Function returning the state for a session that does not exist yet
+            (the default is None, in which case a ``KeyError`` is raised for an
+            unknown session)
+
+        Returns
+        -------
+        object
+            The object generated by the ``factory`` for the session state
+        '''
+        state = self.getState(sessionId)
+        if state is None:
+            if default is None:
+                raise KeyError(f'Unknown session: {sessionId}')
+            state = default()
+            self.set(sessionId, state)
+
+        with self.lock:
+            if sessionId in self.cache:
+                cachedState, obj, _ = self.cache[sessionId]
+                if cachedState == state:
+                    self.cache.move_to_end(sessionId)
+                    return obj
+                self._uncache(sessionId)
+
+        obj = self.factory(state)
+        with self.lock:
+            self._cache(sessionId, state, obj)
+
+        return obj
+
+    def _cache(self, sessionId, state, obj):
+        size = self.sizeOf(obj) if self.sizeOf is not None else 0
+        self.cache[sessionId] = (state, obj, size)
+        self.cacheSize += size
+
+        # Evict the least recently used objects, but always keep
+        # the one that has just been added
+        while len(self.cache) > 1 and (
+            (len(self.cache) > self.maxCached) or (self.cacheSize > self.memoryLimit)):
+            oldest = next(iter(self.cache))
+            self._uncache(oldest)
+
+        return
+
+    def _uncache(self, sessionId):
+        if sessionId in self.cache:
+            _, _, size = self.cache.pop(sessionId)
+            self.cacheSize -= size
+        return
+
+    def prune(self):
+        '''remove old sessions from the disk
+
+        Sessions older than ``maxAge`` are removed, after which the least
+        recently used sessions are removed till there are at most ``maxStored``
+        sessions left.
+        '''
+        try:
+            files = []
+            for f in os.listdir(self.folder):
+                if not f.endswith('.json'):
+                    continue
+                path = os.path.join(self.folder, f)
+                files.append((os.path.getmtime(path), path))
+        except OSError:
+            return
+
+        files.sort()
+        now = time.time()
+        nRemove = max(0, len(files) - self.maxStored)
+        for i, (mtime, path) in enumerate(files):
+            expired = (self.maxAge is not None) and (now - mtime > self.maxAge)
+            if not (expired or (i < nRemove)):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass # already removed by another worker
+
+        return
+
+    def stats(self):
+        '''statistics about the objects cached within this process
+
+        Returns
+        -------
+        dict
+            The number of cached objects and the memory that they occupy
+        '''
+        with self.lock:
+            return {'cached': len(self.cache), 'cacheBytes': self.cacheSize}
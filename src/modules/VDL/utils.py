@@ -1,13 +1,17 @@
-import jsonref, pprint
+import pprint
 import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import pickle
-import statistics, math
+import statistics
 import re
 
 import plotly.graph_objects as go
+from logs import timings
+from lib.configService import configService as cS
+
+config = cS.getConfig('config.json')
+logBase = config['logging']['logBase'] + '.modules.VDL.utils'
 
 def plot_cgi_time(pid, data, colorsIdx, visit_types_list):
     cgi = data.groupby('Days').apply(lambda x: statistics.mean([x['CGI'].max(), x['CGI'].min()]))
@@ -35,7 +39,10 @@ def plot_cgi_time(pid, data, colorsIdx, visit_types_list):
 def plot_meds_time(pid, data):
     """Scatter plot of a patient `pid`'s medication over time.'"""
     
-    patient_meds_df = data.groupby('Medication').agg({'Days':['min','max']})
+    # Decoded, so that the medications are sorted by name even when the 
+    # column is categorical
+    meds = pd.Series(np.asarray(data['Medication'], dtype=object), index=data.index, name='Medication')
+    patient_meds_df = data.groupby(meds).agg({'Days':['min','max']})
     patient_meds_df = patient_meds_df.reset_index()
     patient_meds_df.columns = patient_meds_df.columns.droplevel()
     patient_meds_df.columns = ['Medication','First','Last']
@@ -50,43 +57,70 @@ def plot_meds_time(pid, data):
                   )
 
 # heatmap
+@timings.timed(logBase + '.getCGIchangeData')
 def getCGIchangeData(cp_data, period='Week',n_periods=7):
     ## Adds the columns of CGI_Initial, Week and CGI_Change 
-    ## to a copy of the comparative population dataset. 
+    ## to the comparative population dataset. 
+    ## The rows are sorted once by PatientID/Days, after which the 
+    ## first visit of every patient is the start of its group. 
     
     periods = {'Week':7, 'Month':28,'Year':365}
-    data = cp_data.copy()
-    
-    data_grouper = data.groupby('PatientID')['Days']
-    cp_initialCGI = data.loc[data_grouper.idxmin(),['PatientID','CGI']]
-    cp_initialCGI.columns = ['PatientID','CGI_Initial']
-    data = pd.merge(data, cp_initialCGI, how='left', on='PatientID')
-    period_data = data_grouper.transform(lambda x: (x - x.min() + 1) / periods[period]).apply(math.floor).reset_index(drop=True)
-    data[period] = period_data
+    data = cp_data.reset_index(drop=True)
+
+    pids = data['PatientID'].to_numpy()
+    days = data['Days'].to_numpy()
+    cgi  = data['CGI'].to_numpy()
+
+    if len(data) == 0:
+        data['CGI_Initial'] = cgi
+        data[period] = np.zeros(0, dtype=float)
+        data['CGI_Change'] = data['CGI'] - data['CGI_Initial']
+        return data
+
+    # lexsort is stable, so ties in Days keep their original order, and
+    # the first row of a patient is the same row that idxmin() finds
+    order  = np.lexsort((days, pids))
+    sPids  = pids[order]
+    starts = np.flatnonzero(np.r_[True, sPids[1:] != sPids[:-1]])
+    sizes  = np.diff(np.r_[starts, len(order)])
+
+    minDays    = np.minimum.reduceat(days[order], starts)
+    initialCGI = cgi[order[starts]]
+
+    # group of every row, in the original order
+    group = np.empty(len(order), dtype=np.int64)
+    group[order] = np.repeat(np.arange(len(starts)), sizes)
+
+    data['CGI_Initial'] = initialCGI[group]
+    data[period] = np.floor((days - minDays[group] + 1) / periods[period]).astype(np.int64)
     data['CGI_Change'] = data['CGI'] - data['CGI_Initial'] 
     
     return data
 
 # heatmap
-def plot_cgi_change(data, change_in_cgi=True, period='Week', 
-                    col='CGI_Initial', num_periods=20):
+def getCGIcrosstab(data, change_in_cgi=True, period='Week', col='CGI_Initial'):
+    ## Average CGI (or change in CGI) for every value of `col`
+    ## and every period, from the output of getCGIchangeData. 
+
+    values_col = 'CGI_Change' if change_in_cgi else 'CGI'
+    print(data.head())
+    data_crosstab = pd.crosstab(index=data[col],
+                                  columns=data[period],
+                                  values=data[values_col], 
+                                  aggfunc='mean').round(1)
+    print(data_crosstab)
+    return data_crosstab
+
+def plot_cgi_heatmap(data_crosstab, change_in_cgi=True, period='Week', num_periods=20):
     
     if change_in_cgi: 
         min_cgi = -7
         plot_title = 'Change in Average CGI Progression'
-        values_col = 'CGI_Change'
         colorscale = 'YlOrRd'
     else: # actual cgi values
         min_cgi = 0
         plot_title = 'Average CGI Progression'
-        values_col = 'CGI'
         colorscale = 'Reds'
-    print(data.head())
-    data_crosstab = pd.crosstab(index=data[col],
-                                  columns=data[period],
-                                  values=data[values_col], 
-                                  aggfunc='mean').round(1)
-    print(data_crosstab)
 
     fig = go.Figure(data=go.Heatmap(
                    z=data_crosstab.iloc[:,:num_periods],
@@ -106,30 +140,116 @@ def plot_cgi_change(data, change_in_cgi=True, period='Week',
                     }
     return fig
 
+def plot_cgi_change(data, change_in_cgi=True, period='Week', 
+                    col='CGI_Initial', num_periods=20):
+    data_crosstab = getCGIcrosstab(data, change_in_cgi=change_in_cgi, period=period, col=col)
+    return plot_cgi_heatmap(data_crosstab, change_in_cgi=change_in_cgi, 
+                            period=period, num_periods=num_periods)
+
 # medications boxplot
+def _countUnique(groups, values, nGroups):
+    ## Number of unique values within each group
+    valueCodes, uniques = pd.factorize(values)
+    pairs = np.unique(groups.astype(np.int64) * max(len(uniques), 1) + valueCodes)
+    return np.bincount(pairs // max(len(uniques), 1), minlength=nGroups)
+
+def _blockQuantile(values, starts, sizes, q):
+    ## Linearly interpolated quantile of sorted blocks of values, 
+    ## the same as np.quantile for each block. Empty blocks give NaN.
+    pos  = q * np.maximum(sizes - 1, 0)
+    lo   = np.floor(pos).astype(np.int64)
+    hi   = np.minimum(lo + 1, np.maximum(sizes - 1, 0))
+    frac = pos - lo
+    padded = np.r_[values, np.nan]
+    loVal  = padded[np.where(sizes > 0, starts + lo, len(values))]
+    hiVal  = padded[np.where(sizes > 0, starts + hi, len(values))]
+    return loVal + (hiVal - loVal) * frac
+
 def getMedsData(cp_data):
-    # cp_data = p.cpData
-    cpop_meds = cp_data.groupby('Medication').agg({'PatientID':'nunique', 'CGI':'mean'})
-    cpop_improved = cp_data.loc[cp_data['CGI']<=2].groupby('Medication').agg({'PatientID':'nunique', 'CGI':['mean','median','var']})
-    cpop_all = cpop_meds.merge(cpop_improved, how='left', on='Medication')
-    cpop_all.columns = ['Count_All','CGI_All','Count_Improved','CGI_Mean','CGI_Median','CGI_Var']
-    cpop_all['Pct_Improved'] = cpop_all.Count_Improved / cpop_all.Count_All * 100 
+    ## Statistics of every medication in a single grouped pass. The rows 
+    ## are sorted once by Medication and CGI, so that every medication is a
+    ## contiguous block, with the improved visits (CGI <= 2) at the start of 
+    ## the block and the missing CGI values at its end. 
+    ## Along with the counts, means, median, variance and improvement, this
+    ## returns the quartiles and whiskers used for the box plots. 
+    ## A categorical column is factorized by its codes, and the medications
+    ## are then sorted by name rather than by the order of the categories.
+    codes, names = pd.factorize(cp_data['Medication'])
+    names = np.asarray(names, dtype=object)
+    order = np.argsort(names, kind='stable')
+    rank  = np.empty(len(order) + 1, dtype=np.int64)
+    rank[order], rank[-1] = np.arange(len(order)), -1
+    codes, names = rank[codes], names[order]
+    keep = codes >= 0
+    cgi  = cp_data['CGI'].to_numpy(dtype=float)[keep]
+    pids = cp_data['PatientID'].to_numpy()[keep]
+    codes = codes[keep]
+
+    order = np.lexsort((cgi, codes))
+    codes, cgi, pids = codes[order], cgi[order], pids[order]
+
+    nMeds  = len(names)
+    starts = np.searchsorted(codes, np.arange(nMeds))
+    valid, improved = ~np.isnan(cgi), cgi <= 2
+    nValid    = np.bincount(codes, weights=valid, minlength=nMeds).astype(np.int64)
+    nImproved = np.bincount(codes, weights=improved, minlength=nMeds).astype(np.int64)
+    cgiSum    = np.bincount(codes, weights=np.where(valid, cgi, 0), minlength=nMeds)
+    impSum    = np.bincount(codes, weights=np.where(improved, cgi, 0), minlength=nMeds)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        impMean = impSum / nImproved
+        impDev  = np.where(improved, (cgi - impMean[codes])**2, 0)
+        impVar  = np.bincount(codes, weights=impDev, minlength=nMeds) / (nImproved - 1)
+        impVar[nImproved < 2] = np.nan
+
+        cpop_all = pd.DataFrame({
+            'Count_All' : _countUnique(codes, pids, nMeds),
+            'CGI_All'   : cgiSum / nValid,
+        }, index=pd.Index(names, name='Medication'))
+
+        # Like a left join, medications without improved visits get NaN
+        cpop_improved = pd.DataFrame({
+            'Count_Improved' : _countUnique(codes[improved], pids[improved], nMeds),
+            'CGI_Mean'       : impMean,
+            'CGI_Median'     : _blockQuantile(cgi, starts, nImproved, 0.5),
+            'CGI_Var'        : impVar,
+        }, index=cpop_all.index)[nImproved > 0]
+        cpop_all = cpop_all.join(cpop_improved, how='left')
+        cpop_all['Pct_Improved'] = cpop_all.Count_Improved / cpop_all.Count_All * 100 
+
+    # box plot statistics over the non-missing CGI values
+    q1 = _blockQuantile(cgi, starts, nValid, 0.25)
+    q3 = _blockQuantile(cgi, starts, nValid, 0.75)
+    lowLimit, highLimit = q1 - 1.5*(q3 - q1), q3 + 1.5*(q3 - q1)
+    inLow  = np.where(valid & (cgi >= lowLimit[codes]), cgi, np.inf)
+    inHigh = np.where(valid & (cgi <= highLimit[codes]), cgi, -np.inf)
+    cpop_all['Count_CGI']   = nValid
+    cpop_all['Q1']          = q1
+    cpop_all['Median']      = _blockQuantile(cgi, starts, nValid, 0.5)
+    cpop_all['Q3']          = q3
+    if nMeds > 0:
+        cpop_all['Lower_Fence'] = np.where(nValid > 0, np.minimum.reduceat(inLow, starts), np.nan)
+        cpop_all['Upper_Fence'] = np.where(nValid > 0, np.maximum.reduceat(inHigh, starts), np.nan)
+    else:
+        cpop_all['Lower_Fence'], cpop_all['Upper_Fence'] = q1, q3
+
     return cpop_all
 
 def plot_meds_box(cp_data, n=5):
-    # cp_data = p.cpData
+    ## The boxes are drawn from the precomputed quartiles and whiskers, 
+    ## rather than sending every CGI value to the browser. 
     cpop_all = getMedsData(cp_data)
     topNmeds = cpop_all.sort_values(['Count_All'], ascending=False).index[:n]
-    topNmeds_cgi = cp_data.loc[cp_data['Medication'].isin(topNmeds)].groupby(['Medication'])['CGI'].apply(list)
-    for i, med in enumerate(topNmeds_cgi): 
-        topNmeds_cgi[i] = [m for m in topNmeds_cgi[i] if ~np.isnan(m)] #list(filter(None,topNmeds_cgi[i]))
-    pct_imp = cpop_all.loc[cpop_all.index.isin(topNmeds),'Pct_Improved']
+    topNmeds_stats = cpop_all.loc[cpop_all.index.isin(topNmeds)]
     
     fig = go.Figure()
-    for ix, med_data in enumerate(topNmeds_cgi):
-        med_name = topNmeds_cgi.index[ix]
-        med_pct = pct_imp[ix]
-        fig.add_trace(go.Box(x=med_data, name=f'{med_name} ({round(med_pct,1)}%)'))
+    for med_name, med in topNmeds_stats.iterrows():
+        if med.Count_CGI == 0:
+            continue
+        label = f'{med_name} ({round(med.Pct_Improved,1)}%)'
+        fig.add_trace(go.Box(y=[label], name=label, orientation='h',
+                             q1=[med.Q1], median=[med.Median], q3=[med.Q3], 
+                             lowerfence=[med.Lower_Fence], upperfence=[med.Upper_Fence]))
     fig['layout'] = {'title':'Treatment Response to Top {} Prescribed Medications'.format(n),
                      'xaxis': {'title':'CGI Score'},
                      'yaxis': {'title':'Medication & % Patients Improved'},
@@ -137,4 +257,3 @@ def plot_meds_box(cp_data, n=5):
                      'margin':{'l':20, 'r':20, 't':30, 'b':20}
                     }
     return fig
-
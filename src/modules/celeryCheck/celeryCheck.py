@@ -1,8 +1,9 @@
 from logs import logDecorator as lD 
-import jsonref, pprint
+import pprint
 from lib.celeryWorkerExample import worker_1
+from lib.configService import configService as cS
 
-config = jsonref.load(open('../config/config.json'))
+config = cS.getConfig('config.json')
 logBase = config['logging']['logBase'] + '.modules.celeryCheck.celeryCheck'
 
 
@@ -1,19 +1,22 @@
 from logs import logDecorator as lD 
-import jsonref, pprint
+import pprint
 from lib.databaseIO import pgIO
 
 import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, r2_score
 import pickle
+from lib.configService import configService as cS
+from lib.lazyImport.lazyImport import LazyModule
 
-config = jsonref.load(open('../config/config.json'))
+# Imported when first used
+plt             = LazyModule('matplotlib.pyplot')
+linear_model    = LazyModule('sklearn.linear_model')
+model_selection = LazyModule('sklearn.model_selection')
+
+config = cS.getConfig('config.json')
 logBase = config['logging']['logBase'] + '.modules.module1.module1'
-projConfig = jsonref.load(open('../config/modules/module1.json'))
+projConfig = cS.getConfig('modules/module1.json')
 
 @lD.log(logBase + '.getData')
 def getData(logger):
@@ -92,8 +95,8 @@ def main(logger, resultsDict):
     '''
 
     df = getData()
-    x_train, x_test, y_train, y_test = train_test_split(df.iloc[:,:-1], df.iloc[:,-1], test_size=0.25, random_state=2019)
-    model = LinearRegression()
+    x_train, x_test, y_train, y_test = model_selection.train_test_split(df.iloc[:,:-1], df.iloc[:,-1], test_size=0.25, random_state=2019)
+    model = linear_model.LinearRegression()
 
     model.fit(x_train, y_train)
     r_sq = model.score(x_test, y_test)
@@ -1,10 +1,11 @@
 from logs import logDecorator as lD 
-import jsonref, pprint
+import pprint
+from lib.configService import configService as cS
 
-config = jsonref.load(open('../config/config.json'))
+config = cS.getConfig('config.json')
 logBase = config['logging']['logBase'] + '.modules.versionedModule.versionedModule'
 
-configM = jsonref.load(open('../config/modules/versionedModule.json'))['params']
+configM = cS.getConfig('modules/versionedModule.json')['params']
 
 from lib.versionedLib import versionedLib
 
@@ -67,6 +68,10 @@ def main(logger, resultsDict):
     print('We get a copy of the result dictionary over here ...')
     pprint.pprint(resultsDict)
 
+    # load all the versions once, before they are used
+    if configM.get('preload', False):
+        versionedLib.preload(configM['versions'])
+
     doSomething()
 
     print('Getting out of versionedModule')
@@ -0,0 +1,93 @@
+from logs.asyncLogstash import AsyncLogstashHandler
+from time import monotonic, sleep
+import json, logging, socket, threading
+
+class Listener():
+    # A local stand-in for logstash, keeping the received lines
+    def __init__(self, read=True):
+        self.server = socket.create_server(('127.0.0.1', 0))
+        self.port   = self.server.getsockname()[1]
+        self.lines  = []
+        self.conns  = []
+        if read:
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        conn, _ = self.server.accept()
+        self.conns.append(conn)
+        data = b''
+        while True:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+            *lines, data = data.split(b'\n')
+            self.lines += [json.loads(l) for l in lines]
+
+    def close(self):
+        for c in self.conns:
+            c.close()
+        self.server.close()
+
+def makeLogger(name, handler):
+    logger = logging.getLogger(name)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+def test_batches():
+    listener = Listener()
+    handler  = AsyncLogstashHandler('127.0.0.1', listener.port, tags=['test'],
+        batchSize=10, flushInterval=0.05)
+    logger   = makeLogger('testAsyncLogstash.batches', handler)
+
+    for i in range(25):
+        logger.info('record %d', i)
+    handler.flush()
+    handler.close()
+
+    deadline = monotonic() + 5
+    while len(listener.lines) < 25 and monotonic() < deadline:
+        sleep(0.01)
+    listener.close()
+
+    assert [l['message'] for l in listener.lines] == [f'record {i}' for i in range(25)]
+    assert listener.lines[0]['tags'] == ['test']
+    assert listener.lines[0]['logger_name'] == 'testAsyncLogstash.batches'
+    assert handler.stats() == {'sent': 25, 'dropped': 0, 'failed': 0, 'queued': 0}
+
+def test_unreachable():
+    # Nothing listens on this port
+    listener = Listener(read=False)
+    port     = listener.port
+    listener.close()
+
+    handler = AsyncLogstashHandler('127.0.0.1', port, flushInterval=0.01, sendTimeout=0.5)
+    logger  = makeLogger('testAsyncLogstash.unreachable', handler)
+
+    t0 = monotonic()
+    for i in range(100):
+        logger.info('record %d', i)
+    assert monotonic() - t0 < 0.5
+
+    handler.flush()
+    handler.close()
+    assert handler.stats()['failed'] == 100
+
+def test_dropped():
+    # A listener that never reads, so that the sends block once the 
+    # socket buffers are full, and then the queue fills up
+    listener = Listener(read=False)
+    handler  = AsyncLogstashHandler('127.0.0.1', listener.port, queueSize=2, 
+        batchSize=1, flushInterval=0.01, sendTimeout=0.5)
+    logger   = makeLogger('testAsyncLogstash.dropped', handler)
+
+    message  = 'x' * 2**20
+    deadline = monotonic() + 10
+    while handler.dropped == 0 and monotonic() < deadline:
+        logger.info(message)
+
+    handler.close()
+    listener.close()
+    assert handler.dropped > 0
@@ -0,0 +1,55 @@
+from lib.databaseIO.columnBuffer import ColumnBuffers
+from decimal import Decimal
+import datetime
+import numpy as np
+import pandas as pd
+
+columns = ['PatientID', 'Days', 'VisitType', 'CGI', 'Flag', 'Date']
+rows = [
+    (1, 10, 'outpatient', Decimal('3'),   True,  datetime.date(2020, 1, 1)),
+    (1, 17, 'inpatient',  Decimal('4.5'), False, None),
+    (2, 3,  None,         None,           True,  datetime.date(2020, 1, 3)),
+    (3, 9,  'outpatient', 2.0,            None,  datetime.date(2020, 1, 4)),
+    (4, None, 'er',       5,              False, 'unknown'),
+]
+
+def fill(rows, chunk):
+    buffers = ColumnBuffers(columns, capacity=2)
+    for i in range(0, len(rows), chunk):
+        buffers.append(rows[i:i + chunk])
+    return buffers
+
+def test_types():
+    buffers = fill(rows[:2], 1)
+    assert buffers.kinds == ['int', 'int', 'str', 'float', 'bool', 'object']
+    df = buffers.toDataFrame()
+    assert df['PatientID'].dtype == np.int64
+    assert df['CGI'].tolist() == [3.0, 4.5]
+
+def test_promotion():
+    # The kinds of the columns change as chunks with other values arrive
+    for chunk in [1, 2, 5]:
+        buffers = fill(rows, chunk)
+        assert buffers.kinds == ['int', 'float', 'str', 'float', 'object', 'object']
+        df = buffers.toDataFrame()
+        assert len(df) == len(rows)
+        assert np.isnan(df['Days'].iloc[4]) and df['Days'].iloc[:4].tolist() == [10, 17, 3, 9]
+        assert df['VisitType'].isna().tolist() == [False, False, True, False, False]
+        assert df['Flag'].tolist() == [True, False, True, None, False]
+        assert df['Date'].tolist() == [r[5] for r in rows]
+
+def test_matches_dataframe():
+    data = [(i, i % 7, ['a', 'b', None][i % 3], float(i) / 3) for i in range(5000)]
+    buffers = ColumnBuffers(['a', 'b', 'c', 'd'])
+    for i in range(0, len(data), 333):
+        buffers.append(data[i:i + 333])
+    expected = pd.DataFrame(data, columns=['a', 'b', 'c', 'd'])
+    pd.testing.assert_frame_equal(buffers.toDataFrame(), expected)
+
+    df = buffers.toDataFrame(categorical=True)
+    assert list(df['c'].cat.categories) == ['a', 'b']
+    assert df['c'].isna().sum() == expected['c'].isna().sum()
+
+def test_empty():
+    df = ColumnBuffers(columns).toDataFrame()
+    assert list(df.columns) == columns and len(df) == 0
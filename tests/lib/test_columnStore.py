@@ -0,0 +1,119 @@
+from lib.columnStore import columnStore
+from benchmarks import synthData
+from logs import timings
+import numpy as np
+import mmap
+import pandas as pd
+import pytest
+
+visits = synthData.visits(5000, nPatients=200)
+visits.loc[3, 'Medication'] = None
+
+@pytest.fixture
+def path(tmp_path):
+    p = str(tmp_path / 'visits')
+    columnStore.writeDataset(visits, p, partitionRows=700, sortBy='PatientID')
+    return p
+
+def test_roundtrip(tmp_path):
+    p = str(tmp_path / 'visits')
+    columnStore.writeDataset(visits, p, partitionRows=700)
+    pd.testing.assert_frame_equal(columnStore.readDataset(p), visits)
+    pd.testing.assert_frame_equal(columnStore.readDataset(p, mmap=True), visits)
+
+def test_projection(path):
+    result = columnStore.readDataset(path, columns=['DiseaseCat', 'PatientID'])
+    expected = visits.sort_values('PatientID', kind='mergesort')[['DiseaseCat', 'PatientID']]
+    pd.testing.assert_frame_equal(result, expected)
+
+@pytest.mark.parametrize('filters', [
+    {'PatientID': (20, 35)},
+    {'PatientID': [7, 150, 10**6]},
+    {'DiseaseCat': ['bipolar disorder', 'not a disease']},
+    {'DiseaseCat': 'others', 'PatientID': (100, 120)},
+    {'PatientID': (10**6, 10**7)},
+])
+def test_filters(path, filters):
+    expected = visits.sort_values('PatientID', kind='mergesort')
+    for col, cond in filters.items():
+        if isinstance(cond, tuple):
+            expected = expected[expected[col].between(*cond)]
+        else:
+            expected = expected[expected[col].isin(cond if isinstance(cond, list) else [cond])]
+    result = columnStore.readDataset(path, filters=filters)
+    pd.testing.assert_frame_equal(result, expected)
+
+def test_pruning(path):
+    meta  = columnStore.readMeta(path)
+    reads = timings.getHistogram(columnStore.logBase + '._readPartition').count
+    parts = list(columnStore.iterDataset(path, filters={'PatientID': (20, 35)}))
+    assert len(meta['partitions']) > 1
+    assert len(parts) < len(meta['partitions'])
+    # only the partitions that are read are timed
+    assert timings.getHistogram(columnStore.logBase + '._readPartition').count == reads + len(parts)
+
+def test_writer_chunks(tmp_path):
+    p = str(tmp_path / 'visits')
+    with columnStore.DatasetWriter(p, partitionRows=1000) as writer:
+        for start in range(0, len(visits), 1500):
+            writer.append(visits.iloc[start:start + 1500])
+    pd.testing.assert_frame_equal(columnStore.readDataset(p), visits)
+
+    result = columnStore.readDataset(p, columns=['Medication'], categorical=True)
+    assert isinstance(result['Medication'].dtype, pd.CategoricalDtype)
+    assert result['Medication'].isna().sum() == 1
+
+def test_writer_default_index(tmp_path):
+    # Chunks that each start from zero are numbered on, and empty chunks are skipped
+    p = str(tmp_path / 'visits')
+    with columnStore.DatasetWriter(p) as writer:
+        writer.append(visits.iloc[:0])
+        for start in range(0, len(visits), 1500):
+            writer.append(visits.iloc[start:start + 1500].reset_index(drop=True))
+    pd.testing.assert_frame_equal(columnStore.readDataset(p), visits)
+
+def test_writer_widens_types(tmp_path):
+    # Chunks decoded separately: Age is int64 in one, and float64 with
+    # missing values (or missing altogether) in the others
+    chunks = [pd.DataFrame({'Age': np.array([30, 40]), 'Race': [None, None]}),
+              pd.DataFrame({'Age': [np.nan, 50.0], 'Race': ['white', None]}),
+              pd.DataFrame({'Age': pd.array([None, 7], dtype='Int64'), 'Race': ['asian', 'black']})]
+    p = str(tmp_path / 'demogs')
+    with columnStore.DatasetWriter(p) as writer:
+        for chunk in chunks:
+            writer.append(chunk)
+
+    result = columnStore.readDataset(p)
+    assert result.Age.dtype == 'float64'
+    np.testing.assert_array_equal(result.Age.to_numpy(), [30, 40, np.nan, 50, np.nan, 7])
+    assert result.Race.tolist()[2:] == ['white', np.nan, 'asian', 'black']
+    assert result.Race.isna()[:2].all()
+    for part in columnStore.iterDataset(p):
+        assert part.Age.dtype == 'float64'
+
+def test_writer_type_mismatch(tmp_path):
+    with pytest.raises(ValueError):
+        with columnStore.DatasetWriter(str(tmp_path / 'd')) as writer:
+            writer.append(pd.DataFrame({'Days': pd.to_datetime(['2020-01-01'])}))
+            writer.append(pd.DataFrame({'Days': [1.5]}))
+
+def test_writer_codes(tmp_path):
+    # The codes take the type of a Categorical with as many categories, and
+    # the partitions written before the dictionary outgrew int8 are widened
+    p = str(tmp_path / 'visits')
+    with columnStore.DatasetWriter(p, partitionRows=100) as writer:
+        writer.append(pd.DataFrame({'Medication': ['a', 'b', None] * 100}))
+        writer.append(pd.DataFrame({'Medication': [f'm{i}' for i in range(200)]}))
+
+    result = columnStore.readDataset(p, categorical=True)
+    assert result.Medication.cat.codes.dtype == np.int16
+    assert result.Medication.tolist() == ['a', 'b', np.nan] * 100 + [f'm{i}' for i in range(200)]
+
+    # A single partition read with mmap keeps its codes on the disk
+    p = str(tmp_path / 'demogs')
+    columnStore.writeDataset(pd.DataFrame({'Race': ['white', 'asian', None]}), p)
+    codes = columnStore.readDataset(p, mmap=True, categorical=True).Race.array.codes
+    assert codes.dtype == np.int8
+    while isinstance(codes.base, np.ndarray):
+        codes = codes.base
+    assert isinstance(codes.base, mmap.mmap)
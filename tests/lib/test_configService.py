@@ -0,0 +1,21 @@
+from lib.configService import configService as cS
+import json, os
+
+def test_getConfig(tmp_path):
+    path = tmp_path / 'a.json'
+    path.write_text(json.dumps({'params': {'n': 1}}))
+    first = cS.getConfig('a.json', str(tmp_path))
+    assert first == {'params': {'n': 1}}
+    assert cS.getConfig('a.json', str(tmp_path)) is first
+
+    # a changed file is parsed again
+    path.write_text(json.dumps({'params': {'n': 2}}))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+    assert cS.getConfig('a.json', str(tmp_path))['params']['n'] == 2
+
+def test_references(tmp_path):
+    (tmp_path / 'b.json').write_text(json.dumps({'x': {'y': 3}, 'z': {'$ref': '#/x'}}))
+    assert cS.getConfig('b.json', str(tmp_path))['z']['y'] == 3
+
+def test_default():
+    assert cS.getConfig()['logging']['logBase'] == 'VDL'
@@ -0,0 +1,49 @@
+from lib.databaseIO.copyStream import CopyDecoder, CopyEncoder
+from lib.databaseIO.columnBuffer import ColumnBuffers
+import datetime
+import pandas as pd
+
+columns   = ['PatientID', 'CGI', 'Diagnosis', 'Flag', 'Date']
+typeCodes = [23, 1700, 25, 16, 1082]
+rows = [(i, None if i % 5 == 0 else i / 4, 
+         ['major depressive\ndisorder', 'says "hello", twice', None, 'plain'][i % 4],
+         'f' if i % 3 else 't', datetime.date(2020, 1, 1 + i % 28)) for i in range(2000)]
+
+def decode(text, chunkMB):
+    buffers = ColumnBuffers(columns)
+    decoder = CopyDecoder(buffers, typeCodes, chunkMB=chunkMB)
+    for i in range(0, len(text), 777):
+        decoder.write(text[i:i + 777])
+    decoder.close()
+    return buffers.toDataFrame()
+
+def test_roundtrip():
+    # Postgres writes booleans as t/f
+    text = CopyEncoder(rows, chunkRows=300).read()
+    for chunkMB in [0.001, 0.01, 4]:
+        df = decode(text, chunkMB)
+        assert len(df) == len(rows)
+        assert df['PatientID'].tolist() == [r[0] for r in rows]
+        assert df['CGI'].isna().tolist() == [r[1] is None for r in rows]
+        assert df['Diagnosis'].fillna('null').tolist() == [r[2] or 'null' for r in rows]
+        assert df['Flag'].tolist() == [r[3] == 't' for r in rows]
+        assert df['Date'].tolist() == [r[4] for r in rows]
+
+def test_encoder_reads():
+    df = pd.DataFrame(rows, columns=columns)
+    whole = CopyEncoder(df, chunkRows=100).read()
+    assert whole == CopyEncoder(rows, chunkRows=100).read()
+
+    encoder, parts = CopyEncoder(df, chunkRows=100), []
+    while True:
+        part = encoder.read(1000)
+        if part == '':
+            break
+        assert len(part) <= 1000
+        parts.append(part)
+    assert ''.join(parts) == whole
+
+    encoder, lines = CopyEncoder(rows[:10]), []
+    for _ in range(20):
+        lines.append(encoder.readline())
+    assert ''.join(lines) == CopyEncoder(rows[:10]).read()
@@ -0,0 +1,22 @@
+from lib.lazyImport.lazyImport import LazyModule
+from lib.lazyImport import importProfile
+import sys
+
+def test_lazyModule():
+    sys.modules.pop('colorsys', None)
+    colorsys = LazyModule('colorsys')
+    assert 'colorsys' not in sys.modules
+    assert colorsys.rgb_to_hsv(1, 0, 0) == (0, 1, 1)
+    assert 'colorsys' in sys.modules
+
+def test_parseImportTime():
+    lines = ['import time: self [us] | cumulative | imported package\n',
+             'import time:       100 |        100 |     b\n',
+             'import time:       200 |        300 |   a\n',
+             'import time:        50 |        350 | top\n',
+             'something else\n']
+    entries = importProfile.parseImportTime(lines)
+    assert [(e['module'], e['depth'], e['cumulative']) for e in entries] == [
+        ('b', 2, 100), ('a', 1, 300), ('top', 0, 350)]
+    report = importProfile.summarize(entries)
+    assert report.startswith('Imported 3 modules in 0.000 s')
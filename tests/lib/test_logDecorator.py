@@ -0,0 +1,115 @@
+from logs import logDecorator as lD
+from logs import timings
+import json, logging
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+def makeLogger(base, level=logging.INFO):
+    logger  = logging.getLogger(base)
+    handler = ListHandler()
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return handler
+
+def test_verbose():
+    handler = makeLogger('testLogDecorator.verbose')
+
+    @lD.log('testLogDecorator.verbose', mode='verbose')
+    def add(logger, a, b):
+        return a + b
+
+    assert add(1, 2) == 3
+    assert handler.messages[0] == 'Starting the function [add] ...'
+    assert handler.messages[1].startswith('Finished the function [add] in ')
+    assert handler.messages[1].endswith(' seconds')
+
+def test_histogram():
+    handler = makeLogger('testLogDecorator.histogram')
+
+    @lD.log('testLogDecorator.histogram', mode='histogram')
+    def add(logger, a, b):
+        return a + b
+
+    assert [add(i, 1) for i in range(1000)] == list(range(1, 1001))
+    assert handler.messages == []
+    assert timings.getHistogram('testLogDecorator.histogram').count == 1000
+
+    timings.flush()
+    assert len(handler.messages) == 1
+    assert handler.messages[0].startswith('Timings of [histogram] over 1000 calls: total ')
+
+    # Nothing is logged for functions that were not called since
+    timings.flush()
+    assert len(handler.messages) == 1
+    add(1, 2)
+    timings.flush()
+    assert handler.messages[1].startswith('Timings of [histogram] over 1 calls: total ')
+    assert timings.getHistogram('testLogDecorator.histogram').count == 1001
+
+def test_quantile():
+    h = timings.Histogram()
+    for t in [1e-3] * 90 + [1.0] * 10:
+        h.add(t)
+    assert 1e-3 <= h.quantile(0.5) < 1.3e-3
+    assert 1.0 <= h.quantile(0.95) <= 1.0
+    assert h.max == 1.0
+    assert timings.Histogram().quantile(0.5) == 0
+
+def test_metrics():
+    base = 'testLogDecorator.metrics'
+    makeLogger(base, level=logging.WARNING)
+
+    @lD.log(base + '.div', mode='verbose')
+    def div(logger, a, b):
+        return a / b
+
+    for i in range(10):
+        div(1, 1)
+    try:
+        div(1, 0)
+    except ZeroDivisionError:
+        pass
+
+    m = timings.metrics()[base + '.div']
+    assert (m['count'], m['failures']) == (11, 1)
+    assert m['p50'] <= m['p95'] <= m['p99'] <= m['max']
+
+    assert json.loads(timings.toJSON())[base + '.div']['count'] == 11
+    text = timings.toPrometheus()
+    assert f'vdl_function_seconds_count{{function="{base}.div"}} 11' in text
+    assert f'vdl_function_failures_total{{function="{base}.div"}} 1' in text
+    assert base + '.div' in timings.summaryTable()
+
+def test_generator():
+    # Only the logger is injected, since a call just creates the generator
+    base    = 'testLogDecorator.generator'
+    handler = makeLogger(base)
+
+    @lD.log(base, mode='verbose')
+    def count(logger, n):
+        for i in range(n):
+            logger.info('item %d', i)
+            yield i
+
+    assert list(count(2)) == [0, 1]
+    assert handler.messages == ['item 0', 'item 1']
+    assert base not in timings.metrics()
+
+def test_timedAndMerge():
+    name = 'testLogDecorator.timed'
+
+    class A():
+        @timings.timed(name)
+        def f(self, x):
+            return 2 * x
+
+    assert A().f(2) == 4
+    state = timings.state()[name]
+    timings.merge({name: state})
+    assert timings.metrics()[name]['count'] == 2
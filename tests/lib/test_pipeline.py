@@ -0,0 +1,129 @@
+from lib.resultGraph import pipeline
+import json, threading, time
+import pytest
+
+def spec(inputs=None, outputs=None, params=None):
+    return {'inputs': inputs or {}, 'outputs': outputs or {}, 'params': params or {}}
+
+def folder(path):
+    return {'type': 'folder-dataset', 'location': str(path)}
+
+@pytest.fixture
+def setup(tmp_path):
+    # a -> data1 -> c, b -> data2 -> c, with c writing data3
+    configs = tmp_path / 'config'
+    configs.mkdir()
+    d1, d2, d3 = tmp_path / 'data1', tmp_path / 'data2', tmp_path / 'data3'
+    specs = {
+        'a' : spec({'dbName': 'mindlincnew'}, {'data1': folder(d1)}, {'n': 1}),
+        'b' : spec({}, {'data2': folder(d2)}),
+        'c' : spec({'data1': folder(d1), 'data2': folder(d2)}, {'data3': folder(d3)}),
+    }
+    for name, s in specs.items():
+        (configs / f'{name}.json').write_text(json.dumps(s))
+        (tmp_path / f'{name}.py').write_text(f'# module {name}')
+    outputs = {'a': d1, 'b': d2, 'c': d3}
+
+    modules = [{'moduleName': n, 'path': str(tmp_path / f'{n}.py')} for n in ['c', 'b', 'a']]
+    cache   = {'todo': True, 'stateFile': str(tmp_path / 'state.json'), 'always': []}
+    return modules, cache, str(configs), outputs
+
+def runner(outputs, ran, fail=()):
+    lock = threading.Lock()
+    def run(m):
+        name = m['moduleName']
+        time.sleep(0.05)
+        with lock:
+            ran.append(name)
+        if name in fail:
+            raise RuntimeError('failed')
+        outputs[name].mkdir(exist_ok=True)
+        (outputs[name] / 'part.npy').write_text(f'{name} {time.perf_counter_ns()}')
+    return run
+
+def test_order_and_cache(setup):
+    modules, cache, configs, outputs = setup
+    ran = []
+    status = pipeline.runPipeline(modules, runner(outputs, ran), cache=cache, folder=configs)
+    assert status == {'a': 'done', 'b': 'done', 'c': 'done'}
+    assert ran[-1] == 'c' and set(ran[:2]) == {'a', 'b'}
+
+    # nothing changed
+    ran.clear()
+    status = pipeline.runPipeline(modules, runner(outputs, ran), cache=cache, folder=configs)
+    assert ran == [] and set(status.values()) == {'skipped'}
+
+    # an input of c changed, so only c runs again
+    ran.clear()
+    (outputs['b'] / 'part.npy').write_text('changed')
+    pipeline.runPipeline(modules, runner(outputs, ran), cache=cache, folder=configs)
+    assert ran == ['c']
+
+    # a missing output is produced again
+    ran.clear()
+    (outputs['a'] / 'part.npy').unlink()
+    outputs['a'].rmdir()
+    pipeline.runPipeline(modules, runner(outputs, ran), cache=cache, folder=configs)
+    assert ran[0] == 'a'
+
+def test_params_change(setup, tmp_path):
+    modules, cache, configs, outputs = setup
+    pipeline.runPipeline(modules, runner(outputs, []), cache=cache, folder=configs)
+
+    s = json.loads((tmp_path / 'config' / 'a.json').read_text())
+    s['params']['n'] = 2
+    (tmp_path / 'config' / 'a.json').write_text(json.dumps(s))
+    ran = []
+    pipeline.runPipeline(modules, runner(outputs, ran), cache=cache, folder=configs)
+    assert ran == ['a', 'c']
+
+def test_failure(setup):
+    modules, cache, configs, outputs = setup
+    ran = []
+    status = pipeline.runPipeline(modules, runner(outputs, ran, fail=['a']), cache=cache, folder=configs)
+    assert status == {'a': 'failed', 'b': 'done', 'c': 'blocked'}
+    assert 'c' not in ran
+
+def test_mainThread(setup):
+    modules, cache, configs, outputs = setup
+    threads = {}
+    run     = runner(outputs, [])
+    def record(m):
+        threads[m['moduleName']] = threading.current_thread() is threading.main_thread()
+        run(m)
+
+    # a and b are ready together and share the pool, c is the only one left
+    status = pipeline.runPipeline(modules, record, folder=configs)
+    assert set(status.values()) == {'done'}
+    assert threads == {'a': False, 'b': False, 'c': True}
+
+    # a module may ask for the main thread
+    modules[2]['mainThread'] = True
+    pipeline.runPipeline(modules, record, folder=configs)
+    assert threads == {'a': True, 'b': False, 'c': True}
+
+moduleCode = {
+    'ok'      : 'def main(resultsDict):\n    print("hello from ok")\n    return {"n": resultsDict["n"] + 1}',
+    'fails'   : 'def main(resultsDict):\n    raise ValueError("bad value")',
+    'slow'    : 'import time\ndef main(resultsDict):\n    time.sleep(60)',
+    'greedy'  : 'def main(resultsDict):\n    x = bytearray(2 * 1024**3)',
+}
+
+@pytest.mark.parametrize('name, status', [
+    ('ok', 'done'), ('fails', 'failed'), ('slow', 'timeout'), ('greedy', 'failed')])
+def test_runProcess(tmp_path, name, status):
+    path = tmp_path / f'{name}.py'
+    path.write_text(moduleCode[name])
+    results = {}
+    module  = {'moduleName': name, 'path': str(path)}
+    logs    = str(tmp_path / 'logs')
+
+    if status == 'done':
+        assert pipeline.runProcess(module, {'n': 1}, results, timeout=60, logFolder=logs) == {'n': 2}
+        assert 'hello from ok' in open(results[name]['logFile']).read()
+    else:
+        with pytest.raises(RuntimeError):
+            pipeline.runProcess(module, {'n': 1}, results, timeout=3, memoryMB=1024, logFolder=logs)
+    assert results[name]['status'] == status
+    if name == 'greedy':
+        assert 'MemoryError' in results[name]['error']
@@ -0,0 +1,42 @@
+from lib.profiler import profiler
+from time import perf_counter
+import os, threading
+
+def busy(seconds):
+    t0 = perf_counter()
+    while perf_counter() - t0 < seconds:
+        pass
+
+def test_sampler():
+    sampler = profiler.Sampler(interval=0.001)
+    sampler.start()
+
+    @sampler.wrap('callback')
+    def callback():
+        busy(0.2)
+
+    # A labelled thread next to an unlabelled one
+    threads = [threading.Thread(target=callback), threading.Thread(target=busy, args=(0.2,))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    sampler.stop()
+
+    lines = sampler.folded().splitlines()
+    assert lines
+    assert all(l.startswith('callback;') for l in lines)
+    assert any(';busy (test_profiler.py:' in l for l in lines)
+    assert sum(int(l.rsplit(' ', 1)[1]) for l in lines) == sampler.samples['callback']
+    assert sampler.calls['callback'] == 1
+    assert sampler.summary().splitlines()[1].startswith('callback')
+
+def test_profile(tmp_path):
+    f = profiler.profile(lambda: busy(0.1) or profiler.active, 'main', 
+            interval=0.001, logFolder=str(tmp_path))
+    assert isinstance(f(), profiler.Sampler)
+    assert profiler.active is None
+
+    files = os.listdir(tmp_path)
+    assert len(files) == 1 and files[0].endswith('.folded')
+    assert open(tmp_path / files[0]).read().startswith('main;')
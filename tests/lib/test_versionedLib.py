@@ -0,0 +1,34 @@
+from lib.versionedLib import versionedLib
+import os, pytest
+
+@pytest.fixture
+def versions(tmp_path, monkeypatch):
+    for v in ['1_000', '1_001']:
+        (tmp_path / f'ver_{v}').mkdir()
+        for lib in ['lib1', 'lib2']:
+            (tmp_path / f'ver_{v}' / f'{lib}.py').write_text(f'version = "{v}"\nloads = []\n')
+    monkeypatch.setattr(versionedLib, 'versionsFolder', str(tmp_path))
+    versionedLib.clearLibs()
+    yield tmp_path
+    versionedLib.clearLibs()
+
+def test_cached(versions):
+    lib = versionedLib.getLib('1_000', 'lib1')
+    lib.loads.append(1)
+    assert versionedLib.getLib('1_000', 'lib1') is lib
+    assert versionedLib.getLib('1_001', 'lib1').version == '1_001'
+    with pytest.raises(AssertionError):
+        versionedLib.getLib('1_002', 'lib1')
+
+def test_reload(versions):
+    lib  = versionedLib.getLib('1_001', 'lib2')
+    path = versions / 'ver_1_001' / 'lib2.py'
+    path.write_text('version = "changed"\n')
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+    new = versionedLib.getLib('1_001', 'lib2')
+    assert new is not lib and new.version == 'changed'
+
+def test_preload(versions):
+    loaded = versionedLib.preload(['1_000', '1_001'])
+    assert sorted(loaded) == [('lib1', '1_000'), ('lib1', '1_001'), ('lib2', '1_000'), ('lib2', '1_001')]
+    assert len(versionedLib._registry) == 4
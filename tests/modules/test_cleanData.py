@@ -0,0 +1,39 @@
+from modules.VDL import cleanData
+from modules.VDL.diseaseCategories import DSMRecoder
+from lib.columnStore import columnStore
+from benchmarks import synthData
+import pandas as pd
+import pytest
+
+@pytest.fixture(autouse=True)
+def recoder(monkeypatch):
+    recoder = DSMRecoder(synthData.dsmTable())
+    monkeypatch.setattr(cleanData, 'getRecoder', lambda path: recoder)
+    return recoder
+
+def test_cleanDemogs(tmp_path):
+    demogs = synthData.rawDemographics(5000)
+    columnStore.writeDataset(demogs, str(tmp_path / 'raw'), partitionRows=700)
+    cleanData.cleanDemogs(str(tmp_path / 'raw'), str(tmp_path / 'clean'))
+
+    expected = cleanData.cleanSex(cleanData.cleanRace(demogs.copy()))
+    result = columnStore.readDataset(str(tmp_path / 'clean'))
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert len(columnStore.readMeta(str(tmp_path / 'clean'))['partitions']) == 8
+
+def test_cleanVisits(tmp_path, recoder):
+    visits = synthData.visits(5000, nPatients=200)
+    visits['DSMNo'] = synthData.dsmCodes(len(visits))
+    columnStore.writeDataset(visits, str(tmp_path / 'raw'), partitionRows=700)
+    cleanData.cleanVisits(str(tmp_path / 'raw'), str(tmp_path / 'clean'))
+
+    expected = visits.assign(DiseaseCat=recoder.recode(visits.DSMNo))
+    pd.testing.assert_frame_equal(columnStore.readDataset(str(tmp_path / 'clean')), expected, check_dtype=False)
+
+def test_cleanPartition():
+    visits = synthData.visits(300, nPatients=20).iloc[::-1]
+    visits['DSMNo'] = synthData.dsmCodes(len(visits))
+    order  = visits.VisitID.tolist()
+    demogs, visits = cleanData.cleanPartition(synthData.rawDemographics(20), visits)
+    assert visits.VisitID.tolist() == order
+    assert set(demogs.Sex) <= {'M', 'F', 'Unknown'}
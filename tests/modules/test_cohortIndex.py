@@ -0,0 +1,31 @@
+from modules.VDL.cohortIndex import CohortIndex, scanFilter
+from benchmarks import synthData
+import pandas as pd
+import pytest
+
+visits = synthData.visits(20000, nPatients=500)
+demog  = synthData.demographics(520)
+index  = CohortIndex(demog, visits)
+
+default = {'Sex': None, 'Race': None, 'Age': None, 'Medication': 'all', 'DiseaseCat': 'all'}
+
+@pytest.mark.parametrize('filt', [
+    {},
+    {'Sex': 'F'},
+    {'Race': 'asian', 'Age': 40},
+    {'Age': 37.5},
+    {'Age': 40, 'Sex': 'M', 'Race': 'white'},
+    {'Race': 'not a race'},
+    {'DiseaseCat': ['anxiety disorders', 'bipolar disorder']},
+    {'DiseaseCat': 'others', 'Medication': ['prozac', 'lithium']},
+    {'Age': 60, 'Sex': 'F', 'DiseaseCat': ['anxiety disorders']},
+])
+def test_filter(filt):
+    filt = dict(default, **filt)
+    for pid in [1, 250, 10**6]:
+        expected = scanFilter(filt, pid, demog, visits)
+        pd.testing.assert_frame_equal(index.filter(filt, pid), expected)
+
+def test_patientRows():
+    for pid in [1, 250, 10**6]:
+        pd.testing.assert_frame_equal(index.patientRows(pid), visits[visits.PatientID == pid])
@@ -0,0 +1,32 @@
+from modules.VDL.diseaseCategories import DSMRecoder
+from benchmarks import synthData
+import pandas as pd
+import pytest
+
+table = synthData.dsmTable()
+
+def loopRecode(dsmno, othersPattern=None):
+    # The original loop over the disorders
+    data = pd.DataFrame({'DSMNo': dsmno})
+    data['DiseaseCat'] = 'others'
+    for i, (disorders, counts, regex, dsm) in table.iterrows():
+        if disorders != 'others':
+            data.loc[data.DSMNo.str.contains(regex, na=False), 'DiseaseCat'] = disorders
+    if othersPattern is not None:
+        data.loc[data.DiseaseCat.str.contains(othersPattern), 'DiseaseCat'] = 'others'
+    return data.DiseaseCat
+
+@pytest.mark.parametrize('othersPattern', [None, 'bipolar|anxiety'])
+def test_recode(othersPattern):
+    dsmno = pd.Series(synthData.dsmCodes(5000), dtype=object, index=range(100, 5100))
+    dsmno[[105, 2000]] = None
+    recoder = DSMRecoder(table, othersPattern=othersPattern)
+
+    expected = loopRecode(dsmno, othersPattern)
+    pd.testing.assert_series_equal(recoder.recode(dsmno), expected, check_dtype=False)
+
+    # A second call is answered from the cache
+    n = len(recoder.cache)
+    part = dsmno.iloc[::7]
+    pd.testing.assert_series_equal(recoder.recode(part), expected.iloc[::7], check_dtype=False)
+    assert len(recoder.cache) == n
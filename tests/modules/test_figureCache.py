@@ -0,0 +1,75 @@
+from modules.VDL import figureCache
+from modules.VDL.figureCache import FigureCache, makeKey
+import plotly.graph_objects as go
+import pytest
+
+def figure(n, points=1):
+    return go.Figure(go.Scatter(x=list(range(points)), y=[n] * points))
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(figureCache, 'time', lambda: now[0])
+    return now
+
+def test_makeKey():
+    assert makeKey({'a': 1, 'b': 2}, 3) == makeKey({'b': 2, 'a': 1}, 3)
+    assert makeKey({'a': 1}, 3) != makeKey({'a': 2}, 3)
+
+def test_hits_and_misses(clock):
+    cache = FigureCache()
+    computed = []
+    def compute():
+        computed.append(1)
+        return figure(1)
+
+    first  = cache.getOrCompute('k', compute)
+    second = cache.getOrCompute('k', compute)
+    assert first == second and len(computed) == 1
+    assert second['data'][0]['y'] == [1]
+    assert cache.get('other') is None
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 2, 1)
+
+def test_ttl(clock):
+    cache = FigureCache(ttl=10)
+    cache.set('k', figure(1))
+    clock[0] += 9
+    assert cache.get('k') is not None
+    clock[0] += 2
+    assert cache.get('k') is None
+    assert cache.stats()['entries'] == 0 and cache.stats()['bytes'] == 0
+
+def test_eviction_by_entries(clock):
+    cache = FigureCache(maxEntries=2)
+    cache.set('a', figure(1))
+    cache.set('b', figure(2))
+    cache.get('a')              # b is now the least recently used
+    cache.set('c', figure(3))
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.stats()['evictions'] == 1
+
+def test_eviction_by_size(clock):
+    size  = len(figure(1, 1000).to_json())
+    cache = FigureCache(maxMB=2.5 * size / 1024**2)
+    for n in range(3):
+        cache.set(n, figure(n, 1000))
+    assert cache.get(0) is None
+    assert cache.get(1) is not None and cache.get(2) is not None
+    assert cache.stats()['bytes'] <= cache.maxBytes
+
+    # a single entry larger than the limit is still kept
+    cache.set('large', figure(3, 5000))
+    assert cache.get('large') is not None and cache.stats()['entries'] == 1
+
+def test_invalidate(clock):
+    cache = FigureCache()
+    cache.set('a', figure(1), tags=['population1'])
+    cache.set('b', figure(2), tags=['population1', 'population2'])
+    cache.set('c', figure(3), tags=['population2'])
+    cache.invalidate('population1')
+    assert cache.get('a') is None and cache.get('b') is None
+    assert cache.get('c') is not None
+    assert cache.stats()['bytes'] == len(figure(3).to_json())
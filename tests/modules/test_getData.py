@@ -0,0 +1,148 @@
+from modules.VDL import getData
+from lib.databaseIO.columnBuffer import ColumnBuffers
+from lib.columnStore import columnStore
+import numpy as np
+import pandas as pd
+import threading, time
+import pytest
+
+# The cohort: PatientID, VisitID and Days. Every patient has two visits,
+# and the age of every third patient is NULL
+cohort = pd.DataFrame({
+    'PatientID' : np.repeat(np.arange(1, 21), 2),
+    'VisitID'   : np.arange(1, 41),
+    'Days'      : np.tile([0, 10], 20)})
+
+# The visits within the (fake) database
+database = {'visits': cohort}
+
+def ageOf(p):
+    return None if p % 3 == 0 else 20 + p
+
+def fakeDemographics(patientList=None, saveData=True, raiseErrors=False):
+    # Decoded by ColumnBuffers, like the result of a query
+    buffers = ColumnBuffers(['PatientID', 'Sex', 'Race', 'Age'])
+    buffers.append([(int(p), 'F', 'white', ageOf(p)) for p in sorted(patientList)])
+    return buffers.toDataFrame()
+
+def fakeTrips(visit_list=None, saveData=True, raiseErrors=False):
+    rows = database['visits'][database['visits'].VisitID.isin(visit_list)]
+    buffers = ColumnBuffers(['PatientID', 'VisitID', 'Days', 'CGI'])
+    buffers.append([(int(p), int(v), int(d), 4) for p, v, d in rows.itertuples(index=False)])
+    return buffers.toDataFrame()
+
+@pytest.fixture
+def fakePulls(monkeypatch):
+    monkeypatch.setattr(getData, 'getDemographics', fakeDemographics)
+    monkeypatch.setattr(getData, 'getTripsData', fakeTrips)
+
+def test_pullPartitions(fakePulls):
+    parts = list(getData.pullPartitions(cohort, concurrency=2, partitionSize=3))
+    assert [r for r, _, _ in parts] == [(1, 3), (4, 6), (7, 9), (10, 12), (13, 15), (16, 18), (19, 20)]
+    demogs = pd.concat([d for _, d, _ in parts])
+    assert demogs.PatientID.tolist() == list(range(1, 21))
+    assert sum(len(v) for _, _, v in parts) == len(cohort)
+
+def test_pullPartitions_bounded(monkeypatch):
+    # The first partition is slow: the others must not all be pulled
+    # and kept while waiting for it
+    lock, pulled = threading.Lock(), []
+    def demographics(patientList=None, saveData=True, raiseErrors=False):
+        if 1 in patientList:
+            time.sleep(0.3)
+        with lock:
+            pulled.append(min(patientList))
+        return fakeDemographics(patientList)
+    monkeypatch.setattr(getData, 'getDemographics', demographics)
+    monkeypatch.setattr(getData, 'getTripsData', fakeTrips)
+
+    parts = getData.pullPartitions(cohort, concurrency=2, partitionSize=2)
+    (lo, hi), _, _ = next(parts)
+    assert (lo, hi) == (1, 2)
+    with lock:
+        assert len(pulled) <= 2
+    assert len(list(parts)) == 9
+
+def test_extractPartitions(fakePulls, tmp_path, monkeypatch):
+    monkeypatch.setitem(getData.Database.projConfig['params']['extraction'], 'clean', False)
+    getData.extractPartitions(cohort, savePath=str(tmp_path), concurrency=3, partitionSize=2)
+
+    demogs = columnStore.readDataset(str(tmp_path / 'patient_demographics'))
+    expected = [np.nan if ageOf(p) is None else ageOf(p) for p in range(1, 21)]
+    assert demogs.Age.dtype == 'float64'
+    np.testing.assert_array_equal(demogs.Age.to_numpy(), expected)
+
+    visits = columnStore.readDataset(str(tmp_path / 'visits_data'))
+    assert visits.VisitID.tolist() == cohort.VisitID.tolist()
+
+def readBoth(path):
+    return (columnStore.readDataset(str(path / 'patient_demographics')), 
+            columnStore.readDataset(str(path / 'visits_data')))
+
+@pytest.fixture
+def extracted(fakePulls, tmp_path, monkeypatch):
+    # A full extraction of the cohort with small partitions
+    params = getData.Database.projConfig['params']['extraction']
+    monkeypatch.setitem(params, 'clean', False)
+    monkeypatch.setitem(params, 'partitionSize', 2)
+    monkeypatch.setitem(params, 'concurrency', 2)
+    getData.extractIncremental(cohort, savePath=str(tmp_path))
+    assert getData.readWatermarks(str(tmp_path))['VisitID'] == 40
+    return tmp_path
+
+def test_extractIncremental(extracted, monkeypatch):
+    # Patient 2 leaves the cohort, patient 5 has a new visit, and patients
+    # 21 (with a NULL age) and 22 are new
+    new = pd.DataFrame({'PatientID': [5, 21, 22], 'VisitID': [41, 42, 43], 'Days': [20, 0, 0]})
+    updated = pd.concat([cohort[cohort.PatientID != 2], new], ignore_index=True)
+    monkeypatch.setitem(database, 'visits', updated)
+    getData.extractIncremental(updated, savePath=str(extracted))
+
+    demogs, visits = readBoth(extracted)
+    assert sorted(demogs.PatientID) == sorted(updated.PatientID.unique())
+    ages = dict(zip(demogs.PatientID, demogs.Age))
+    assert np.isnan(ages[21]) and ages[22] == 42 and ages[1] == 21
+    assert sorted(visits.VisitID) == sorted(updated.VisitID)
+    assert getData.readWatermarks(str(extracted))['VisitID'] == 43
+
+def test_extractIncremental_failedPull(extracted, monkeypatch):
+    before = readBoth(extracted)
+    marks  = getData.readWatermarks(str(extracted))
+
+    def failing(visit_list=None, saveData=True, raiseErrors=False):
+        raise RuntimeError('connection lost')
+    monkeypatch.setattr(getData, 'getTripsData', failing)
+
+    new = pd.DataFrame({'PatientID': [5], 'VisitID': [41], 'Days': [20]})
+    with pytest.raises(RuntimeError, match='connection lost'):
+        getData.extractIncremental(pd.concat([cohort, new], ignore_index=True), savePath=str(extracted))
+
+    for b, a in zip(before, readBoth(extracted)):
+        pd.testing.assert_frame_equal(a, b)
+    assert getData.readWatermarks(str(extracted)) == marks
+
+def test_extractIncremental_emptyPatients(extracted, monkeypatch):
+    # Patient 21 joins without any data, and patient 5 has a new visit that
+    # comes back empty: both are left out, and the watermarks still advance
+    new = pd.DataFrame({'PatientID': [21, 5], 'VisitID': [41, 42], 'Days': [0, 20]})
+    updated = pd.concat([cohort, new], ignore_index=True)
+    monkeypatch.setattr(getData, 'getDemographics', 
+        lambda patientList=None, **k: fakeDemographics([p for p in patientList if p != 21]))
+    monkeypatch.setattr(getData, 'getTripsData', 
+        lambda visit_list=None, **k: fakeTrips([v for v in visit_list if v <= 40]))
+    getData.extractIncremental(updated, savePath=str(extracted))
+
+    demogs, visits = readBoth(extracted)
+    assert 21 not in set(demogs.PatientID) and 5 in set(demogs.PatientID)
+    assert sorted(visits.VisitID) == list(range(1, 41))
+    marks = getData.readWatermarks(str(extracted))
+    assert marks['VisitID'] == 42 and marks['empty'] == [21]
+
+    # The empty patient is not pulled again until it has new visits
+    pulled = []
+    def demographics(patientList=None, **k):
+        pulled.extend(patientList)
+        return fakeDemographics(patientList)
+    monkeypatch.setattr(getData, 'getDemographics', demographics)
+    getData.extractIncremental(updated, savePath=str(extracted))
+    assert pulled == [] and getData.readWatermarks(str(extracted))['empty'] == [21]
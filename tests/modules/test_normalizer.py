@@ -0,0 +1,70 @@
+from modules.VDL.normalizer import RuleNormalizer, getNormalizer
+from modules.VDL import cleanData
+from benchmarks import synthData
+import numpy as np
+import pandas as pd
+import pytest
+
+configPath = '../config/modules/cleanData.json'
+
+def cleanRaceOld(df):
+    # The original implementation of cleanData.cleanRace
+    df.loc[df.Race=='','Race'] = 'other'
+    df.loc[df.Race.str.startswith('multiracial'),'Race'] = 'mixed race'
+    df.loc[df.Race.str.startswith('white'),'Race'] = 'white'
+    df.loc[df.Race.str.startswith('black'),'Race'] = 'black'
+    df.loc[df.Race.str.startswith('asian'),'Race'] = 'asian'
+    df.loc[df.Race.str.startswith('hispanic'),'Race'] = 'hispanic'
+    df.loc[df.Race.str.contains('or'),'Race'] = 'other'
+    df.loc[df.Race.str.contains('other'),'Race'] = 'other'
+    df.loc[df.Race.str.contains('pacific'),'Race'] = 'native american'
+    df.loc[df.Race.str.contains('hawaiian'),'Race'] = 'native american'
+    df.Race = df.Race.replace({'^[a-z]{1}$|[0-9]':'other',
+                        'mexican|puerto rican|jamaican|dominican' : 'hispanic',
+                        'caucasian' : 'white',
+                        'african american' : 'black',
+                        'americanindianalaskannative': 'native american',
+                        'amer indian/alaskan native' : 'native american',
+                        'mixed race|multi raci|biracial|multiracial' : 'mixed race',
+                        'unable to obtain|other race|declined to specify|unknown|otherotherotherother-other|other not elsewhere classified|declined|patient unavailable':'other'
+                        },
+                        regex=True)
+    return df
+
+def cleanSexOld(df):
+    sexes=['M','F']
+    df.loc[~df.Sex.isin(sexes),'Sex'] = 'Unknown'
+    return df
+
+@pytest.fixture
+def demogs():
+    df = synthData.rawDemographics(3000)
+    df.index = df.index + 10
+    return df
+
+def test_race(demogs):
+    expected = cleanRaceOld(demogs.copy())
+    pd.testing.assert_frame_equal(cleanData.cleanRace(demogs.copy()), expected, check_dtype=False)
+
+    # every raw value is normalized the same, one at a time
+    normalizer = getNormalizer('Race', configPath)
+    for race in synthData.rawRaces:
+        old = cleanRaceOld(pd.DataFrame({'Race': [race]})).Race[0]
+        assert normalizer.normalize(pd.Series([race], name='Race'))[0] == old
+
+def test_sex(demogs):
+    expected = cleanSexOld(demogs.copy())
+    pd.testing.assert_frame_equal(cleanData.cleanSex(demogs.copy()), expected, check_dtype=False)
+
+def test_categorical():
+    normalizer = RuleNormalizer([{'op': 'notin', 'pattern': ['M', 'F'], 'value': 'Unknown'}])
+    values = pd.Series(['M', 'x', None, 'F', 'y'], name='Sex')
+    result = normalizer.normalize(values, categorical=True)
+    assert isinstance(result.dtype, pd.CategoricalDtype)
+    assert result.tolist()[:2] == ['M', 'Unknown'] and result.isna().tolist() == [False, False, True, False, False]
+    assert sorted(result.cat.categories) == ['F', 'M', 'Unknown']
+    assert len(normalizer.cache) == 4
+
+def test_unknownRule():
+    with pytest.raises(ValueError):
+        RuleNormalizer([{'op': 'endswith', 'pattern': 'a', 'value': 'b'}])
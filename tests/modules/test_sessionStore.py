@@ -0,0 +1,72 @@
+from modules.VDL.sessionStore import SessionStore
+import os, time
+import pytest
+
+def factory(state):
+    return {'pid': state['pid'], 'built': time.perf_counter_ns()}
+
+def sessions(folder):
+    return sorted(f[:-len('.json')] for f in os.listdir(folder) if f.endswith('.json'))
+
+def test_roundTrip(tmp_path):
+    store = SessionStore(str(tmp_path), factory)
+    state = {'pid': 516, 'filt_values': {'Age': 40, 'DiseaseCat': ['anxiety disorders']}}
+    store.set('abc-1', state)
+    assert store.getState('abc-1') == state
+
+    # the object is built once, and again when the state changes
+    obj = store.get('abc-1')
+    assert obj['pid'] == 516 and store.get('abc-1') is obj
+    store.set('abc-1', {'pid': 7, 'filt_values': {}})
+    assert store.get('abc-1')['pid'] == 7
+
+    # another worker sees the same state
+    assert SessionStore(str(tmp_path), factory).get('abc-1')['pid'] == 7
+
+    assert store.getState('unknown') is None
+    with pytest.raises(KeyError):
+        store.get('unknown')
+    assert store.get('new', default=lambda: {'pid': 1})['pid'] == 1
+    with pytest.raises(ValueError):
+        store.getState('../config')
+
+def test_lru(tmp_path):
+    store = SessionStore(str(tmp_path), factory, sizeOf=lambda obj: obj['pid'] * 1024**2,
+        maxCached=2, memoryLimitMB=10)
+    for s in ['a', 'b']:
+        store.set(s, {'pid': 1})
+    objs = {s: store.get(s) for s in ['a', 'b']}
+    store.get('a')                     # b is now the least recently used
+    store.set('c', {'pid': 1})
+    store.get('c')
+    assert store.get('a') is objs['a']
+    assert store.get('b') is not objs['b']
+    assert store.stats()['cached'] == 2
+
+    # the memory limit evicts as well, but keeps the newest object
+    store.set('d', {'pid': 20})
+    store.get('d')
+    assert store.stats() == {'cached': 1, 'cacheBytes': 20 * 1024**2}
+
+def test_prune(tmp_path):
+    store = SessionStore(str(tmp_path), factory, maxStored=3, pruneEvery=5, pruneInterval=3600)
+    for i in range(8):
+        store.set(f's{i}', {'pid': i})
+        os.utime(tmp_path / f's{i}.json', (1000 + i, 1000 + i))
+
+    # the first write prunes, and then every fifth one. The folder is not
+    # listed in between, so that it may hold more than maxStored sessions.
+    assert sessions(tmp_path) == ['s3', 's4', 's5', 's6', 's7']
+    store.prune()
+    assert sessions(tmp_path) == ['s5', 's6', 's7']
+
+def test_prune_interval(tmp_path):
+    store = SessionStore(str(tmp_path), factory, maxAge=60, pruneEvery=100, pruneInterval=0.1)
+    store.set('old', {'pid': 1})
+    os.utime(tmp_path / 'old.json', (0, 0))
+    store.set('new', {'pid': 2})
+    assert sessions(tmp_path) == ['new', 'old']
+
+    time.sleep(0.15)
+    store.set('newer', {'pid': 3})
+    assert sessions(tmp_path) == ['new', 'newer']
@@ -0,0 +1,96 @@
+from modules.VDL import utils
+from benchmarks import synthData
+from benchmarks.benchCGIChange import getCGIchangeDataOld
+import pandas as pd
+import numpy as np
+import pytest
+
+visits = synthData.visits(20000, nPatients=700)
+
+@pytest.mark.parametrize('period', ['Week', 'Month', 'Year'])
+def test_getCGIchangeData(period):
+    # A filtered population, with the index no longer being a range
+    data = visits[(visits.PatientID != 3) & (visits.DiseaseCat != 'others')]
+    pd.testing.assert_frame_equal(
+        utils.getCGIchangeData(data, period), getCGIchangeDataOld(data, period))
+    return
+
+def test_getCGIchangeData_ties():
+    # Ties in the first day take the CGI of the first of the tied rows
+    data = pd.DataFrame({'PatientID': [2, 1, 2, 1, 2], 
+                         'Days'     : [5, 3, 5, 3, 9],
+                         'CGI'      : [4., 6., 2., 1., 3.]}, index=[10, 4, 7, 8, 1])
+    pd.testing.assert_frame_equal(
+        utils.getCGIchangeData(data), getCGIchangeDataOld(data))
+    return
+
+def test_heatmapAggregates():
+    from modules.VDL.heatmapAggregates import HeatmapAggregates
+    aggregates = HeatmapAggregates(visits)
+    population = visits[(visits.PatientID != 3) & (visits.PatientID % 3 == 0)]
+    for period in ['Week', 'Month', 'Year']:
+        data = utils.getCGIchangeData(population, period)
+        for col in ['CGI_Initial', 'CGI']:
+            for change in [True, False]:
+                pd.testing.assert_frame_equal(
+                    aggregates.crosstab(population.PatientID.unique(), change, period, col),
+                    utils.getCGIcrosstab(data, change, period, col))
+    return
+
+def test_heatmapAggregates_once(monkeypatch):
+    # Concurrent callbacks build the matrices of a period once, in one pass
+    from modules.VDL.heatmapAggregates import HeatmapAggregates
+    import threading, time
+    calls, getCGIchangeData = [], utils.getCGIchangeData
+    def counted(data, period):
+        calls.append(period)
+        time.sleep(0.05)
+        return getCGIchangeData(data, period)
+    monkeypatch.setattr(utils, 'getCGIchangeData', counted)
+
+    aggregates = HeatmapAggregates(visits)
+    args    = [(change, col) for change in [True, False] for col in ['CGI_Initial', 'CGI']] * 2
+    threads = [threading.Thread(target=aggregates.crosstab, args=(visits.PatientID.unique(), change, 'Month', col))
+               for change, col in args]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == ['Month'] and len(aggregates.matrices) == 4
+    # only the visits that were passed in are kept
+    assert [k for k, v in vars(aggregates).items() if isinstance(v, pd.DataFrame)] == ['visits']
+
+def getMedsDataOld(cp_data):
+    # The original grouped implementation of utils.getMedsData
+    cpop_meds = cp_data.groupby('Medication').agg({'PatientID':'nunique', 'CGI':'mean'})
+    cpop_improved = cp_data.loc[cp_data['CGI']<=2].groupby('Medication').agg({'PatientID':'nunique', 'CGI':['mean','median','var']})
+    cpop_improved.columns = ['Count_Improved','CGI_Mean','CGI_Median','CGI_Var']
+    cpop_all = cpop_meds.merge(cpop_improved, how='left', on='Medication')
+    cpop_all.columns = ['Count_All','CGI_All','Count_Improved','CGI_Mean','CGI_Median','CGI_Var']
+    cpop_all['Pct_Improved'] = cpop_all.Count_Improved / cpop_all.Count_All * 100 
+    return cpop_all
+
+def test_getMedsData():
+    data = visits[visits.PatientID != 3].copy()
+    data.loc[data.index % 97 == 0, 'Medication'] = None
+    # a medication that never improves, and one without any CGI
+    data.loc[data.index % 101 == 0, ['Medication', 'CGI']] = ['rare', 5.]
+    data.loc[data.index % 103 == 0, ['Medication', 'CGI']] = ['unscored', float('nan')]
+
+    stats = utils.getMedsData(data)
+    pd.testing.assert_frame_equal(stats[getMedsDataOld(data).columns], getMedsDataOld(data))
+
+    # categorical medications (as read from the column store) are still sorted by name
+    meds = pd.Categorical(data.Medication, categories=sorted(data.Medication.dropna().unique())[::-1])
+    pd.testing.assert_frame_equal(utils.getMedsData(data.assign(Medication=meds)), stats)
+
+    for med, group in data.groupby('Medication'):
+        values = group.CGI.dropna().to_numpy()
+        if len(values) == 0:
+            assert stats.loc[med, ['Q1', 'Median', 'Q3']].isna().all()
+            continue
+        q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+        assert stats.loc[med, ['Q1', 'Median', 'Q3']].tolist() == [q1, median, q3]
+        assert stats.loc[med, 'Lower_Fence'] == values[values >= q1 - 1.5*(q3 - q1)].min()
+        assert stats.loc[med, 'Upper_Fence'] == values[values <= q3 + 1.5*(q3 - q1)].max()
+    return